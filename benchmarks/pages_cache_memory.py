@@ -0,0 +1,62 @@
+"""
+Benchmark de memória do catálogo do PagesCache
+
+Compara o catálogo em dicts (formato anterior) com registros PageRecord
+para N páginas sintéticas, medindo a memória alocada com tracemalloc.
+
+Uso:
+    python benchmarks/pages_cache_memory.py [numero_de_paginas]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.page_record import PageRecord, page_link
+
+
+def _synthetic_pages(count: int):
+    """Páginas no formato gravado no pages_cache.json"""
+    processed_at = datetime.now().isoformat()
+    for pageid in range(1, count + 1):
+        processed = pageid % 3 == 0
+        yield {
+            'pageid': pageid,
+            'title': f"Manual de Procedimentos/Seção {pageid}",
+            'link': page_link(pageid),
+            'status': 1 if processed else 0,
+            'last_processed': processed_at if processed else None,
+            'error_message': None
+        }
+
+
+def _measure(build) -> int:
+    """Memória (bytes) que continua alocada pelo objeto construído"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+
+    dict_bytes = _measure(lambda: list(_synthetic_pages(count)))
+    record_bytes = _measure(lambda: [PageRecord.from_dict(page) for page in _synthetic_pages(count)])
+
+    reduction = (1 - record_bytes / dict_bytes) * 100 if dict_bytes else 0
+    print(f"📊 Catálogo com {count:,} páginas")
+    print(f"   dict:       {dict_bytes / 1024 / 1024:8.1f} MB ({dict_bytes / count:.0f} bytes/página)")
+    print(f"   PageRecord: {record_bytes / 1024 / 1024:8.1f} MB ({record_bytes / count:.0f} bytes/página)")
+    print(f"✅ Redução: {reduction:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,15 +7,29 @@ from datetime import datetime
 from src.mediawiki_client import MediaWikiClient
 from src.logger import Logger
 from src.config_manager import ConfigManager
-from src.pages_cache import PagesCache
+from src.pages_cache import create_pages_cache
+from src.link_graph import LinkGraph
+from src.parse_cache import ParseCache
+from src.isolated_parser import IsolatedParser
 from src.image_downloader import MediaWikiImageDownloader
+from src.bookstack_client import BookStackClient
+from src.template_extractor import MediaWikiTemplateExtractor
+from src.migration_pipeline import MigrationPipeline
 
 class MediaWikiApp:
     def __init__(self):
         self.client = None
         self.logger = Logger()
         self.config_manager = ConfigManager()
-        self.pages_cache = PagesCache()
+        # Só o cabeçalho é lido agora; o catálogo carrega em background quando a view de páginas abre.
+        # pages_cache_backend: 'json' (padrão), 'sqlite' ou 'sharded' (um arquivo por namespace);
+        # pages_cache_shared: várias instâncias do app gravando o mesmo cache (merge por versão)
+        config = self.config_manager.load_config() or {}
+        self.pages_cache = self._create_pages_cache(config)
+        # Grafo de links também é lido só no primeiro uso (workers de extração)
+        self.link_graph = LinkGraph(lazy=True)
+        # Cache de parsing (por hash do wikitext): aberto na primeira extração ou envio
+        self.parse_cache = None
         self.is_connected = False
         
         # Janela de configurações
@@ -146,6 +160,7 @@ class MediaWikiApp:
         self.send_pages_checkboxes = []
         self.selected_target = None
         self.bookstack_client = None
+        self.migration_pipeline = None  # Envio em andamento (para cancelamento)
         
         # Criar todas as views
         self.create_all_views()
@@ -210,6 +225,29 @@ class MediaWikiApp:
             
         # Atualizar título da view
         self.update_view_title(view_name)
+        
+        if view_name == "pages" and not self.pages_cache.is_loaded:
+            self._preload_pages_cache()
+        
+        if view_name == "send_pages":
+            if self.pages_cache.is_loaded:
+                self.load_send_pages_data()
+            else:
+                self.pages_cache.load_async(lambda loaded: self.root.after(0, self.load_send_pages_data))
+            if self.bookstack_client is None:
+                self.reload_bookstack_structure()
+    
+    def _preload_pages_cache(self):
+        """Mostra as contagens do cabeçalho do cache e carrega o catálogo em background"""
+        if self.pages_cache.header:
+            stats = self.pages_cache.get_statistics()
+            self.update_status(f"Cache: {stats['total_pages']:,} páginas ({stats['pending_pages']:,} pendentes) - carregando...", "yellow")
+        
+        def on_loaded(loaded):
+            if loaded:
+                self.root.after(0, lambda: self.log_message("Cache de páginas carregado em segundo plano"))
+        
+        self.pages_cache.load_async(on_loaded)
     
     def update_view_title(self, view_name):
         """Atualiza o título da view atual"""
@@ -335,6 +373,22 @@ class MediaWikiApp:
         self.progress_bar.pack(fill="x", padx=10, pady=(5,5))
         self.progress_bar.set(0)
         
+        # Busca por título nas páginas pendentes (índice do cache, sem varrer a lista)
+        pages_search_frame = ctk.CTkFrame(content_frame)
+        pages_search_frame.pack(fill="x", padx=10, pady=(5,0))
+        
+        ctk.CTkLabel(pages_search_frame, text="Buscar:").pack(side="left", padx=(10, 5))
+        self.pages_search_var = ctk.StringVar()
+        self.pages_search_entry = ctk.CTkEntry(
+            pages_search_frame,
+            textvariable=self.pages_search_var,
+            placeholder_text="Digite parte do título (acentos e maiúsculas são ignorados)..."
+        )
+        self.pages_search_entry.pack(side="left", fill="x", expand=True, padx=5, pady=5)
+        self.pages_search_entry.bind("<KeyRelease>", self._on_search_change)
+        self.pages_search_term = ""
+        self._pages_search_results = None
+        
         # Frame para seleção de páginas
         self.pages_selection_frame = ctk.CTkScrollableFrame(content_frame, height=200)
         self.pages_selection_frame.pack(fill="both", expand=True, padx=10, pady=(5,5))
@@ -540,6 +594,17 @@ class MediaWikiApp:
         )
         self.send_to_bookstack_btn.pack(pady=10, padx=10, fill="x")
         
+        # Cancelamento do envio em andamento
+        self.cancel_send_btn = ctk.CTkButton(
+            actions_frame,
+            text="⏹️ Cancelar envio",
+            command=self.cancel_send_to_bookstack,
+            state="disabled",
+            fg_color="#B22222",
+            hover_color="#8B0000"
+        )
+        self.cancel_send_btn.pack(pady=(0, 10), padx=10, fill="x")
+        
         # Carregar páginas e estrutura inicial
         self.load_send_pages_data()
         
@@ -781,9 +846,18 @@ class MediaWikiApp:
                 self.log_message(error_msg)
     
     def load_pages_cache(self):
-        """Carrega páginas do cache local e exibe sistema de navegação simples"""
+        """Carrega páginas do cache local (em background) e exibe sistema de navegação simples"""
+        if self.pages_cache.is_loaded:
+            self._show_pages_cache(os.path.exists(self.pages_cache.cache_file))
+            return
+        
+        self.update_status("Carregando cache de páginas...", "yellow")
+        self.pages_cache.load_async(lambda loaded: self.root.after(0, lambda: self._show_pages_cache(loaded)))
+    
+    def _show_pages_cache(self, loaded):
+        """Exibe o cache já carregado (ou avisa que não há cache)"""
         try:
-            if self.pages_cache.load_cache():
+            if loaded:
                 stats = self.pages_cache.get_statistics()
                 
                 # Inicializar navegação simples
@@ -847,12 +921,10 @@ Progresso geral: {stats['progress_percentage']:.1f}%
             api_pages = self.client.get_all_pages(callback=progress_callback)
             
             if api_pages:
-                # Atualizar cache preservando status existente
-                new_pages_count = self.pages_cache.update_pages_from_api(api_pages)
-                
-                # Remover páginas que não existem mais
-                current_pageids = [page.get('pageid') for page in api_pages]
-                self.pages_cache.remove_deleted_pages(current_pageids)
+                # Atualizar cache preservando status existente (novas, renomeadas e
+                # removidas em uma única passada)
+                diff = self.pages_cache.merge_pages_from_api(api_pages)
+                new_pages_count = diff['added']
                 
                 # Salvar cache atualizado
                 if self.pages_cache.save_cache():
@@ -865,6 +937,9 @@ Progresso geral: {stats['progress_percentage']:.1f}%
                     result_text = f"""=== CACHE ATUALIZADO COM SUCESSO ===
 Total de páginas: {stats['total_pages']:,}
 Novas páginas adicionadas: {new_pages_count:,}
+Páginas renomeadas: {diff['renamed']:,}
+Páginas removidas: {diff['deleted']:,}
+Páginas inalteradas: {diff['unchanged']:,}
 Páginas pendentes: {stats['pending_pages']:,}
 Páginas processadas: {stats['processed_pages']:,}
 Progresso geral: {stats['progress_percentage']:.1f}%
@@ -884,7 +959,7 @@ Cache salvo em: config/pages_cache.json
                     # Atualizar checkboxes com sistema de navegação
                     self.root.after(0, self._create_cached_page_checkboxes)
                     
-                    self.log_message(f"Cache atualizado: {stats['total_pages']} páginas ({new_pages_count} novas)")
+                    self.log_message(f"Cache atualizado: {stats['total_pages']} páginas ({new_pages_count} novas, {diff['renamed']} renomeadas, {diff['deleted']} removidas)")
                     
                 else:
                     error_msg = "ERRO: Falha ao salvar cache atualizado"
@@ -918,21 +993,27 @@ Cache salvo em: config/pages_cache.json
         # Fixar em 50 páginas por página
         self.pages_per_page = 50
         
-        # Obter páginas pendentes (sem filtros)
-        all_pages = self._get_filtered_pages()
+        # Busca ativa: resultados do índice de títulos, refeitos a cada exibição
+        # para refletir páginas que deixaram de estar pendentes
+        if getattr(self, 'pages_search_term', ""):
+            self._pages_search_results = self.pages_cache.search_pages(self.pages_search_term, status=0)
+        else:
+            self._pages_search_results = None
         
-        # Calcular paginação
-        total_pages = len(all_pages)
-        total_page_count = max(1, (total_pages + self.pages_per_page - 1) // self.pages_per_page)
+        # Calcular paginação (contagem O(1) pelo índice de status)
+        total_pages = self._get_pending_count()
+        total_page_count = self._get_total_page_count()
         
         # Ajustar página atual se necessário
         if self.current_page >= total_page_count:
             self.current_page = max(0, total_page_count - 1)
         
-        # Obter páginas da página atual
+        # Obter somente as páginas da página atual
         start_idx = self.current_page * self.pages_per_page
-        end_idx = min(start_idx + self.pages_per_page, total_pages)
-        display_pages = all_pages[start_idx:end_idx]
+        if self._pages_search_results is not None:
+            display_pages = self._pages_search_results[start_idx:start_idx + self.pages_per_page]
+        else:
+            display_pages = self.pages_cache.iter_page(0, start_idx, self.pages_per_page)
         
         # Criar controles de navegação
         self._create_pagination_controls(total_pages, total_page_count)
@@ -988,9 +1069,13 @@ Cache salvo em: config/pages_cache.json
         
         # Se não há páginas para mostrar
         if total_pages == 0:
+            if self._pages_search_results is not None:
+                empty_text = f"🔍 Nenhuma página pendente com \"{self.pages_search_term}\" no título"
+            else:
+                empty_text = "📭 Nenhuma página pendente encontrada no cache"
             no_pages_label = ctk.CTkLabel(
                 self.pages_selection_frame,
-                text="📭 Nenhuma página pendente encontrada no cache",
+                text=empty_text,
                 font=ctk.CTkFont(size=14),
                 text_color="gray"
             )
@@ -1001,11 +1086,17 @@ Cache salvo em: config/pages_cache.json
     
     def _get_filtered_pages(self):
         """Obtém todas as páginas pendentes (sem filtros)"""
-        # Obter todas as páginas do cache
-        all_pages = self.pages_cache.pages_data
-        
-        # Retornar apenas páginas pendentes (status 0)
-        return [p for p in all_pages if p.get('status', 0) == 0]
+        return self.pages_cache.get_pending_pages()
+    
+    def _get_pending_count(self):
+        """Número de páginas pendentes (ou encontradas pela busca), sem percorrer o cache"""
+        if getattr(self, '_pages_search_results', None) is not None:
+            return len(self._pages_search_results)
+        return self.pages_cache.count_by_status(0)
+    
+    def _get_total_page_count(self):
+        """Número de páginas de navegação para as páginas pendentes"""
+        return max(1, (self._get_pending_count() + self.pages_per_page - 1) // self.pages_per_page)
     
     def _create_pagination_controls(self, total_pages, total_page_count):
         """Cria controles simples de navegação de páginas"""
@@ -1068,8 +1159,19 @@ Cache salvo em: config/pages_cache.json
         self._go_to_next_page()
     
     def _on_search_change(self, event):
-        """Método removido - filtros desabilitados"""
-        pass
+        """Agenda a busca por título (debounce para não refazer a lista a cada tecla)"""
+        if hasattr(self, '_search_timer'):
+            self.root.after_cancel(self._search_timer)
+        self._search_timer = self.root.after(250, self._apply_pages_search)
+    
+    def _apply_pages_search(self):
+        """Aplica o termo de busca e volta para a primeira página de resultados"""
+        term = self.pages_search_var.get().strip()
+        if term == self.pages_search_term:
+            return
+        self.pages_search_term = term
+        self.current_page = 0
+        self._create_cached_page_checkboxes()
     
     def _on_status_filter_change(self, selected_status):
         """Método removido - filtros desabilitados"""
@@ -1097,8 +1199,7 @@ Cache salvo em: config/pages_cache.json
     
     def _go_to_next_page(self):
         """Vai para a próxima página"""
-        all_pages = self._get_filtered_pages()
-        total_page_count = max(1, (len(all_pages) + self.pages_per_page - 1) // self.pages_per_page)
+        total_page_count = self._get_total_page_count()
         
         if self.current_page < total_page_count - 1:
             self.current_page += 1
@@ -1106,8 +1207,7 @@ Cache salvo em: config/pages_cache.json
     
     def _go_to_last_page(self):
         """Vai para a última página"""
-        all_pages = self._get_filtered_pages()
-        total_page_count = max(1, (len(all_pages) + self.pages_per_page - 1) // self.pages_per_page)
+        total_page_count = self._get_total_page_count()
         
         if self.current_page < total_page_count - 1:
             self.current_page = total_page_count - 1
@@ -1117,8 +1217,7 @@ Cache salvo em: config/pages_cache.json
         """Vai para uma página específica"""
         try:
             page_num = int(self.goto_page_var.get())
-            all_pages = self._get_filtered_pages()
-            total_page_count = max(1, (len(all_pages) + self.pages_per_page - 1) // self.pages_per_page)
+            total_page_count = self._get_total_page_count()
             
             # Validar número da página (1-indexed para o usuário)
             if 1 <= page_num <= total_page_count:
@@ -1137,11 +1236,27 @@ Cache salvo em: config/pages_cache.json
         self._create_cached_page_checkboxes()
         
         # Log simples
-        all_pages = self._get_filtered_pages()
-        self.log_message(f"Navegação: Página {self.current_page + 1} | Total: {len(all_pages)} páginas pendentes")
+        self.log_message(f"Navegação: Página {self.current_page + 1} | Total: {self._get_pending_count()} páginas pendentes")
+    
+    def _create_pages_cache(self, config):
+        """Cache de páginas com o backend configurado (JSON se o backend for inválido)"""
+        backend = config.get('pages_cache_backend', 'json')
+        shared = bool(config.get('pages_cache_shared', False))
+        try:
+            return create_pages_cache(backend, lazy=True, shared=shared)
+        except ValueError as e:
+            print(f"⚠️ {e}; usando o cache JSON")
+            return create_pages_cache('json', lazy=True, shared=shared)
+    
+    def _get_parse_cache(self):
+        """Cache de parsing compartilhado pelas extrações e envios (carregado no primeiro uso)"""
+        if self.parse_cache is None:
+            self.parse_cache = ParseCache()
+        return self.parse_cache
     
     def _extract_txt_images_worker(self, selected_pages):
         """Worker thread para extrair conteúdo TXT e baixar imagens"""
+        isolated_parser = None
         try:
             page_titles = [page['title'] for page in selected_pages]
             page_ids = [page['pageid'] for page in selected_pages]
@@ -1178,6 +1293,8 @@ Cache salvo em: config/pages_cache.json
             )
             
             # Processar resultados de texto
+            # Parsing num processo isolado: página patológica estoura o orçamento e a extração segue
+            isolated_parser = IsolatedParser(parse_cache=self._get_parse_cache())
             successful_txt = 0
             failed_txt = 0
             txt_content = {}
@@ -1203,11 +1320,23 @@ Cache salvo em: config/pages_cache.json
                     txt_content[title] = text_content
                     if page_id:
                         self.pages_cache.update_page_status(page_id, 1)
+                        # Registrar links da página no grafo. O texto já foi extraído: uma falha
+                        # aqui só deixa a página sem links no grafo, sem voltá-la a pendente
+                        parsed = isolated_parser.parse(text_content, title)
+                        if parsed.get('parse_error'):
+                            self.log_message(f"⚠️ {title}: links não registrados ({parsed['parse_error']})")
+                        else:
+                            self.link_graph.add_parse_result(page_id, parsed)
                 else:
                     failed_txt += 1
                     if page_id:
                         self.pages_cache.update_page_status(page_id, 0, "Conteúdo vazio")
             
+            isolated_parser.close()
+            isolated = isolated_parser.stats['timeouts'] + isolated_parser.stats['memory_exceeded']
+            if isolated:
+                self.log_message(f"⚠️ {isolated} páginas excederam o orçamento de parsing (links não registrados)")
+            
             # Salvar arquivos TXT
             if successful_txt > 0:
                 self.log_message(f"💾 Salvando {successful_txt} arquivos TXT...")
@@ -1258,6 +1387,8 @@ Cache salvo em: config/pages_cache.json
             
             # Salvar cache atualizado
             self.pages_cache.save_cache()
+            self.link_graph.save_graph()
+            self.parse_cache.save_cache()
             
             # Preparar relatório final
             cache_stats = self.pages_cache.get_statistics()
@@ -1308,6 +1439,8 @@ Cache salvo em: config/pages_cache.json
             self.root.after(0, lambda: self.update_status("Erro na extração TXT+Imagens", "red"))
             self.log_message(error_msg)
         finally:
+            if isolated_parser is not None:
+                isolated_parser.close()
             self.root.after(0, lambda: self.progress_label.configure(text=""))
     
 
@@ -1350,28 +1483,266 @@ Cache salvo em: config/pages_cache.json
         pass
 
     def select_all_send_pages(self):
-        """Seleciona todas as páginas para envio - método stub"""
-        pass
+        """Seleciona todas as páginas listadas para envio"""
+        for checkbox in self.send_pages_checkboxes:
+            checkbox.var.set(True)
+        self._update_send_selection_info()
 
     def deselect_all_send_pages(self):
-        """Deseleciona todas as páginas para envio - método stub"""
-        pass
+        """Deseleciona todas as páginas listadas para envio"""
+        for checkbox in self.send_pages_checkboxes:
+            checkbox.var.set(False)
+        self._update_send_selection_info()
 
     def on_send_pages_search(self, event):
-        """Busca páginas para envio - método stub"""
-        pass
+        """Refaz a lista de envio pelo termo de busca (com debounce)"""
+        if hasattr(self, '_send_search_timer'):
+            self.root.after_cancel(self._send_search_timer)
+        self._send_search_timer = self.root.after(250, self.load_send_pages_data)
 
     def reload_bookstack_structure(self):
-        """Recarrega estrutura do BookStack - método stub"""
-        pass
+        """Recarrega estrutura do BookStack (livros e capítulos) em background"""
+        # Recriar o cliente: as configurações podem ter mudado
+        self.bookstack_client = None
+        self.selected_target = None
+        self.bookstack_connection_status.configure(text="🔄 Carregando estrutura...")
+        self._update_send_selection_info()
+        threading.Thread(target=self._load_bookstack_books_worker, daemon=True).start()
+
+    def _get_bookstack_client(self):
+        """Cria (uma vez) o cliente BookStack a partir das configurações salvas"""
+        if self.bookstack_client is None:
+            config = self.config_manager.load_config() or {}
+            if not (config.get('bookstack_url') and config.get('bookstack_token_id') and config.get('bookstack_token_secret')):
+                return None
+            self.bookstack_client = BookStackClient(
+                config['bookstack_url'],
+                config['bookstack_token_id'],
+                config['bookstack_token_secret'],
+                config.get('bookstack_verify_ssl', True)
+            )
+        return self.bookstack_client
+
+    def _load_bookstack_books_worker(self):
+        """Worker thread para listar os livros do BookStack"""
+        try:
+            client = self._get_bookstack_client()
+            if client is None:
+                self.root.after(0, lambda: self.bookstack_connection_status.configure(
+                    text="⚠️ Configure URL e token do BookStack nas configurações"))
+                return
+            books = client.get_books(limit=None)
+            self.root.after(0, lambda: self.bookstack_connection_status.configure(
+                text=f"✅ Conectado - {len(books)} livros"))
+            self.root.after(0, lambda: self._show_bookstack_books(books))
+        except Exception as e:
+            error_msg = f"ERRO ao carregar estrutura do BookStack: {str(e)}"
+            self.root.after(0, lambda: self.bookstack_connection_status.configure(text="❌ Erro de conexão com o BookStack"))
+            self.log_message(error_msg)
+
+    def _clear_bookstack_nav(self):
+        for widget in self.bookstack_nav_frame.winfo_children():
+            widget.destroy()
+
+    def _show_bookstack_books(self, books):
+        """Lista os livros; clicar em um livro abre seus capítulos"""
+        self._clear_bookstack_nav()
+        self.current_bookstack_level = "books"
+        self.current_book_id = None
+        self.current_chapter_id = None
+        self.breadcrumb_label.configure(text="📚 Selecione um livro")
+        
+        for book in books:
+            ctk.CTkButton(
+                self.bookstack_nav_frame,
+                text=f"📖 {book.get('name', 'Sem nome')}",
+                anchor="w",
+                command=lambda b=book: self._open_bookstack_book(b)
+            ).pack(fill="x", padx=5, pady=2)
+        
+        if not books:
+            ctk.CTkLabel(self.bookstack_nav_frame, text="📭 Nenhum livro encontrado", text_color="gray").pack(pady=20)
+
+    def _open_bookstack_book(self, book):
+        """Seleciona o livro como destino e carrega seus capítulos"""
+        self.current_book_id = book.get('id')
+        self._select_bookstack_target({'book_id': book.get('id')}, f"📖 {book.get('name', '')}")
+        
+        def worker():
+            try:
+                chapters = self.bookstack_client.get_chapters(book.get('id'))
+                self.root.after(0, lambda: self._show_bookstack_chapters(book, chapters))
+            except Exception as e:
+                self.log_message(f"ERRO ao carregar capítulos: {str(e)}")
+        
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_bookstack_chapters(self, book, chapters):
+        """Lista os capítulos do livro (o próprio livro também pode ser o destino)"""
+        self._clear_bookstack_nav()
+        self.current_bookstack_level = "chapters"
+        
+        ctk.CTkButton(self.bookstack_nav_frame, text="⬅️ Voltar aos livros",
+                      command=self.reload_bookstack_structure).pack(fill="x", padx=5, pady=(2, 8))
+        ctk.CTkButton(
+            self.bookstack_nav_frame,
+            text=f"📖 {book.get('name', '')} (raiz do livro)",
+            anchor="w",
+            command=lambda: self._select_bookstack_target({'book_id': book.get('id')}, f"📖 {book.get('name', '')}")
+        ).pack(fill="x", padx=5, pady=2)
+        
+        for chapter in chapters:
+            label = f"📑 {book.get('name', '')} / {chapter.get('name', '')}"
+            ctk.CTkButton(
+                self.bookstack_nav_frame,
+                text=f"   📑 {chapter.get('name', 'Sem nome')}",
+                anchor="w",
+                command=lambda c=chapter, l=label: self._select_bookstack_target({'chapter_id': c.get('id')}, l)
+            ).pack(fill="x", padx=5, pady=2)
+
+    def _select_bookstack_target(self, target, label):
+        """Define o livro/capítulo de destino do envio"""
+        self.selected_target = dict(target, label=label)
+        self.current_chapter_id = target.get('chapter_id')
+        self.breadcrumb_label.configure(text=f"Destino: {label}")
+        self._update_send_selection_info()
+
+    def _update_send_selection_info(self):
+        """Atualiza o resumo da seleção e habilita o envio quando há páginas e destino"""
+        selected_count = sum(1 for checkbox in self.send_pages_checkboxes if checkbox.var.get())
+        target_label = self.selected_target['label'] if self.selected_target else "nenhum destino"
+        self.selection_info_label.configure(text=f"{selected_count} páginas → {target_label}")
+        ready = selected_count > 0 and self.selected_target is not None and self.migration_pipeline is None
+        self.send_to_bookstack_btn.configure(state="normal" if ready else "disabled")
 
     def send_selected_pages_to_bookstack(self):
-        """Envia páginas selecionadas para BookStack - método stub"""
-        pass
+        """Envia páginas selecionadas para BookStack pelo pipeline de migração"""
+        pages = [checkbox.page_data for checkbox in self.send_pages_checkboxes if checkbox.var.get()]
+        if not pages or not self.selected_target:
+            self.log_message("Selecione páginas e um destino no BookStack")
+            return
+        if not self.client:
+            self.log_message("ERRO: Conecte-se ao MediaWiki antes de enviar páginas")
+            return
+        if self._get_bookstack_client() is None:
+            self.log_message("ERRO: Configure o BookStack antes de enviar páginas")
+            return
+        
+        self.send_to_bookstack_btn.configure(state="disabled")
+        self.update_status(f"Enviando {len(pages)} páginas para o BookStack...", "yellow")
+        threading.Thread(target=self._send_pages_worker, args=(pages, dict(self.selected_target)), daemon=True).start()
+
+    def _send_pages_worker(self, pages, target):
+        """Worker thread que executa o pipeline busca → conversão → imagens → criação"""
+        try:
+            # Estrutura do BookStack em memória: páginas já migradas são atualizadas, não duplicadas
+            if self.bookstack_client.index is None:
+                self.root.after(0, lambda: self.update_status("Carregando estrutura do BookStack...", "yellow"))
+                counts = self.bookstack_client.prefetch_index()
+                self.log_message(
+                    f"Estrutura do BookStack indexada: {counts['books']} livros, {counts['chapters']} capítulos, "
+                    f"{counts['pages']} páginas ({counts['tagged']} já migradas do MediaWiki)"
+                )
+            
+            # Com conversion_processes, expansão e renderização vão para um pool de processos;
+            # sem ele, cada thread de conversão usa um worker isolado com orçamento.
+            # Páginas acima de split_threshold bytes viram capítulo + uma página por seção (0 = não dividir)
+            config = self.config_manager.load_config() or {}
+            conversion_processes = config.get('conversion_processes', 0)
+            pipeline = MigrationPipeline(
+                self.client,
+                self.bookstack_client,
+                template_extractor=MediaWikiTemplateExtractor(self.client),
+                parse_cache=self._get_parse_cache(),
+                isolation=None if conversion_processes else {'pages_cache': self.pages_cache},
+                conversion_processes=conversion_processes,
+                split_threshold=config.get('split_threshold', 500_000),
+                min_section_size=config.get('min_section_size', 2_000)
+            )
+            self.migration_pipeline = pipeline
+            self.root.after(0, lambda: self.cancel_send_btn.configure(state="normal"))
+            
+            def progress(completed, total, item):
+                self.root.after(0, lambda: self.update_status(f"Enviando para o BookStack: {completed}/{total}", "yellow"))
+                if item['error']:
+                    self.log_message(f"❌ {item['title']}: {item['error']} (estágio: {item['stage']})")
+                elif item.get('split_pages'):
+                    self.log_message(f"📚 {item['title']} dividida em {item['split_pages']} páginas "
+                                     f"(capítulo ID: {item.get('bookstack_id')})")
+                else:
+                    self.log_message(f"✅ {item['title']} criada no BookStack (ID: {item.get('bookstack_id')})")
+            
+            report = pipeline.run(pages, target, progress)
+            
+            if report['cancelled']:
+                self.log_message(f"⏹️ Envio cancelado: {report['cancelled']} páginas não enviadas")
+            self.log_message(
+                f"Envio concluído: {report['created']} criadas, {report['failed']} falharam | "
+                f"{report['elapsed_seconds']}s | tempo ocupado por estágio: {report['stage_seconds']}"
+            )
+            template_stats = report.get('template_stats')
+            if template_stats:
+                self.log_message(
+                    f"Templates: {template_stats['local']['templates']} expandidos localmente, "
+                    f"{template_stats['hits']} reaproveitados do memo ({template_stats['hit_rate']:.0f}% de acerto), "
+                    f"{template_stats['local']['api_calls']} chamadas à API, "
+                    f"{template_stats['local']['missing']} não encontrados"
+                )
+            color = "green" if not report['failed'] else "orange"
+            self.root.after(0, lambda: self.update_status(
+                f"Envio concluído: {report['created']}/{report['total']} páginas criadas", color))
+        except Exception as e:
+            error_msg = f"ERRO no envio para o BookStack: {str(e)}"
+            self.log_message(error_msg)
+            self.root.after(0, lambda: self.update_status("Erro no envio para o BookStack", "red"))
+        finally:
+            self.migration_pipeline = None
+            self.root.after(0, lambda: self.cancel_send_btn.configure(state="disabled"))
+            self.root.after(0, self._update_send_selection_info)
+
+    def cancel_send_to_bookstack(self):
+        """Cancela o envio em andamento (páginas já em criação terminam normalmente)"""
+        if self.migration_pipeline is not None:
+            self.migration_pipeline.cancel()
+            self.cancel_send_btn.configure(state="disabled")
+            self.update_status("Cancelando envio para o BookStack...", "orange")
 
     def load_send_pages_data(self):
-        """Carrega dados para envio de páginas - método stub"""
-        pass
+        """Preenche a lista de páginas para envio a partir do cache (sem forçar sua carga)"""
+        for widget in self.send_pages_list_frame.winfo_children():
+            widget.destroy()
+        self.send_pages_checkboxes = []
+        
+        if not self.pages_cache.is_loaded:
+            ctk.CTkLabel(self.send_pages_list_frame, text="⏳ Cache de páginas ainda não carregado",
+                         text_color="gray").pack(pady=20)
+            return
+        
+        # Lista limitada: a busca (índice de títulos) refina o restante
+        limit = 200
+        pages = self.pages_cache.search_pages(self.send_pages_search_var.get().strip(), limit=limit)
+        for page in pages:
+            var = ctk.BooleanVar(value=False)
+            status_icon = "✅" if page.get('status') == 1 else "📄"
+            checkbox = ctk.CTkCheckBox(
+                self.send_pages_list_frame,
+                text=f"{status_icon} {page.get('title', 'Sem título')} (ID: {page.get('pageid', 'N/A')})",
+                variable=var,
+                command=self._update_send_selection_info
+            )
+            checkbox.pack(anchor="w", padx=5, pady=1)
+            checkbox.page_data = page
+            checkbox.var = var
+            self.send_pages_checkboxes.append(checkbox)
+        
+        if not pages:
+            ctk.CTkLabel(self.send_pages_list_frame, text="📭 Nenhuma página encontrada no cache",
+                         text_color="gray").pack(pady=20)
+        elif len(pages) == limit:
+            ctk.CTkLabel(self.send_pages_list_frame, text=f"Mostrando as primeiras {limit} páginas - use a busca para refinar",
+                         text_color="gray").pack(pady=5)
+        
+        self._update_send_selection_info()
 
     def open_config_window(self):
         """Abre a janela de configurações"""
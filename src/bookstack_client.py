@@ -5,14 +5,20 @@ Gerencia integração com BookStack para importação de conteúdo
 
 import requests
 import json
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterator, List, Optional, Union
 import time
+from itertools import islice
 from urllib.parse import urljoin
 
+from src.bookstack_index import BookStackIndex, source_id_from_tags
+from src.rate_limiter import RateLimiter, parse_retry_after
+from src.retry_policy import BookStackAPIError, RetryPolicy
+
 class BookStackClient:
     """Cliente para API do BookStack"""
     
-    def __init__(self, base_url: str, token_id: str, token_secret: str, verify_ssl: bool = True):
+    def __init__(self, base_url: str, token_id: str, token_secret: str, verify_ssl: bool = True,
+                 rate_limiter: RateLimiter = None, retry_policy: RetryPolicy = None):
         """
         Inicializa cliente BookStack
         
@@ -21,6 +27,8 @@ class BookStackClient:
             token_id: ID do token de API
             token_secret: Secret do token de API
             verify_ssl: Verificar certificados SSL
+            rate_limiter: Limitador compartilhado (padrão: um por cliente, 10 req/s até o servidor informar o limite)
+            retry_policy: Política de novas tentativas para falhas transitórias
         """
         self.base_url = base_url.rstrip('/')
         self.api_base = f"{self.base_url}/api"
@@ -38,11 +46,99 @@ class BookStackClient:
         })
         self.session.verify = verify_ssl
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms entre requisições
+        # Rate limiting (token bucket thread-safe, ajustado pelos cabeçalhos X-RateLimit-*)
+        self.rate_limiter = rate_limiter or RateLimiter(rate=10.0, burst=10)
+        self.retry_policy = retry_policy or RetryPolicy()
+        
+        # Estrutura pré-carregada (prefetch_index): torna create_page um upsert local
+        self.index: Optional[BookStackIndex] = None
+    
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Envia uma requisição respeitando o rate limit (JSON e uploads)
+        
+        Args:
+            method: Método HTTP
+            url: URL completa
+            **kwargs: Argumentos repassados a Session.request
+            
+        Returns:
+            Resposta HTTP (status não verificado)
+        """
+        self.rate_limiter.acquire()
+        response = self.session.request(method, url, **kwargs)
+        self.rate_limiter.update_from_headers(response.headers)
+        if response.status_code == 429:
+            self.rate_limiter.throttle(parse_retry_after(response.headers.get('Retry-After')))
+        return response
+    
+    def _send_with_retry(self, method: str, url: str, retry: bool = True, **kwargs) -> requests.Response:
+        """
+        Envia a requisição repetindo falhas transitórias (backoff exponencial com jitter)
+        
+        Args:
+            method: Método HTTP
+            url: URL completa
+            retry: False para uma única tentativa
+            **kwargs: Argumentos repassados a Session.request
+            
+        Returns:
+            Resposta HTTP com status de sucesso
+            
+        Raises:
+            BookStackAPIError: Falha fatal, ou transitória que esgotou tentativas/prazo
+        """
+        policy = self.retry_policy
+        deadline = time.monotonic() + policy.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            # Uploads: o arquivo precisa ser relido do início a cada tentativa
+            for value in (kwargs.get('files') or {}).values():
+                if hasattr(value, 'seek'):
+                    value.seek(0)
+            
+            status_code = None
+            try:
+                response = self._send(method, url, **kwargs)
+                status_code = response.status_code
+                response.raise_for_status()
+                return response
+            except requests.exceptions.RequestException as e:
+                retryable = policy.is_retryable(method, status_code, e)
+                
+                # Incluir mais detalhes do erro
+                error_details = str(e)
+                if getattr(e, 'response', None) is not None:
+                    try:
+                        error_details += f" | Response: {e.response.text}"
+                    except Exception:
+                        pass
+                
+                # 429: o rate limiter já segura as threads até o Retry-After
+                delay = 0.0 if status_code == 429 else policy.backoff(attempt)
+                if not (retry and retryable) or attempt >= policy.max_attempts \
+                        or time.monotonic() + delay >= deadline:
+                    raise BookStackAPIError(
+                        f"Erro na requisição para BookStack: {error_details}",
+                        status_code, retryable, attempt
+                    ) from e
+                
+                print(f"🔁 {method} {url} falhou ({str(e)[:80]}) - tentativa {attempt + 1}/{policy.max_attempts} em {delay:.1f}s")
+                time.sleep(delay)
+        
+    @staticmethod
+    def _unwrap(response: Dict) -> Dict:
+        """
+        Objeto de uma resposta de criação/leitura/atualização
         
-    def _make_request(self, method: str, endpoint: str, data: dict = None, params: dict = None) -> dict:
+        Os endpoints de item do BookStack (POST/PUT/GET /pages/{id}, upload de
+        imagem...) retornam o próprio objeto; só as listagens vêm em 'data'.
+        """
+        return response.get('data', response) if isinstance(response, dict) else {}
+    
+    def _make_request(self, method: str, endpoint: str, data: dict = None, params: dict = None,
+                      retry: bool = True) -> dict:
         """
         Faz requisição para API do BookStack
         
@@ -51,52 +147,27 @@ class BookStackClient:
             endpoint: Endpoint da API (sem /api)
             data: Dados para envio (POST/PUT)
             params: Parâmetros de query
+            retry: Repetir falhas transitórias conforme a retry_policy
             
         Returns:
             Resposta JSON da API
         """
-        # Rate limiting simples
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        
         url = urljoin(self.api_base + '/', endpoint.lstrip('/'))
         
+        if method.upper() in ('GET', 'DELETE'):
+            response = self._send_with_retry(method.upper(), url, retry, params=params)
+        elif method.upper() in ('POST', 'PUT'):
+            response = self._send_with_retry(method.upper(), url, retry, json=data, params=params)
+        else:
+            raise ValueError(f"Método HTTP não suportado: {method}")
+        
         try:
-            if method.upper() == 'GET':
-                response = self.session.get(url, params=params)
-            elif method.upper() == 'POST':
-                response = self.session.post(url, json=data, params=params)
-            elif method.upper() == 'PUT':
-                response = self.session.put(url, json=data, params=params)
-            elif method.upper() == 'DELETE':
-                response = self.session.delete(url, params=params)
-            else:
-                raise ValueError(f"Método HTTP não suportado: {method}")
-            
-            self.last_request_time = time.time()
-            
-            # Verificar status da resposta
-            response.raise_for_status()
-            
             # Retornar JSON se disponível
             if response.headers.get('content-type', '').startswith('application/json'):
                 return response.json()
             else:
                 return {'success': True, 'data': response.text}
-                
-        except requests.exceptions.RequestException as e:
-            # Incluir mais detalhes do erro
-            error_details = str(e)
-            if hasattr(e, 'response') and e.response is not None:
-                try:
-                    error_body = e.response.text
-                    error_details += f" | Response: {error_body}"
-                except:
-                    pass
-            raise Exception(f"Erro na requisição para BookStack: {error_details}")
-        except json.JSONDecodeError as e:
+        except ValueError as e:
             raise Exception(f"Erro ao decodificar resposta JSON: {str(e)}")
     
     def test_connection(self) -> Dict:
@@ -108,7 +179,8 @@ class BookStackClient:
         """
         try:
             # Tentar obter informações do usuário atual
-            response = self._make_request('GET', '/users/me')
+            # Sem novas tentativas: algumas versões respondem 500 aqui (tratado abaixo)
+            response = self._make_request('GET', '/users/me', retry=False)
             user_info = response.get('data', {})
             
             # Testar permissões de criação
@@ -300,23 +372,82 @@ class BookStackClient:
                 'details': f'Falha no teste de permissões: {str(e)}'
             }
     
-    def get_books(self, search: str = None, limit: int = 50) -> List[Dict]:
+    # Máximo de itens por página aceito pelos endpoints de listagem
+    LIST_PAGE_SIZE = 500
+    
+    def iter_list(self, endpoint: str, params: dict = None, page_size: int = None) -> Iterator[Dict]:
+        """
+        Percorre todos os itens de um endpoint de listagem, página a página (count/offset)
+        
+        Args:
+            endpoint: Endpoint de listagem (ex: /books, /pages)
+            params: Filtros e ordenação
+            page_size: Itens por requisição (padrão: LIST_PAGE_SIZE)
+            
+        Returns:
+            Iterador que busca a próxima página só quando a anterior é consumida
+        """
+        page_size = page_size or self.LIST_PAGE_SIZE
+        params = dict(params or {})
+        offset = 0
+        while True:
+            response = self._make_request('GET', endpoint, params={**params, 'count': page_size, 'offset': offset})
+            items = response.get('data', [])
+            yield from items
+            offset += len(items)
+            if not items or len(items) < page_size or offset >= response.get('total', offset + 1):
+                return
+    
+    def iter_search(self, query: str, page_size: int = 100) -> Iterator[Dict]:
+        """
+        Percorre todos os resultados de uma busca (os resultados trazem as tags)
+        
+        Args:
+            query: Consulta no formato de busca do BookStack (ex: [tag] {type:page})
+            page_size: Resultados por requisição
+        """
+        page = 1
+        while True:
+            response = self.search_content(query, page=page, count=page_size)
+            items = response.get('data', [])
+            yield from items
+            if not items or page * page_size >= response.get('total', 0):
+                return
+            page += 1
+    
+    def _page_size_for(self, limit: Optional[int]) -> int:
+        return min(limit, self.LIST_PAGE_SIZE) if limit else self.LIST_PAGE_SIZE
+    
+    def get_shelves(self, search: str = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Obtém lista de estantes
+        
+        Args:
+            search: Termo de busca
+            limit: Limite de resultados (None = todas)
+            
+        Returns:
+            Lista de estantes
+        """
+        params = {'filter[name:like]': f'%{search}%'} if search else {}
+        return list(islice(self.iter_list('/shelves', params, self._page_size_for(limit)), limit))
+    
+    def get_books(self, search: str = None, limit: Optional[int] = 50) -> List[Dict]:
         """
         Obtém lista de livros
         
         Args:
             search: Termo de busca
-            limit: Limite de resultados
+            limit: Limite de resultados (None = todos)
             
         Returns:
             Lista de livros
         """
-        params = {'count': limit}
+        params = {}
         if search:
             params['filter[name:like]'] = f'%{search}%'
             
-        response = self._make_request('GET', '/books', params=params)
-        return response.get('data', [])
+        return list(islice(self.iter_list('/books', params, self._page_size_for(limit)), limit))
     
     def create_book(self, name: str, description: str = '', tags: List[str] = None) -> Dict:
         """
@@ -339,7 +470,7 @@ class BookStackClient:
             data['tags'] = [{'name': tag, 'value': ''} for tag in tags]
         
         response = self._make_request('POST', '/books', data=data)
-        return response.get('data', {})
+        return self._unwrap(response)
     
     def get_chapters(self, book_id: int, search: str = None) -> List[Dict]:
         """
@@ -350,14 +481,13 @@ class BookStackClient:
             search: Termo de busca
             
         Returns:
-            Lista de capítulos
+            Lista de capítulos (todos, paginando)
         """
-        params = {}
+        params = {'filter[book_id]': book_id, 'sort': '+priority'}
         if search:
             params['filter[name:like]'] = f'%{search}%'
             
-        response = self._make_request('GET', f'/books/{book_id}/chapters', params=params)
-        return response.get('data', [])
+        return list(self.iter_list('/chapters', params))
     
     def create_chapter(self, book_id: int, name: str, description: str = '', 
                       priority: int = None) -> Dict:
@@ -383,9 +513,10 @@ class BookStackClient:
             data['priority'] = priority
         
         response = self._make_request('POST', '/chapters', data=data)
-        return response.get('data', {})
+        return self._unwrap(response)
     
-    def get_pages(self, book_id: int = None, chapter_id: int = None, search: str = None, limit: int = 100) -> List[Dict]:
+    def get_pages(self, book_id: int = None, chapter_id: int = None, search: str = None,
+                  limit: Optional[int] = 100) -> List[Dict]:
         """
         Obtém lista de páginas
         
@@ -393,12 +524,12 @@ class BookStackClient:
             book_id: ID do livro (opcional)
             chapter_id: ID do capítulo (opcional)
             search: Termo de busca
-            limit: Limite de resultados
+            limit: Limite de resultados (None = todas)
             
         Returns:
             Lista de páginas
         """
-        params = {'count': limit}
+        params = {}
         
         if book_id:
             params['filter[book_id]'] = book_id
@@ -407,18 +538,51 @@ class BookStackClient:
         if search:
             params['filter[name:like]'] = f'%{search}%'
             
-        response = self._make_request('GET', '/pages', params=params)
-        return response.get('data', [])
+        return list(islice(self.iter_list('/pages', params, self._page_size_for(limit)), limit))
+    
+    def prefetch_index(self, progress_callback=None) -> Dict[str, int]:
+        """
+        Carrega estantes, livros, capítulos e páginas no índice local
+        
+        Depois disso create_page atualiza páginas já migradas em vez de duplicá-las.
+        
+        Args:
+            progress_callback: Chamado com (tipo, quantidade) ao fim de cada tipo
+            
+        Returns:
+            Quantidade indexada por tipo
+        """
+        index = BookStackIndex()
+        counts = index.prefetch(self, progress_callback)
+        self.index = index
+        return counts
+    
+    def find_existing_page(self, data: Dict) -> Optional[Dict]:
+        """
+        Página já existente para os dados informados (pela tag de origem ou pelo nome no destino)
+        
+        Returns:
+            Registro do índice, ou None (também quando não há índice carregado)
+        """
+        if self.index is None:
+            return None
+        return self.index.find_page(
+            source_id=source_id_from_tags(data.get('tags'), self.index.source_tag),
+            name=data.get('name'),
+            book_id=data.get('book_id'),
+            chapter_id=data.get('chapter_id')
+        )
     
-    def create_page(self, data: Dict) -> Dict:
+    def create_page(self, data: Dict, upsert: bool = True) -> Dict:
         """
-        Cria uma nova página
+        Cria uma nova página (ou atualiza a existente, se o índice estiver carregado)
         
         Args:
             data: Dicionário com dados da página (name, html/markdown, book_id/chapter_id, etc.)
+            upsert: Atualizar a página já existente (mesma tag de origem ou mesmo nome no destino)
             
         Returns:
-            Dados da página criada
+            Dados da página criada ou atualizada
         """
         # Validação básica
         if 'name' not in data:
@@ -431,9 +595,18 @@ class BookStackClient:
         if 'html' not in data and 'markdown' not in data:
             raise ValueError("html ou markdown é obrigatório")
         
+        existing = self.find_existing_page(data) if upsert else None
+        
         try:
-            response = self._make_request('POST', '/pages', data=data)
-            return response.get('data', {})
+            if existing:
+                print(f"♻️ Página '{data['name']}' já existe no BookStack (ID: {existing['id']}), atualizando")
+                page = self.update_page(existing['id'], data)
+            else:
+                page = self._unwrap(self._make_request('POST', '/pages', data=data))
+            
+            if self.index is not None and page.get('id'):
+                self.index.add_page({**data, **page})
+            return page
         except Exception as e:
             error_message = str(e)
             
@@ -500,21 +673,15 @@ class BookStackClient:
                     'type': (None, image_type)
                 }
                 
-                # Para upload, não usar JSON headers
-                headers = {
-                    'Authorization': f'Token {self.token_id}:{self.token_secret}',
-                    'Accept': 'application/json'
-                }
-                
-                response = requests.post(
+                # Para upload, não usar o Content-Type JSON da sessão (multipart é gerado pelo requests)
+                response = self._send_with_retry(
+                    'POST',
                     f"{self.api_base}/image-gallery",
                     files=files,
-                    headers=headers,
-                    verify=self.verify_ssl
+                    headers={'Content-Type': None}
                 )
                 
-                response.raise_for_status()
-                return response.json().get('data', {})
+                return self._unwrap(response.json())
                 
         except Exception as e:
             raise Exception(f"Erro ao fazer upload da imagem: {str(e)}")
@@ -573,20 +740,14 @@ class BookStackClient:
                     'uploaded_to': (None, str(page_id))
                 }
                 
-                headers = {
-                    'Authorization': f'Token {self.token_id}:{self.token_secret}',
-                    'Accept': 'application/json'
-                }
-                
-                response = requests.post(
+                response = self._send_with_retry(
+                    'POST',
                     f"{self.api_base}/attachments",
                     files=files,
-                    headers=headers,
-                    verify=self.verify_ssl
+                    headers={'Content-Type': None}
                 )
                 
-                response.raise_for_status()
-                return response.json().get('data', {})
+                return self._unwrap(response.json())
                 
         except Exception as e:
             raise Exception(f"Erro ao criar anexo: {str(e)}")
@@ -603,7 +764,7 @@ class BookStackClient:
             Dados da página atualizada
         """
         response = self._make_request('PUT', f'/pages/{page_id}', data=data)
-        return response.get('data', {})
+        return self._unwrap(response)
     
     def delete_page(self, page_id: int) -> bool:
         """
@@ -632,7 +793,7 @@ class BookStackClient:
             Dados da página
         """
         response = self._make_request('GET', f'/pages/{page_id}')
-        return response.get('data', {})
+        return self._unwrap(response)
     
     def _get_user_info_alternative(self) -> Dict:
         """
@@ -0,0 +1,250 @@
+"""
+Índice local da estrutura do BookStack
+
+Carrega estantes, livros, capítulos e páginas uma vez, página a página, e
+os indexa em memória por nome, slug e pela tag de origem do MediaWiki
+(mediawiki_pageid, gravada pelo pipeline de migração). Com ele, o cliente
+decide em O(1) se uma página da wiki já existe no BookStack e a atualiza
+em vez de criar uma duplicata quando a migração é executada de novo.
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+SOURCE_TAG = 'mediawiki_pageid'
+
+
+def _name_key(name: str) -> str:
+    return (name or '').strip().casefold()
+
+
+def source_id_from_tags(tags: Iterable[Dict], tag_name: str = SOURCE_TAG) -> Optional[str]:
+    """Valor da tag de origem numa lista de tags do BookStack (None se ausente)"""
+    for tag in tags or ():
+        if tag.get('name') == tag_name and tag.get('value') not in (None, ''):
+            return str(tag['value'])
+    return None
+
+
+class BookStackIndex:
+    """Estrutura do BookStack indexada em memória (thread-safe)"""
+
+    def __init__(self, source_tag: str = SOURCE_TAG):
+        """
+        Inicializa o índice vazio
+
+        Args:
+            source_tag: Tag que guarda o ID da página de origem no MediaWiki
+        """
+        self.source_tag = source_tag
+        self.shelves: Dict[int, Dict] = {}
+        self.books: Dict[int, Dict] = {}
+        self.chapters: Dict[int, Dict] = {}
+        self.pages: Dict[int, Dict] = {}
+
+        self._by_name: Dict[Tuple, int] = {}   # (tipo, contêiner, nome) -> id
+        self._by_slug: Dict[Tuple, int] = {}   # (tipo, livro, slug) -> id
+        self._page_by_source: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.loaded = False
+
+    # ------------------------------------------------------------------
+    # Carga
+    # ------------------------------------------------------------------
+
+    def prefetch(self, client, progress_callback: Callable[[str, int], None] = None) -> Dict[str, int]:
+        """
+        Carrega toda a estrutura usando as listagens paginadas do cliente
+
+        Os itens são indexados à medida que chegam; só uma página de
+        resultados fica em trânsito por vez.
+
+        Args:
+            client: BookStackClient
+            progress_callback: Chamado com (tipo, itens indexados) ao fim de cada tipo
+
+        Returns:
+            Quantidade indexada por tipo (e páginas com tag de origem em 'tagged')
+        """
+        counts = {}
+        sources = (
+            ('shelves', '/shelves', self.add_shelf),
+            ('books', '/books', self.add_book),
+            ('chapters', '/chapters', self.add_chapter),
+            ('pages', '/pages', self.add_page),
+        )
+        for kind, endpoint, add in sources:
+            counts[kind] = 0
+            for item in client.iter_list(endpoint, {'sort': '+id'}):
+                add(item)
+                counts[kind] += 1
+            if progress_callback:
+                progress_callback(kind, counts[kind])
+
+        # As listagens não trazem tags: a busca por tag traz, só para as páginas migradas
+        counts['tagged'] = 0
+        for result in client.iter_search(f"[{self.source_tag}] {{type:page}}"):
+            if result.get('type', 'page') == 'page':
+                source_id = source_id_from_tags(result.get('tags'), self.source_tag)
+                if source_id is not None:
+                    self.add_page(result, source_id)
+                    counts['tagged'] += 1
+        if progress_callback:
+            progress_callback('tagged', counts['tagged'])
+
+        self.loaded = True
+        return counts
+
+    # ------------------------------------------------------------------
+    # Inclusão
+    # ------------------------------------------------------------------
+
+    def _add(self, kind: str, table: Dict[int, Dict], item: Dict, container, book_id=None):
+        previous = table.get(item['id'])
+        if previous is not None:
+            self._forget(kind, previous, container_of=self._container_of(kind, previous),
+                         book_id=previous.get('book_id'))
+        table[item['id']] = item
+        self._by_name.setdefault((kind, container, _name_key(item.get('name'))), item['id'])
+        if item.get('slug'):
+            self._by_slug.setdefault((kind, book_id, item['slug']), item['id'])
+
+    def _forget(self, kind: str, item: Dict, container_of, book_id=None):
+        name_key = (kind, container_of, _name_key(item.get('name')))
+        if self._by_name.get(name_key) == item['id']:
+            del self._by_name[name_key]
+        slug_key = (kind, book_id, item.get('slug'))
+        if self._by_slug.get(slug_key) == item['id']:
+            del self._by_slug[slug_key]
+
+    @staticmethod
+    def _container_of(kind: str, item: Dict):
+        if kind == 'page':
+            return ('chapter', item['chapter_id']) if item.get('chapter_id') else ('book', item.get('book_id'))
+        if kind == 'chapter':
+            return ('book', item.get('book_id'))
+        return None
+
+    def add_shelf(self, shelf: Dict):
+        with self._lock:
+            self._add('shelf', self.shelves, _compact(shelf), None)
+
+    def add_book(self, book: Dict):
+        with self._lock:
+            self._add('book', self.books, _compact(book), None)
+
+    def add_chapter(self, chapter: Dict):
+        chapter = _compact(chapter)
+        with self._lock:
+            self._add('chapter', self.chapters, chapter, self._container_of('chapter', chapter), chapter.get('book_id'))
+
+    def add_page(self, page: Dict, source_id: Optional[str] = None):
+        """
+        Indexa (ou atualiza) uma página
+
+        Args:
+            page: Página como retornada pela API (listagem, busca ou criação)
+            source_id: ID de origem no MediaWiki (lido das tags se não informado)
+        """
+        if source_id is None:
+            source_id = source_id_from_tags(page.get('tags'), self.source_tag)
+        with self._lock:
+            previous = self.pages.get(page['id'])
+            if source_id is None and previous is not None:
+                source_id = previous.get('source_id')
+            record = _compact(page)
+            # A busca não informa o capítulo: preservar o que a listagem trouxe
+            if previous is not None and 'chapter_id' not in page:
+                record['chapter_id'] = previous.get('chapter_id')
+            record['source_id'] = source_id
+            if previous is not None and previous.get('source_id') not in (None, source_id) \
+                    and self._page_by_source.get(previous['source_id']) == page['id']:
+                del self._page_by_source[previous['source_id']]
+            self._add('page', self.pages, record, self._container_of('page', record), record.get('book_id'))
+            if source_id is not None:
+                self._page_by_source[source_id] = record['id']
+
+    def remove_page(self, page_id: int):
+        with self._lock:
+            page = self.pages.pop(page_id, None)
+            if page is None:
+                return
+            self._forget('page', page, self._container_of('page', page), page.get('book_id'))
+            if page.get('source_id') is not None and self._page_by_source.get(page['source_id']) == page_id:
+                del self._page_by_source[page['source_id']]
+
+    # ------------------------------------------------------------------
+    # Consulta (O(1))
+    # ------------------------------------------------------------------
+
+    def find_book(self, name: str = None, slug: str = None) -> Optional[Dict]:
+        with self._lock:
+            book_id = self._by_slug.get(('book', None, slug)) if slug else self._by_name.get(('book', None, _name_key(name)))
+            return self.books.get(book_id)
+
+    def find_shelf(self, name: str = None, slug: str = None) -> Optional[Dict]:
+        with self._lock:
+            shelf_id = self._by_slug.get(('shelf', None, slug)) if slug else self._by_name.get(('shelf', None, _name_key(name)))
+            return self.shelves.get(shelf_id)
+
+    def find_chapter(self, book_id: int, name: str = None, slug: str = None) -> Optional[Dict]:
+        with self._lock:
+            if slug:
+                chapter_id = self._by_slug.get(('chapter', book_id, slug))
+            else:
+                chapter_id = self._by_name.get(('chapter', ('book', book_id), _name_key(name)))
+            return self.chapters.get(chapter_id)
+
+    def find_page(self, source_id=None, name: str = None, book_id: int = None,
+                  chapter_id: int = None, slug: str = None) -> Optional[Dict]:
+        """
+        Localiza uma página pela tag de origem ou, sem ela, pelo nome/slug no destino
+
+        Uma página encontrada por nome que tenha outra origem não é considerada
+        a mesma página (dois títulos iguais vindos de páginas diferentes da wiki).
+
+        Args:
+            source_id: ID da página no MediaWiki
+            name: Nome da página
+            book_id: Livro de destino
+            chapter_id: Capítulo de destino (tem precedência sobre o livro)
+            slug: Slug da página (no livro)
+        """
+        with self._lock:
+            if source_id is not None:
+                page_id = self._page_by_source.get(str(source_id))
+                if page_id is not None:
+                    return self.pages.get(page_id)
+
+            if chapter_id is not None and book_id is None:
+                book_id = self.chapters.get(chapter_id, {}).get('book_id')
+            page_id = None
+            if name is not None and (chapter_id is not None or book_id is not None):
+                container = ('chapter', chapter_id) if chapter_id is not None else ('book', book_id)
+                page_id = self._by_name.get(('page', container, _name_key(name)))
+            if page_id is None and slug and book_id is not None:
+                page_id = self._by_slug.get(('page', book_id, slug))
+
+            page = self.pages.get(page_id)
+            if page is not None and source_id is not None and page.get('source_id') not in (None, str(source_id)):
+                return None
+            return page
+
+    def get_statistics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'shelves': len(self.shelves),
+                'books': len(self.books),
+                'chapters': len(self.chapters),
+                'pages': len(self.pages),
+                'tagged_pages': len(self._page_by_source)
+            }
+
+
+# Campos mantidos no índice (o restante das respostas da API é descartado)
+_KEPT_FIELDS = ('id', 'name', 'slug', 'book_id', 'chapter_id', 'priority')
+
+
+def _compact(item: Dict) -> Dict:
+    return {key: item[key] for key in _KEPT_FIELDS if key in item}
+
@@ -0,0 +1,70 @@
+"""
+Armazenamento do conteúdo das páginas fora do catálogo
+
+O pages_cache.json guarda só metadados; o corpo de cada página fica num
+arquivo comprimido (zlib) próprio, com caminho derivado do pageid e
+descrito no catálogo por 'content_ref'. O arquivo só é lido quando
+get_page_content é chamado.
+"""
+
+import os
+import zlib
+from typing import Dict, Optional
+
+
+class ContentStore:
+    """Arquivos comprimidos por página, distribuídos em subdiretórios"""
+
+    def __init__(self, directory: str, compression_level: int = 6):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            directory: Diretório base dos arquivos de conteúdo
+            compression_level: Nível de compressão zlib (1-9)
+        """
+        self.directory = directory
+        self.compression_level = compression_level
+
+    @staticmethod
+    def _relative_path(pageid: int) -> str:
+        # 256 subdiretórios evitam diretórios com 100k arquivos
+        return os.path.join(f"{int(pageid) % 256:02x}", f"{pageid}.zlib")
+
+    def put(self, pageid: int, content: str) -> Dict:
+        """
+        Grava o conteúdo de uma página
+
+        Args:
+            pageid: ID da página
+            content: Conteúdo (wikitext) da página
+
+        Returns:
+            Referência a ser guardada no catálogo ('content_ref')
+        """
+        relative_path = self._relative_path(pageid)
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        data = zlib.compress(content.encode('utf-8'), self.compression_level)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+        return {'file': relative_path.replace(os.sep, '/'), 'size': len(content), 'stored': len(data)}
+
+    def get(self, pageid: int) -> Optional[str]:
+        """Lê e descomprime o conteúdo de uma página (None se não houver)"""
+        path = os.path.join(self.directory, self._relative_path(pageid))
+        try:
+            with open(path, 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def delete(self, pageid: int):
+        """Remove o conteúdo de uma página, se existir"""
+        path = os.path.join(self.directory, self._relative_path(pageid))
+        if os.path.exists(path):
+            os.remove(path)
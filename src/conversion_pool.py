@@ -0,0 +1,211 @@
+"""
+Estágio de conversão paralelo com pool de processos
+
+Expansão de templates, parsing e renderização são CPU-bound e, na thread
+da GUI, ficam presos ao GIL. Este estágio distribui lotes de páginas para
+um ProcessPoolExecutor e devolve os resultados em ordem de conclusão.
+"""
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from src.template_expander import LocalTemplateExpander
+
+
+# Estado de cada processo worker, montado uma única vez pelo initializer
+_worker_state = {}
+
+
+def _create_renderer(image_urls: Dict[str, str]):
+    if _worker_state['output_format'] == 'markdown':
+        from src.markdown_writer import WikitextMarkdownWriter
+        return WikitextMarkdownWriter(image_urls, wiki_base_url=_worker_state['wiki_base_url'])
+    from src.html_renderer import WikitextHtmlRenderer
+    return WikitextHtmlRenderer(image_urls, wiki_base_url=_worker_state['wiki_base_url'])
+
+
+def _init_worker(template_sources: Dict[str, Optional[str]], image_urls: Dict[str, str],
+                 wiki_base_url: str, output_format: str, image_placeholder: Optional[str] = None,
+                 expand_templates: bool = True):
+    """Initializer do processo: monta expansor, parser e renderizador uma vez por worker"""
+    from src.wikitext_parser import WikitextParser
+
+    _worker_state['sources'] = template_sources
+    _worker_state['expander'] = LocalTemplateExpander(template_sources.get) if expand_templates else None
+    _worker_state['parser'] = WikitextParser()
+    _worker_state['output_format'] = output_format
+    _worker_state['wiki_base_url'] = wiki_base_url
+    _worker_state['image_placeholder'] = image_placeholder
+    _worker_state['renderer'] = _create_renderer(image_urls)
+
+
+def _add_template_sources(sources: Dict[str, Optional[str]]):
+    """Incorpora templates enviados com a página (árvores antigas desses nomes são descartadas)"""
+    known = _worker_state['sources']
+    expander = _worker_state['expander']
+    for name, source in sources.items():
+        if known.get(name) != source:
+            known[name] = source
+            if expander is not None:
+                expander.invalidate_template(name)
+
+
+def _convert_page(page: Dict) -> Dict:
+    """Expande, parseia e renderiza uma página dentro do worker"""
+    expander = _worker_state['expander']
+    parser = _worker_state['parser']
+    renderer = _worker_state['renderer']
+
+    title = page.get('title', '')
+    result = {'title': title, 'pageid': page.get('pageid')}
+    try:
+        if page.get('template_sources'):
+            _add_template_sources(page['template_sources'])
+        wikitext = page.get('wikitext', '')
+        expanded = expander.expand(wikitext, title) if expander is not None else wikitext
+        parsed = parser.parse_wikitext(expanded, title, page.get('categories'))
+        if _worker_state['image_placeholder'] is not None:
+            # Imagens ainda não enviadas: marcadores <prefixo>N.img, trocados depois pelas URLs
+            result['placeholders'] = {
+                image['name']: f"{_worker_state['image_placeholder']}{index}.img"
+                for index, image in enumerate(parsed.get('images', []))
+            }
+            renderer = _create_renderer(result['placeholders'])
+        if _worker_state['output_format'] == 'markdown':
+            result['markdown'] = renderer.to_markdown(expanded)
+        else:
+            result['html'] = renderer.render(expanded)
+        result['parsed'] = parsed.to_dict()  # campos sob demanda (e parse_error) calculados antes do pickle
+        result['error'] = None
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def _convert_chunk(pages: List[Dict]) -> List[Dict]:
+    """Converte um lote de páginas (um único envio/retorno por pickle)"""
+    return [_convert_page(page) for page in pages]
+
+
+class ConversionPool:
+    """Pool de processos para conversão de páginas em lotes"""
+
+    def __init__(self, max_workers: int = None, chunk_size: int = 8,
+                 template_sources: Dict[str, Optional[str]] = None,
+                 image_urls: Dict[str, str] = None, wiki_base_url: str = "",
+                 output_format: str = 'html', image_placeholder: Optional[str] = None,
+                 expand_templates: bool = True):
+        """
+        Inicializa o pool
+
+        Args:
+            max_workers: Número de processos (padrão: núcleos disponíveis)
+            chunk_size: Páginas por lote enviado a um worker
+            template_sources: Snapshot nome -> wikitext dos templates (ex: template_source_cache)
+            image_urls: Mapa nome do arquivo -> URL da imagem no BookStack
+            wiki_base_url: URL base da wiki para links não mapeados
+            output_format: 'html' ou 'markdown'
+            image_placeholder: Prefixo de marcadores de imagem; quando informado, cada
+                página é renderizada com <prefixo>N.img no lugar das imagens e o mapa
+                nome -> marcador vem em 'placeholders' (image_urls é ignorado)
+            expand_templates: False para renderizar o wikitext sem expandir templates
+        """
+        if output_format not in ('html', 'markdown'):
+            raise ValueError(f"Formato de saída inválido: {output_format}")
+
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self._initargs = (dict(template_sources or {}), dict(image_urls or {}), wiki_base_url, output_format,
+                          image_placeholder, expand_templates)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     initializer=_init_worker,
+                                                     initargs=self._initargs)
+            return self._executor
+
+    def _chunks(self, pages: Iterable[Dict]) -> Iterator[List[Dict]]:
+        chunk = []
+        for page in pages:
+            chunk.append(page)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def convert(self, pages: Iterable[Dict], progress_callback: Callable[[int], None] = None) -> Iterator[Dict]:
+        """
+        Converte páginas em paralelo, produzindo resultados em ordem de conclusão
+
+        Args:
+            pages: Páginas com 'title', 'wikitext' e opcionalmente 'categories'/'pageid'
+            progress_callback: Chamado com o total de páginas concluídas
+
+        Yields:
+            Dict com 'title', 'pageid', 'html' ou 'markdown', 'parsed' e 'error'
+            (e 'placeholders' com image_placeholder)
+        """
+        executor = self._get_executor()
+        # Limita lotes em voo para não materializar toda a entrada na memória
+        max_pending = self.max_workers * 2
+        pending = set()
+        completed = 0
+        chunks = self._chunks(pages)
+        exhausted = False
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(_convert_chunk, chunk))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    completed += 1
+                    yield result
+                if progress_callback:
+                    progress_callback(completed)
+
+    def convert_page(self, page: Dict) -> Dict:
+        """
+        Converte uma única página num worker do pool (bloqueia a thread atual)
+
+        Várias threads podem chamar ao mesmo tempo; cada página ocupa um worker.
+
+        Args:
+            page: Página com 'title', 'wikitext' e opcionalmente 'categories', 'pageid'
+                e 'template_sources' (templates a incorporar ao snapshot do worker)
+
+        Returns:
+            Mesmo formato dos resultados de convert
+        """
+        return self._get_executor().submit(_convert_chunk, [page]).result()[0]
+
+    def convert_all(self, pages: Iterable[Dict]) -> List[Dict]:
+        """Converte páginas e retorna todos os resultados (ordem de conclusão)"""
+        return list(self.convert(pages))
+
+    def shutdown(self):
+        """Encerra os processos do pool"""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
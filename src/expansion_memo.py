@@ -0,0 +1,99 @@
+"""
+Memoização de resultados de expansão de templates
+
+A mesma chamada (ex: {{Status|done}}) aparece milhares de vezes numa wiki.
+Este memo LRU limitado guarda o resultado por (template, revisão,
+parâmetros canonizados) para que cada combinação seja expandida uma única
+vez por execução, tanto na expansão local quanto na expansão via API.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+def source_revision(source: str) -> str:
+    """Identificador de revisão de um template a partir do seu wikitext"""
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]
+
+
+class ExpansionMemo:
+    """Memo LRU limitado de expansões de templates"""
+
+    def __init__(self, max_entries: int = 20000):
+        """
+        Inicializa o memo
+
+        Args:
+            max_entries: Número máximo de expansões mantidas em memória
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores expostos em get_stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(template_name: str, revision: str, params: Dict[str, str],
+                 context: Optional[str] = None, kind: str = 'local') -> Tuple:
+        """
+        Monta a chave canônica de uma expansão
+
+        Args:
+            template_name: Nome normalizado do template
+            revision: Revisão (hash) do conteúdo do template
+            params: Parâmetros já expandidos, com os posicionais pelo número ('1', '2', ...,
+                como o mwparserfromhell os nomeia): {{X|a}} e {{X|1=a}} geram a mesma
+                chave. Só o nome é normalizado; o valor posicional mantém os espaços
+                ({{X| a }} difere de {{X|1= a }}, como no MediaWiki)
+            context: Título da página, apenas para templates que dependem dela
+            kind: Caminho de expansão ('local' ou 'api')
+
+        Returns:
+            Tupla utilizável como chave do memo
+        """
+        canonical = tuple(sorted((str(name).strip(), value) for name, value in params.items()))
+        return (kind, template_name, revision, canonical, context)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna a expansão memorizada (ou None) e atualiza a ordem LRU"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Armazena uma expansão, descartando a menos usada se necessário"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Descarta todas as expansões e zera os contadores"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas de uso do memo"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0
+            }
@@ -0,0 +1,81 @@
+"""
+Lock de arquivo entre processos
+
+Usa flock (Linux/macOS) ou msvcrt.locking (Windows) sobre um arquivo
+.lock ao lado do arquivo protegido. O lock é do sistema operacional:
+é liberado automaticamente se o processo morrer.
+"""
+
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Lock exclusivo entre processos, usado como context manager"""
+
+    def __init__(self, lock_file: str, timeout: float = 30.0, poll_interval: float = 0.05):
+        """
+        Inicializa o lock
+
+        Args:
+            lock_file: Caminho do arquivo de lock (criado se não existir)
+            timeout: Segundos de espera pelo lock antes de desistir
+            poll_interval: Intervalo entre tentativas
+        """
+        self.lock_file = lock_file
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._handle = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self):
+        """Adquire o lock, esperando até o timeout (TimeoutError se esgotar)"""
+        directory = os.path.dirname(self.lock_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._handle = open(self.lock_file, 'a+')
+
+        deadline = time.monotonic() + self.timeout
+        while not self._try_lock():
+            if time.monotonic() >= deadline:
+                self._handle.close()
+                self._handle = None
+                raise TimeoutError(f"Lock {self.lock_file} ocupado por mais de {self.timeout:g}s")
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        """Libera o lock"""
+        if self._handle is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self._handle.seek(0)
+                msvcrt.locking(self._handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._handle.close()
+            self._handle = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
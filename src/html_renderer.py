@@ -0,0 +1,557 @@
+"""
+Renderizador local de wikitext para HTML do BookStack
+
+Converte a árvore do mwparserfromhell em HTML sem depender de action=parse
+no servidor da wiki: cabeçalhos, listas, tabelas, links, negrito/itálico,
+<pre>/<code>, referências e imagens apontando para URLs já enviadas à
+galeria do BookStack.
+"""
+
+import html
+import re
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote
+
+import mwparserfromhell
+from mwparserfromhell.nodes import (Argument, Comment, ExternalLink, Heading, HTMLEntity,
+                                    Tag, Template, Text, Wikilink)
+
+from src.wikitext_parser import BEHAVIOR_SWITCH_PATTERN, CATEGORY_NAMESPACES, FILE_NAMESPACES, split_namespace
+
+
+# Marcadores de lista do wikitext -> (tag da lista, tag do item)
+LIST_MARKUP = {'*': ('ul', 'li'), '#': ('ol', 'li'), ';': ('dl', 'dt'), ':': ('dl', 'dd')}
+
+# Tags HTML mantidas como estão no conteúdo inline
+INLINE_TAGS = {
+    'b', 'i', 'u', 's', 'strike', 'del', 'ins', 'sub', 'sup', 'small', 'big',
+    'span', 'abbr', 'mark', 'q', 'cite', 'em', 'strong', 'var', 'kbd', 'samp',
+    'code', 'tt', 'font',
+}
+
+# Tags renderizadas como blocos
+BLOCK_TAGS = {'div', 'blockquote', 'center', 'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'p', 'gallery'}
+
+CODE_TAGS = {'syntaxhighlight', 'source'}
+
+# Atributos preservados nas tags geradas
+SAFE_ATTRIBUTES = {
+    'class', 'style', 'id', 'title', 'colspan', 'rowspan', 'align',
+    'width', 'height', 'lang', 'dir', 'start', 'type',
+}
+
+# Opções de imagem do MediaWiki (inglês e português)
+IMAGE_FRAME_OPTIONS = {'thumb', 'thumbnail', 'frame', 'framed', 'frameless', 'miniatura', 'mini', 'border'}
+IMAGE_ALIGN_OPTIONS = {
+    'left': 'left', 'esquerda': 'left', 'right': 'right', 'direita': 'right',
+    'center': 'center', 'centro': 'center', 'none': None, 'nenhum': None,
+}
+_IMAGE_SIZE_PATTERN = re.compile(r'^(\d*)(?:x(\d+))?\s*px$')
+
+
+def split_link_options(text: str) -> List[str]:
+    """Divide o texto de um link em '|' de nível superior (ignora [[...]] e {{...}} internos)"""
+    parts, depth, start, i = [], 0, 0, 0
+    while i < len(text):
+        pair = text[i:i + 2]
+        if pair in ('[[', '{{'):
+            depth += 1
+            i += 2
+            continue
+        if pair in (']]', '}}') and depth:
+            depth -= 1
+            i += 2
+            continue
+        if text[i] == '|' and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+        i += 1
+    parts.append(text[start:])
+    return parts
+
+
+def parse_image_options(options: List[str]) -> Dict:
+    """Interpreta as opções de [[Arquivo:...|...]]: moldura, alinhamento, tamanho e legenda"""
+    info = {'frame': False, 'align': None, 'width': None, 'height': None,
+            'alt': None, 'link': None, 'caption': ''}
+    for option in options:
+        key = option.strip()
+        lower = key.lower()
+        size = _IMAGE_SIZE_PATTERN.match(lower)
+        if lower in IMAGE_FRAME_OPTIONS:
+            info['frame'] = True
+        elif lower in IMAGE_ALIGN_OPTIONS:
+            info['align'] = IMAGE_ALIGN_OPTIONS[lower]
+        elif size:
+            info['width'] = size.group(1) or None
+            info['height'] = size.group(2)
+        elif lower.startswith('alt='):
+            info['alt'] = key[4:]
+        elif lower.startswith('link='):
+            info['link'] = key[5:]
+        elif lower in ('upright', 'baseline', 'middle', 'top', 'bottom') or lower.startswith('upright='):
+            continue
+        else:
+            info['caption'] = key  # a última opção livre é a legenda
+    return info
+
+
+def normalize_file_name(name: str) -> str:
+    """Normaliza nome de arquivo para busca no mapa de imagens enviadas"""
+    name = re.sub(r'[_\s]+', ' ', name).strip()
+    return name[:1].upper() + name[1:]
+
+
+class _Line:
+    """Linha lógica do wikitext durante a renderização"""
+
+    __slots__ = ('prefix', 'parts', 'block', 'pre')
+
+    def __init__(self, block: str = None):
+        self.prefix = ''
+        self.parts = []
+        self.block = block
+        self.pre = False
+
+    def is_empty(self) -> bool:
+        return not self.prefix and not ''.join(self.parts).strip()
+
+
+class WikitextHtmlRenderer:
+    """Renderizador de wikitext para HTML compatível com o BookStack"""
+
+    def __init__(self, image_urls: Dict[str, str] = None,
+                 link_resolver: Callable[[str], Optional[str]] = None,
+                 wiki_base_url: str = ""):
+        """
+        Inicializa o renderizador
+
+        Args:
+            image_urls: Mapa nome do arquivo -> URL da imagem na galeria do BookStack
+            link_resolver: Função título da wiki -> URL no BookStack (ou None)
+            wiki_base_url: URL base da wiki, usada para links e imagens não mapeados
+        """
+        self.image_urls = {normalize_file_name(k): v for k, v in (image_urls or {}).items()}
+        self.link_resolver = link_resolver
+        self.wiki_base_url = wiki_base_url.rstrip('/')
+
+        # Estado da renderização atual
+        self.categories = []
+        self._references = []
+        self._references_rendered = 0
+
+    def render(self, wikitext) -> str:
+        """
+        Converte wikitext (ou Wikicode já parseado) em HTML
+
+        Args:
+            wikitext: Texto em formato MediaWiki
+
+        Returns:
+            HTML pronto para o campo 'html' de uma página do BookStack
+        """
+        wikicode = mwparserfromhell.parse(wikitext) if isinstance(wikitext, str) else wikitext
+        self.categories = []
+        self._references = []
+        self._references_rendered = 0
+
+        output = self._render_blocks(wikicode)
+
+        # Referências sem <references/> explícito vão para o final
+        if len(self._references) > self._references_rendered:
+            output += '\n' + self._render_references()
+        return output
+
+    # ------------------------------------------------------------------
+    # Blocos
+    # ------------------------------------------------------------------
+
+    def _render_blocks(self, wikicode, inline_start: bool = False) -> str:
+        """
+        Renderiza um trecho de wikitext com parágrafos, listas e blocos
+
+        Args:
+            wikicode: Trecho parseado
+            inline_start: O trecho começa no meio de uma linha (ex: célula de
+                tabela), então a primeira linha nunca é pré-formatada
+        """
+        lines = self._collect_lines(wikicode.nodes)
+        if inline_start and lines:
+            lines[0].pre = False
+
+        output = []
+        paragraph = []
+        preformatted = []
+        list_stack = []
+
+        def close_paragraph():
+            if paragraph:
+                output.append('<p>' + '\n'.join(paragraph).strip() + '</p>')
+                paragraph.clear()
+            if preformatted:
+                output.append('<pre>' + '\n'.join(preformatted) + '</pre>')
+                preformatted.clear()
+
+        def close_lists(depth: int = 0):
+            while len(list_stack) > depth:
+                list_tag, item_tag = LIST_MARKUP[list_stack.pop()]
+                output.append(f'</{item_tag}></{list_tag}>')
+
+        for line in lines:
+            content = ''.join(line.parts)
+            if line.block is not None:
+                close_paragraph()
+                close_lists()
+                output.append(line.block)
+            elif line.prefix:
+                close_paragraph()
+                output.append(self._render_list_item(line.prefix, content.strip(), list_stack, close_lists))
+            elif line.pre:
+                close_lists()
+                if paragraph:
+                    close_paragraph()
+                preformatted.append(content[1:] if content.startswith(' ') else content)
+            elif line.is_empty():
+                close_paragraph()
+                close_lists()
+            else:
+                close_lists()
+                if preformatted:
+                    close_paragraph()
+                paragraph.append(content)
+
+        close_paragraph()
+        close_lists()
+        return '\n'.join(part for part in output if part)
+
+    @staticmethod
+    def _render_list_item(prefix: str, content: str, list_stack: List[str], close_lists) -> str:
+        """Abre/fecha listas aninhadas conforme o prefixo (*, #, ;, :) da linha"""
+        def same_list(a, b):
+            return a == b or (a in ';:' and b in ';:')
+
+        common = 0
+        while (common < min(len(list_stack), len(prefix))
+               and same_list(list_stack[common], prefix[common])):
+            common += 1
+
+        # Fechar os níveis mais profundos que não continuam nesta linha
+        if len(list_stack) > common:
+            close_lists(common)
+
+        output = []
+        if len(prefix) == common and list_stack:
+            # Item irmão no mesmo nível
+            output.append(f'</{LIST_MARKUP[list_stack[-1]][1]}>')
+            list_stack[-1] = prefix[-1]
+            output.append(f'<{LIST_MARKUP[prefix[-1]][1]}>')
+        else:
+            for marker in prefix[common:]:
+                list_tag, item_tag = LIST_MARKUP[marker]
+                output.append(f'<{list_tag}><{item_tag}>')
+                list_stack.append(marker)
+
+        output.append(content)
+        return ''.join(output)
+
+    def _collect_lines(self, nodes) -> List[_Line]:
+        """Agrupa os nós em linhas lógicas, separando os elementos de bloco"""
+        lines = []
+        current = _Line()
+
+        def new_line():
+            nonlocal current
+            lines.append(current)
+            current = _Line()
+
+        def add_block(block_html: str):
+            if not current.is_empty():
+                new_line()
+            lines.append(_Line(block=block_html))
+
+        for node in nodes:
+            if isinstance(node, Text):
+                value = BEHAVIOR_SWITCH_PATTERN.sub('', node.value)
+                for index, chunk in enumerate(value.split('\n')):
+                    if index:
+                        new_line()
+                    if not chunk:
+                        continue
+                    if not current.parts and not current.prefix and chunk.startswith(' ') and chunk.strip():
+                        current.pre = True
+                    current.parts.append(html.escape(chunk, quote=False))
+            elif isinstance(node, Tag) and node.wiki_markup in LIST_MARKUP and str(node.tag) in ('li', 'dt', 'dd'):
+                if not ''.join(current.parts).strip():
+                    current.parts = []
+                    current.prefix += node.wiki_markup
+                elif node.wiki_markup == ':' and current.prefix.endswith(';'):
+                    # "; termo : definição" na mesma linha
+                    prefix = current.prefix[:-1] + ':'
+                    new_line()
+                    current.prefix = prefix
+                else:
+                    current.parts.append(html.escape(node.wiki_markup))
+            elif isinstance(node, Heading):
+                level = min(max(node.level, 1), 6)
+                add_block(f'<h{level}>{self._render_inline_code(node.title).strip()}</h{level}>')
+            elif isinstance(node, Tag) and self._is_block_tag(node):
+                add_block(self._render_block_tag(node))
+            elif isinstance(node, Comment):
+                continue
+            else:
+                current.parts.append(self._render_inline(node))
+
+        lines.append(current)
+        return lines
+
+    @staticmethod
+    def _is_block_tag(tag) -> bool:
+        name = str(tag.tag).strip().lower()
+        return (name in ('table', 'hr', 'pre', 'references') or name in CODE_TAGS
+                or name in BLOCK_TAGS)
+
+    def _render_block_tag(self, tag) -> str:
+        """Renderiza tabelas, <pre>, blocos de código e contêineres"""
+        name = str(tag.tag).strip().lower()
+
+        if name == 'table':
+            return self._render_table(tag)
+        if name == 'hr':
+            return '<hr>'
+        if name == 'references':
+            return self._render_references()
+        if name == 'pre':
+            return f'<pre>{self._raw_contents(tag)}</pre>'
+        if name in CODE_TAGS:
+            language = self._attribute(tag, 'lang')
+            css = f' class="language-{html.escape(language)}"' if language else ''
+            return f'<pre><code{css}>{self._raw_contents(tag)}</code></pre>'
+        if name == 'gallery':
+            return self._render_gallery(tag)
+        if name == 'center':
+            return f'<div style="text-align: center">{self._render_fragment(tag.contents)}</div>'
+        if name in ('ul', 'ol', 'dl', 'li', 'dt', 'dd', 'p'):
+            contents = self._render_fragment(tag.contents) if tag.contents else ''
+            return f'<{name}{self._render_attributes(tag)}>{contents}</{name}>'
+
+        contents = self._render_blocks(tag.contents) if tag.contents else ''
+        return f'<{name}{self._render_attributes(tag)}>{contents}</{name}>'
+
+    def _render_table(self, table) -> str:
+        """Renderiza tabelas em sintaxe wiki ({| ... |}) ou HTML"""
+        output = [f'<table{self._render_attributes(table)}>']
+        implicit_cells = []
+        rows = []
+
+        for node in (table.contents.nodes if table.contents else []):
+            if not isinstance(node, Tag):
+                continue
+            name = str(node.tag).strip().lower()
+            if name == 'caption':
+                output.append(f'<caption>{self._render_inline_code(node.contents).strip()}</caption>')
+            elif name == 'td' and node.wiki_markup == '|' and str(node.contents or '').startswith('+'):
+                # "|+ legenda": o mwparserfromhell entrega como célula iniciada por '+'
+                caption = mwparserfromhell.parse(str(node.contents)[1:])
+                output.append(f'<caption>{self._render_inline_code(caption).strip()}</caption>')
+            elif name == 'tr':
+                rows.append(f'<tr{self._render_attributes(node)}>{self._render_cells(node.contents)}</tr>')
+            elif name in ('td', 'th'):
+                implicit_cells.append(self._render_cell(node))
+            elif name in ('thead', 'tbody', 'tfoot'):
+                rows.append(self._render_table(node)[len('<table>'):-len('</table>')])
+
+        if implicit_cells:
+            rows.insert(0, '<tr>' + ''.join(implicit_cells) + '</tr>')
+
+        output.append('<tbody>' + ''.join(rows) + '</tbody>')
+        output.append('</table>')
+        return ''.join(output)
+
+    def _render_cells(self, contents) -> str:
+        if contents is None:
+            return ''
+        return ''.join(
+            self._render_cell(node) for node in contents.nodes
+            if isinstance(node, Tag) and str(node.tag).strip().lower() in ('td', 'th')
+        )
+
+    def _render_cell(self, cell) -> str:
+        name = str(cell.tag).strip().lower()
+        contents = self._render_fragment(cell.contents) if cell.contents else ''
+        return f'<{name}{self._render_attributes(cell)}>{contents}</{name}>'
+
+    def _render_fragment(self, wikicode) -> str:
+        """Renderiza blocos e remove o <p> quando há um único parágrafo"""
+        rendered = self._render_blocks(wikicode, inline_start=True).strip()
+        if rendered.startswith('<p>') and rendered.endswith('</p>') and rendered.count('<p>') == 1:
+            rendered = rendered[3:-4]
+        return rendered
+
+    def _render_gallery(self, tag) -> str:
+        images = []
+        for line in str(tag.contents or '').splitlines():
+            if not line.strip():
+                continue
+            name, _, caption = line.partition('|')
+            namespace, file_name = split_namespace(name.strip())
+            images.append(self._render_image(file_name if namespace in FILE_NAMESPACES else name.strip(),
+                                             [caption] if caption else []))
+        return '<p>' + ' '.join(images) + '</p>'
+
+    def _render_references(self) -> str:
+        if not self._references:
+            return ''
+        items = ''.join(
+            f'<li id="ref-{number}">{content}</li>'
+            for number, content in self._references[self._references_rendered:]
+        )
+        start = self._references_rendered + 1
+        self._references_rendered = len(self._references)
+        start_attr = f' start="{start}"' if start > 1 else ''
+        return f'<ol class="references"{start_attr}>{items}</ol>'
+
+    # ------------------------------------------------------------------
+    # Conteúdo inline
+    # ------------------------------------------------------------------
+
+    def _render_inline_code(self, wikicode) -> str:
+        if wikicode is None:
+            return ''
+        return ''.join(self._render_inline(node) for node in wikicode.nodes)
+
+    def _render_inline(self, node) -> str:
+        if isinstance(node, Text):
+            return html.escape(BEHAVIOR_SWITCH_PATTERN.sub('', node.value), quote=False)
+        if isinstance(node, Wikilink):
+            return self._render_wikilink(node)
+        if isinstance(node, ExternalLink):
+            return self._render_external_link(node)
+        if isinstance(node, HTMLEntity):
+            return str(node)
+        if isinstance(node, Tag):
+            return self._render_inline_tag(node)
+        if isinstance(node, Argument):
+            return self._render_inline_code(node.default)
+        if isinstance(node, Heading):
+            return self._render_inline_code(node.title)
+        # Templates não expandidos e comentários não geram HTML
+        if isinstance(node, (Template, Comment)):
+            return ''
+        return html.escape(str(node), quote=False)
+
+    def _render_inline_tag(self, tag) -> str:
+        name = str(tag.tag).strip().lower()
+
+        if tag.wiki_markup == "''":
+            return f'<em>{self._render_inline_code(tag.contents)}</em>'
+        if tag.wiki_markup == "'''":
+            return f'<strong>{self._render_inline_code(tag.contents)}</strong>'
+        if name == 'br':
+            return '<br>'
+        if name == 'nowiki':
+            return self._raw_contents(tag)
+        if name == 'ref':
+            content = self._render_inline_code(tag.contents)
+            self._references.append((len(self._references) + 1, content))
+            number = len(self._references)
+            return f'<sup class="reference"><a href="#ref-{number}">[{number}]</a></sup>'
+        if name in ('code', 'tt'):
+            return f'<code>{self._render_inline_code(tag.contents)}</code>'
+        if name in INLINE_TAGS:
+            if tag.self_closing:
+                return ''
+            return f'<{name}{self._render_attributes(tag)}>{self._render_inline_code(tag.contents)}</{name}>'
+        if self._is_block_tag(tag):
+            return self._render_block_tag(tag)
+
+        # Tags desconhecidas: manter apenas o conteúdo
+        return self._render_inline_code(tag.contents)
+
+    def _render_wikilink(self, link) -> str:
+        target = str(link.title).strip()
+        leading_colon = target.startswith(':')
+        namespace, name = split_namespace(target.lstrip(':'))
+
+        if not leading_colon and namespace in FILE_NAMESPACES:
+            options = split_link_options(str(link.text)) if link.text is not None else []
+            return self._render_image(name, options)
+        if not leading_colon and namespace in CATEGORY_NAMESPACES:
+            self.categories.append(name)
+            return ''
+
+        target = target.lstrip(':')
+        text = self._render_inline_code(link.text) if link.text is not None else html.escape(target, quote=False)
+        return f'<a href="{html.escape(self._resolve_link(target))}">{text}</a>'
+
+    def _resolve_link(self, target: str) -> str:
+        """Resolve destino de um link interno (BookStack, âncora ou wiki original)"""
+        if target.startswith('#'):
+            return '#' + quote(target[1:].strip().replace(' ', '_'))
+        if self.link_resolver:
+            resolved = self.link_resolver(target)
+            if resolved:
+                return resolved
+        page = quote(target.replace(' ', '_'), safe='/:#')
+        if self.wiki_base_url:
+            return f"{self.wiki_base_url}/index.php?title={page}"
+        return page
+
+    def _render_external_link(self, link) -> str:
+        url = str(link.url).strip()
+        text = self._render_inline_code(link.title).strip() if link.title is not None else html.escape(url)
+        return f'<a href="{html.escape(url)}">{text}</a>'
+
+    def _render_image(self, file_name: str, options: List[str]) -> str:
+        """Renderiza [[Arquivo:...]] apontando para a imagem enviada ao BookStack"""
+        info = parse_image_options(options)
+        file_name = normalize_file_name(file_name)
+        url = self.image_urls.get(file_name)
+        caption_html = self._render_inline_code(mwparserfromhell.parse(info['caption'])).strip()
+
+        if not url:
+            if not self.wiki_base_url:
+                label = caption_html or html.escape(file_name, quote=False)
+                return f'<span class="missing-image">{label}</span>'
+            url = f"{self.wiki_base_url}/index.php?title=Special:FilePath/{quote(file_name.replace(' ', '_'))}"
+
+        alt = info['alt'] if info['alt'] is not None else re.sub(r'<[^>]+>', '', caption_html) or file_name
+        attributes = [f'src="{html.escape(url)}"', f'alt="{html.escape(alt)}"']
+        if info['width']:
+            attributes.append(f'width="{info["width"]}"')
+        if info['height']:
+            attributes.append(f'height="{info["height"]}"')
+        if info['align']:
+            attributes.append(f'class="align-{info["align"]}"')
+        image = f'<img {" ".join(attributes)}>'
+
+        if info['link']:
+            image = f'<a href="{html.escape(self._resolve_link(info["link"]))}">{image}</a>'
+        if info['frame'] and caption_html:
+            image += f'<br><em>{caption_html}</em>'
+        return image
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _raw_contents(tag) -> str:
+        return html.escape(str(tag.contents or ''), quote=False)
+
+    @staticmethod
+    def _attribute(tag, name: str) -> Optional[str]:
+        for attribute in tag.attributes:
+            if str(attribute.name).strip().lower() == name:
+                return str(attribute.value).strip() if attribute.value is not None else ''
+        return None
+
+    @staticmethod
+    def _render_attributes(tag) -> str:
+        rendered = []
+        for attribute in tag.attributes:
+            name = str(attribute.name).strip().lower()
+            if name not in SAFE_ATTRIBUTES:
+                continue
+            value = str(attribute.value).strip() if attribute.value is not None else ''
+            rendered.append(f' {name}="{html.escape(value)}"')
+        return ''.join(rendered)
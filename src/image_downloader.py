@@ -13,6 +13,32 @@ import mimetypes
 from typing import List, Dict, Tuple, Optional
 import time
 
+from src.wiki_document import WikiDocument
+
+
+def sanitize_filename(filename: str) -> str:
+    """Sanitiza nome de arquivo para filesystem"""
+    # Remover caracteres inválidos
+    invalid_chars = r'[<>:"/\\|?*\x00-\x1f]'
+    filename = re.sub(invalid_chars, '_', filename)
+
+    # Remover prefixos wiki
+    filename = re.sub(r'^(?:File|Arquivo|Image|Imagem):', '', filename, flags=re.IGNORECASE)
+
+    # Substituir espaços e múltiplos underscores
+    filename = re.sub(r'[_\s]+', '_', filename)
+
+    # Remover underscores do início e fim
+    filename = filename.strip('_')
+
+    # Limitar tamanho
+    if len(filename) > 200:
+        name, ext = os.path.splitext(filename)
+        filename = name[:200-len(ext)] + ext
+
+    return filename or "image"
+
+
 class MediaWikiImageDownloader:
     """Downloader de imagens do MediaWiki"""
     
@@ -49,47 +75,20 @@ class MediaWikiImageDownloader:
         # Cache de URLs de imagens já processadas
         self.image_url_cache = {}
         
-    def extract_images_from_wikitext(self, wikitext: str) -> List[str]:
+    def extract_images_from_wikitext(self, wikitext) -> List[str]:
         """
         Extrai nomes de arquivos de imagem do wikitext
         
         Args:
-            wikitext: Texto wiki da página
+            wikitext: Texto wiki da página (ou WikiDocument já parseado)
             
         Returns:
             Lista de nomes de arquivos de imagem
         """
-        image_names = []
-        
-        # Padrões para encontrar imagens no wikitext
-        patterns = [
-            # [[Arquivo:nome.ext]]
-            r'\[\[(?:Arquivo|File|Image|Imagem):([^\]|]+?)(?:\|[^\]]*?)?\]\]',
-            # [[File:nome.ext|thumb|...]]
-            r'\[\[(?:File|Image):([^\]|]+?)(?:\|[^\]]*?)?\]\]',
-            # {{Arquivo|nome.ext}}
-            r'\{\{(?:Arquivo|File|Image|Imagem):([^}|]+?)(?:\|[^}]*?)?\}\}',
-        ]
-        
-        for pattern in patterns:
-            matches = re.findall(pattern, wikitext, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
-                # Limpar o nome do arquivo
-                filename = match.strip()
-                
-                # Verificar se tem extensão de imagem
-                if self._is_image_file(filename):
-                    image_names.append(filename)
-        
-        # Remover duplicatas mantendo ordem
-        seen = set()
-        unique_images = []
-        for img in image_names:
-            if img not in seen:
-                seen.add(img)
-                unique_images.append(img)
+        document = wikitext if isinstance(wikitext, WikiDocument) else WikiDocument(wikitext)
         
-        return unique_images
+        # Links [[Arquivo:...]]/[[File:...]] vêm da árvore do documento, sem regex
+        return [name for name in document.image_names() if self._is_image_file(name)]
     
     def extract_images_from_html(self, html_content: str) -> List[str]:
         """
@@ -235,7 +234,7 @@ class MediaWikiImageDownloader:
         
         Args:
             page_title: Título da página
-            page_content: Conteúdo da página (dict com wikitext/html)
+            page_content: Conteúdo da página (dict com wikitext/html e, opcionalmente, document)
             output_dir: Diretório de saída
             
         Returns:
@@ -258,9 +257,9 @@ class MediaWikiImageDownloader:
         
         all_images = set()
         
-        # Extrair imagens do wikitext
-        if 'wikitext' in page_content:
-            wikitext_images = self.extract_images_from_wikitext(page_content['wikitext'])
+        # Extrair imagens do wikitext (reaproveitando o documento já parseado, se houver)
+        if 'document' in page_content or 'wikitext' in page_content:
+            wikitext_images = self.extract_images_from_wikitext(page_content.get('document') or page_content['wikitext'])
             all_images.update(wikitext_images)
             print(f"   📝 Wikitext: {len(wikitext_images)} imagens encontradas")
         
@@ -346,25 +345,7 @@ class MediaWikiImageDownloader:
     
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitiza nome de arquivo para filesystem"""
-        # Remover caracteres inválidos
-        invalid_chars = r'[<>:"/\\|?*\x00-\x1f]'
-        filename = re.sub(invalid_chars, '_', filename)
-        
-        # Remover prefixos wiki
-        filename = re.sub(r'^(?:File|Arquivo|Image|Imagem):', '', filename, flags=re.IGNORECASE)
-        
-        # Substituir espaços e múltiplos underscores
-        filename = re.sub(r'[_\s]+', '_', filename)
-        
-        # Remover underscores do início e fim
-        filename = filename.strip('_')
-        
-        # Limitar tamanho
-        if len(filename) > 200:
-            name, ext = os.path.splitext(filename)
-            filename = name[:200-len(ext)] + ext
-        
-        return filename or "image"
+        return sanitize_filename(filename)
     
     def _is_image_file(self, filename: str) -> bool:
         """Verifica se arquivo tem extensão de imagem"""
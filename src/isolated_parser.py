@@ -0,0 +1,282 @@
+"""
+Parsing isolado em processo separado, com limites de tempo e memória
+
+Algumas páginas (tabelas gigantes, templates muito aninhados) fazem o
+mwparserfromhell rodar por minutos ou consumir memória sem limite. Aqui o
+parsing/conversão roda num processo worker persistente: se a página
+estoura o tempo ou a memória, o worker é descartado, a página cai no
+_fallback_parsing, o erro é registrado no cache de páginas e a execução
+segue com um worker novo.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.wikitext_parser import WikitextParser
+
+try:
+    import resource
+except ImportError:  # Windows: sem RLIMIT_AS, resta o monitoramento de RSS
+    resource = None
+
+
+# Intervalo de verificação do worker enquanto a página é processada
+_POLL_INTERVAL = 0.1
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int]):
+    """Loop do processo worker: recebe páginas e devolve resultado ou erro"""
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        try:
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ValueError, OSError):
+            pass
+
+    parser = WikitextParser()
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        try:
+            kind = job['kind']
+            if kind == 'parse':
+                result = parser.parse_wikitext(job['wikitext'], job['title'], job['categories']).to_dict()
+            elif kind == 'html':
+                from src.html_renderer import WikitextHtmlRenderer
+                result = WikitextHtmlRenderer(**job['options']).render(job['wikitext'])
+            elif kind == 'markdown':
+                from src.markdown_writer import WikitextMarkdownWriter
+                result = WikitextMarkdownWriter(**job['options']).to_markdown(job['wikitext'])
+            else:
+                raise ValueError(f"Tipo de tarefa desconhecido: {kind}")
+            conn.send(('ok', result))
+        except MemoryError:
+            # Estado do processo não é confiável após MemoryError: encerrar
+            conn.send(('memory', 'Limite de memória excedido durante o parsing'))
+            break
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    """RSS atual de um processo em MB (Linux, via /proc); None se indisponível"""
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class IsolatedParser:
+    """Executa parsing e conversão de páginas num processo worker com orçamento"""
+
+    def __init__(self, timeout: float = 60.0, memory_limit_mb: int = 1024, pages_cache=None,
+                 parse_cache=None):
+        """
+        Inicializa o parser isolado
+
+        Args:
+            timeout: Tempo máximo (segundos) por página
+            memory_limit_mb: Memória máxima do worker (RLIMIT_AS e RSS monitorado)
+            pages_cache: PagesCache opcional onde páginas problemáticas são marcadas
+            parse_cache: ParseCache opcional; conteúdo já parseado não vai ao worker
+        """
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.pages_cache = pages_cache
+        self.parse_cache = parse_cache
+
+        # spawn: o worker não herda threads/estado da GUI
+        self._context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self._fallback_parser = WikitextParser()
+
+        self.stats = {'processed': 0, 'timeouts': 0, 'memory_exceeded': 0, 'errors': 0, 'restarts': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _start_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.memory_limit_mb),
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def _kill_worker(self, restart: bool = True):
+        if self._process is not None:
+            if self._process.is_alive():
+                self._process.kill()
+            self._process.join(timeout=5)
+            if restart:
+                self.stats['restarts'] += 1
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _run(self, job: Dict[str, Any]):
+        """
+        Envia uma tarefa ao worker
+
+        Returns:
+            (situação, resultado_ou_erro), com situação 'ok', 'budget' (tempo ou
+            memória excedidos) ou 'error' (exceção no parsing ou falha do worker)
+        """
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                if self._process is not None:
+                    self._kill_worker()
+                self._start_worker()
+
+            try:
+                self._conn.send(job)
+            except (OSError, BrokenPipeError) as e:
+                self._kill_worker()
+                return 'error', f"Falha ao enviar página ao worker: {e}"
+
+            deadline = time.monotonic() + self.timeout
+            while not self._conn.poll(_POLL_INTERVAL):
+                if not self._process.is_alive():
+                    self._kill_worker()
+                    self.stats['memory_exceeded'] += 1
+                    return 'budget', "Worker de parsing encerrado (provável limite de memória)"
+                if time.monotonic() > deadline:
+                    self._kill_worker()
+                    self.stats['timeouts'] += 1
+                    return 'budget', f"Tempo limite de parsing excedido ({self.timeout:g}s)"
+                rss = _rss_mb(self._process.pid)
+                if rss is not None and self.memory_limit_mb and rss > self.memory_limit_mb:
+                    self._kill_worker()
+                    self.stats['memory_exceeded'] += 1
+                    return 'budget', f"Limite de memória excedido ({rss:.0f} MB > {self.memory_limit_mb} MB)"
+
+            try:
+                status, payload = self._conn.recv()
+            except (EOFError, OSError):
+                self._kill_worker()
+                self.stats['errors'] += 1
+                return 'error', "Worker de parsing encerrado inesperadamente"
+
+            if status == 'memory':
+                self._kill_worker()
+                self.stats['memory_exceeded'] += 1
+                return 'budget', payload
+            if status != 'ok':
+                self.stats['errors'] += 1
+                return 'error', payload
+
+            self.stats['processed'] += 1
+            return 'ok', payload
+
+    def _report_failure(self, status: str, pageid: Optional[int], title: str, error: str):
+        """Registra a falha; só estouro de orçamento marca a página no cache"""
+        if status != 'budget':
+            print(f"⚠️ Erro ao processar a página '{title}' no worker: {error}")
+            return
+        print(f"⚠️ Página '{title}' isolada: {error}")
+        if self.pages_cache is not None and pageid is not None:
+            self.pages_cache.update_page_status(pageid, 0, error)
+
+    def parse(self, wikitext: str, page_title: str = "", categories: List[str] = None,
+              pageid: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Parseia uma página dentro do orçamento de tempo e memória
+
+        Args:
+            wikitext: Texto em formato MediaWiki
+            page_title: Título da página
+            categories: Categorias da página
+            pageid: ID da página no cache, marcada com o erro se estourar o orçamento
+                (None quando a página não deve voltar a pendente)
+
+        Returns:
+            Dict de parse_wikitext; em caso de falha, o de _fallback_parsing
+        """
+        cache_key = None
+        if self.parse_cache is not None and wikitext.strip():
+            from src.parse_cache import content_hash
+            cache_key = content_hash(wikitext)
+            cached = self.parse_cache.get(cache_key)
+            if cached and all(field in cached for field in WikitextParser.CACHED_FIELDS):
+                result = {
+                    'title': page_title,
+                    'content': wikitext,
+                    'categories': categories or [],
+                    'timestamp': datetime.now().isoformat()
+                }
+                result.update((field, cached[field]) for field in WikitextParser.CACHED_FIELDS)
+                return result
+
+        status, result = self._run({
+            'kind': 'parse',
+            'wikitext': wikitext,
+            'title': page_title,
+            'categories': categories
+        })
+        if status == 'ok':
+            if cache_key is not None and 'parse_error' not in result:
+                self.parse_cache.put(cache_key, {field: result[field] for field in WikitextParser.CACHED_FIELDS
+                                                 if field in result})
+            return result
+
+        self._report_failure(status, pageid, page_title, result)
+        return self._fallback_parser._fallback_parsing(wikitext, page_title, categories, result)
+
+    def render(self, wikitext: str, output_format: str = 'html', page_title: str = "",
+               pageid: Optional[int] = None, **renderer_options) -> Optional[str]:
+        """
+        Converte uma página para HTML ou Markdown dentro do orçamento
+
+        Args:
+            wikitext: Texto em formato MediaWiki (templates já expandidos)
+            output_format: 'html' ou 'markdown'
+            page_title: Título da página (para mensagens)
+            pageid: ID da página no cache, marcada com o erro se estourar o orçamento
+            **renderer_options: image_urls, wiki_base_url... (devem ser serializáveis)
+
+        Returns:
+            Conteúdo convertido ou None se a conversão falhou ou excedeu o orçamento
+        """
+        status, result = self._run({
+            'kind': output_format,
+            'wikitext': wikitext,
+            'options': renderer_options
+        })
+        if status == 'ok':
+            return result
+
+        self._report_failure(status, pageid, page_title, result)
+        return None
+
+    def close(self):
+        """Encerra o worker"""
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+            if self._process is not None:
+                self._process.join(timeout=2)
+            self._kill_worker(restart=False)
@@ -0,0 +1,342 @@
+"""
+Grafo de links entre páginas da wiki
+
+Os wikilinks extraídos durante o parsing alimentam um grafo persistente
+(pageid de origem -> título de destino). Títulos são internados como
+inteiros e os links de saída ficam em arrays compactos, o que permite
+consultar links de entrada/saída, páginas afetadas por uma mudança de
+título e uma ordem de migração sem reparsear o acervo.
+"""
+
+import json
+import os
+import threading
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.template_expander import normalize_title
+from src.wikitext_parser import CATEGORY_NAMESPACES, FILE_NAMESPACES, split_namespace
+
+# Versão do formato do arquivo persistido
+LINK_GRAPH_VERSION = 1
+
+
+def link_target_title(target: str) -> Optional[str]:
+    """
+    Normaliza o destino de um wikilink para o título da página
+
+    Remove âncoras e o ':' inicial; links de arquivo/categoria (sem ':')
+    não são links entre páginas e retornam None.
+    """
+    target = target.split('#', 1)[0].strip()
+    if not target:
+        return None
+    if target.startswith(':'):
+        target = target[1:]
+    else:
+        namespace, _ = split_namespace(target)
+        if namespace in FILE_NAMESPACES or namespace in CATEGORY_NAMESPACES:
+            return None
+    title = normalize_title(target)
+    return title or None
+
+
+class LinkGraph:
+    """Índice persistente de links entre páginas com IDs inteiros"""
+
+    def __init__(self, graph_file: str = "config/link_graph.json", lazy: bool = False):
+        """
+        Inicializa o grafo
+
+        Args:
+            graph_file: Arquivo JSON de persistência (None para manter só em memória)
+            lazy: Não ler o arquivo agora; a carga acontece no primeiro uso
+                (ou em background, com load_async)
+        """
+        self.graph_file = graph_file
+        self._lock = threading.RLock()
+        # Carga do arquivo: feita uma única vez, sob demanda (ordem: _load_lock → _lock)
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._load_thread = None
+
+        # Títulos internados: id <-> título
+        self._titles: List[str] = []
+        self._title_ids: Dict[str, int] = {}
+
+        # pageid -> id do título da própria página (e o inverso, para busca por título)
+        self._page_titles: Dict[int, int] = {}
+        self._title_pages: Dict[int, int] = {}
+        # pageid -> ids dos títulos de destino (sem duplicatas)
+        self._outbound: Dict[int, array] = {}
+        # id do título de destino -> pageids de origem (construído sob demanda)
+        self._inbound: Optional[Dict[int, Set[int]]] = None
+        self._dirty = False
+
+        if not lazy:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        """Lê o arquivo do grafo se ainda não foi lido (espera carga em andamento)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load_graph()
+                self._loaded = True
+
+    @property
+    def is_loaded(self) -> bool:
+        """Indica se o arquivo do grafo já foi lido"""
+        return self._loaded
+
+    def load_async(self) -> threading.Thread:
+        """Lê o arquivo do grafo em uma thread de fundo (a mesma, se já houver uma em andamento)"""
+        with self._lock:
+            if self._load_thread is None or not self._load_thread.is_alive():
+                self._load_thread = threading.Thread(target=self._ensure_loaded, daemon=True)
+                self._load_thread.start()
+            return self._load_thread
+
+    def _intern(self, title: str) -> int:
+        title_id = self._title_ids.get(title)
+        if title_id is None:
+            title_id = len(self._titles)
+            self._titles.append(title)
+            self._title_ids[title] = title_id
+        return title_id
+
+    def _inbound_index(self) -> Dict[int, Set[int]]:
+        if self._inbound is None:
+            inbound = {}
+            for pageid, targets in self._outbound.items():
+                for title_id in targets:
+                    inbound.setdefault(title_id, set()).add(pageid)
+            self._inbound = inbound
+        return self._inbound
+
+    # ------------------------------------------------------------------
+    # Atualização
+    # ------------------------------------------------------------------
+
+    def add_page_links(self, pageid: int, title: str, targets: Iterable[str]):
+        """
+        Registra (ou substitui) os links de saída de uma página
+
+        Args:
+            pageid: ID da página de origem
+            title: Título da página de origem
+            targets: Destinos dos wikilinks como aparecem no wikitext
+        """
+        self._ensure_loaded()
+        with self._lock:
+            target_ids = array('I')
+            seen = set()
+            for target in targets:
+                normalized = link_target_title(target)
+                if normalized is None:
+                    continue
+                title_id = self._intern(normalized)
+                if title_id not in seen:
+                    seen.add(title_id)
+                    target_ids.append(title_id)
+
+            if self._inbound is not None:
+                for title_id in self._outbound.get(pageid, ()):
+                    self._inbound.get(title_id, set()).discard(pageid)
+                for title_id in target_ids:
+                    self._inbound.setdefault(title_id, set()).add(pageid)
+
+            self._forget_page_title(pageid)
+            title_id = self._intern(normalize_title(title))
+            self._page_titles[pageid] = title_id
+            self._title_pages[title_id] = pageid
+            self._outbound[pageid] = target_ids
+            self._dirty = True
+
+    def _forget_page_title(self, pageid: int):
+        title_id = self._page_titles.pop(pageid, None)
+        if title_id is not None and self._title_pages.get(title_id) == pageid:
+            del self._title_pages[title_id]
+
+    def add_parse_result(self, pageid: int, parsed: Dict):
+        """Registra os links de um resultado de parse_wikitext"""
+        self.add_page_links(pageid, parsed.get('title', ''),
+                            (link['target'] for link in parsed.get('links', [])))
+
+    def remove_page(self, pageid: int):
+        """Remove uma página (e seus links de saída) do grafo"""
+        self._ensure_loaded()
+        with self._lock:
+            targets = self._outbound.pop(pageid, None)
+            self._forget_page_title(pageid)
+            if targets is not None and self._inbound is not None:
+                for title_id in targets:
+                    self._inbound.get(title_id, set()).discard(pageid)
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def outbound(self, pageid: int) -> List[str]:
+        """Títulos para os quais a página aponta"""
+        self._ensure_loaded()
+        with self._lock:
+            return [self._titles[title_id] for title_id in self._outbound.get(pageid, ())]
+
+    def inbound(self, title: str) -> List[int]:
+        """IDs das páginas que apontam para o título"""
+        self._ensure_loaded()
+        with self._lock:
+            title_id = self._title_ids.get(normalize_title(title))
+            if title_id is None:
+                return []
+            return sorted(self._inbound_index().get(title_id, ()))
+
+    def affected_by_move(self, old_title: str, include_subpages: bool = True) -> List[int]:
+        """
+        Páginas cujos links precisam ser reescritos se o título mudar
+
+        Args:
+            old_title: Título atual da página que será movida/renomeada
+            include_subpages: Considerar também links para subpáginas (Título/...)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            old_title = normalize_title(old_title)
+            affected = set(self.inbound(old_title))
+            if include_subpages:
+                prefix = old_title + '/'
+                inbound = self._inbound_index()
+                for title, title_id in self._title_ids.items():
+                    if title.startswith(prefix):
+                        affected.update(inbound.get(title_id, ()))
+            return sorted(affected)
+
+    def page_id_for_title(self, title: str) -> Optional[int]:
+        """pageid de uma página conhecida pelo grafo (ou None)"""
+        self._ensure_loaded()
+        with self._lock:
+            title_id = self._title_ids.get(normalize_title(title))
+            return self._title_pages.get(title_id) if title_id is not None else None
+
+    def migration_order(self, pageids: Iterable[int] = None) -> List[int]:
+        """
+        Ordem de migração em que páginas de destino vêm antes das que apontam para elas
+
+        Assim, ao migrar uma página, os links internos já podem ser reescritos
+        para as páginas criadas no BookStack. Ciclos são resolvidos pela ordem
+        de pageid.
+
+        Args:
+            pageids: Subconjunto de páginas a ordenar (padrão: todas do grafo)
+        """
+        self._ensure_loaded()
+        with self._lock:
+            selected = set(self._outbound if pageids is None else pageids)
+            title_to_page = {title_id: pageid for pageid, title_id in self._page_titles.items()
+                             if pageid in selected}
+
+            # Dependências: página -> páginas (selecionadas) para as quais aponta
+            pending_deps = {}
+            dependents = {}
+            for pageid in selected:
+                deps = set()
+                for title_id in self._outbound.get(pageid, ()):
+                    target = title_to_page.get(title_id)
+                    if target is not None and target != pageid:
+                        deps.add(target)
+                        dependents.setdefault(target, []).append(pageid)
+                pending_deps[pageid] = len(deps)
+
+            ready = deque(sorted(p for p, count in pending_deps.items() if count == 0))
+            order = []
+            emitted = set()
+            while len(order) < len(selected):
+                if not ready:
+                    # Ciclo: liberar a menor página ainda pendente
+                    remaining = min(p for p, count in pending_deps.items() if p not in emitted and count > 0)
+                    pending_deps[remaining] = 0
+                    ready.append(remaining)
+                pageid = ready.popleft()
+                if pageid in emitted:
+                    continue
+                order.append(pageid)
+                emitted.add(pageid)
+                for dependent in sorted(dependents.get(pageid, ())):
+                    if dependent not in emitted and pending_deps[dependent] > 0:
+                        pending_deps[dependent] -= 1
+                        if pending_deps[dependent] == 0:
+                            ready.append(dependent)
+            return order
+
+    def get_statistics(self) -> Dict:
+        """Retorna contadores do grafo"""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                'pages': len(self._outbound),
+                'titles': len(self._titles),
+                'links': sum(len(targets) for targets in self._outbound.values())
+            }
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def load_graph(self) -> bool:
+        """Carrega o grafo do arquivo JSON"""
+        if not self.graph_file or not os.path.exists(self.graph_file):
+            return False
+        try:
+            with open(self.graph_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != LINK_GRAPH_VERSION:
+                return False
+            with self._lock:
+                self._titles = data.get('titles', [])
+                self._title_ids = {title: index for index, title in enumerate(self._titles)}
+                self._page_titles = {}
+                self._title_pages = {}
+                self._outbound = {}
+                for pageid, (title_id, targets) in data.get('pages', {}).items():
+                    self._page_titles[int(pageid)] = title_id
+                    self._title_pages[title_id] = int(pageid)
+                    self._outbound[int(pageid)] = array('I', targets)
+                self._inbound = None
+                self._dirty = False
+            return True
+        except Exception as e:
+            print(f"Erro ao carregar grafo de links: {e}")
+            return False
+
+    def save_graph(self) -> bool:
+        """Salva o grafo no arquivo JSON (somente se houve mudanças), de forma atômica"""
+        if not self.graph_file or not self._dirty:
+            return False
+        try:
+            directory = os.path.dirname(self.graph_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                graph_data = {
+                    'version': LINK_GRAPH_VERSION,
+                    'last_updated': datetime.now().isoformat(),
+                    'titles': list(self._titles),
+                    'pages': {str(pageid): [self._page_titles[pageid], targets.tolist()]
+                              for pageid, targets in self._outbound.items()}
+                }
+                self._dirty = False
+            # Arquivo temporário + rename: uma queda no meio da gravação não corrompe o grafo salvo
+            temp_file = f"{self.graph_file}.{os.getpid()}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(graph_data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.graph_file)
+            return True
+        except Exception as e:
+            self._dirty = True
+            print(f"Erro ao salvar grafo de links: {e}")
+            return False
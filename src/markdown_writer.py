@@ -0,0 +1,385 @@
+"""
+Escritor incremental de wikitext para Markdown
+
+Percorre a árvore do mwparserfromhell e escreve o Markdown linha a linha
+em um buffer ou arquivo, sem montar strings intermediárias da página
+inteira. Construções sem equivalente em Markdown (tabelas complexas) são
+emitidas como HTML; nós não suportados são contabilizados no relatório.
+"""
+
+import io
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, TextIO
+
+import mwparserfromhell
+from mwparserfromhell.nodes import (Argument, Comment, ExternalLink, Heading, HTMLEntity,
+                                    Tag, Template, Text, Wikilink)
+from mwparserfromhell.wikicode import Wikicode
+
+from src.html_renderer import (CODE_TAGS, LIST_MARKUP, WikitextHtmlRenderer, normalize_file_name,
+                               parse_image_options, split_link_options)
+from src.wikitext_parser import BEHAVIOR_SWITCH_PATTERN, CATEGORY_NAMESPACES, FILE_NAMESPACES, split_namespace
+
+
+# Caracteres com significado em Markdown dentro de texto comum
+_MARKDOWN_ESCAPE_PATTERN = re.compile(r'([\\`*_\[\]<>|])')
+
+# Largura de indentação de cada marcador de lista aninhada
+_LIST_INDENT = {'*': 2, '#': 3, ';': 0, ':': 2}
+
+# Tags inline convertidas para a marcação Markdown equivalente
+_INLINE_MARKUP = {'b': '**', 'strong': '**', 'i': '*', 'em': '*', 's': '~~', 'del': '~~', 'strike': '~~'}
+
+# Tags inline sem equivalente em Markdown, mantidas como HTML
+_INLINE_HTML_TAGS = {'sub', 'sup', 'u', 'small', 'big', 'kbd', 'mark', 'abbr'}
+
+
+def escape_markdown(text: str) -> str:
+    """Escapa caracteres especiais do Markdown em texto comum"""
+    return _MARKDOWN_ESCAPE_PATTERN.sub(r'\\\1', text)
+
+
+class WikitextMarkdownWriter:
+    """Conversor de wikitext para Markdown com escrita incremental"""
+
+    def __init__(self, image_urls: Dict[str, str] = None,
+                 link_resolver: Callable[[str], Optional[str]] = None,
+                 wiki_base_url: str = ""):
+        """
+        Inicializa o escritor
+
+        Args:
+            image_urls: Mapa nome do arquivo -> URL da imagem na galeria do BookStack
+            link_resolver: Função título da wiki -> URL no BookStack (ou None)
+            wiki_base_url: URL base da wiki, usada para links e imagens não mapeados
+        """
+        # O renderizador HTML resolve links/imagens e cobre tabelas complexas
+        self._html = WikitextHtmlRenderer(image_urls, link_resolver, wiki_base_url)
+        self._reset(None)
+
+    def _reset(self, stream: Optional[TextIO]):
+        self._stream = stream
+        self._prefix = ''
+        self._parts = []
+        self._line_is_pre = False
+        self._pre_open = False
+        self._blank_written = True
+        self._chars_written = 0
+        self._references = []
+        self.categories = []
+        self.unsupported = Counter()
+
+    def to_markdown(self, wikitext) -> str:
+        """Converte wikitext em Markdown e retorna a string (páginas pequenas)"""
+        buffer = io.StringIO()
+        self.write(wikitext, buffer)
+        return buffer.getvalue()
+
+    def write_file(self, wikitext, file_path: str) -> Dict:
+        """Converte wikitext escrevendo diretamente em um arquivo"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            return self.write(wikitext, f)
+
+    def write(self, wikitext, stream: TextIO) -> Dict:
+        """
+        Escreve o Markdown de um wikitext em um stream, linha a linha
+
+        Args:
+            wikitext: Texto em formato MediaWiki (ou Wikicode já parseado)
+            stream: Destino com método write() (buffer, arquivo, socket...)
+
+        Returns:
+            Relatório com caracteres escritos, categorias e nós não suportados
+        """
+        wikicode = mwparserfromhell.parse(wikitext) if isinstance(wikitext, str) else wikitext
+        self._reset(stream)
+
+        for node in wikicode.nodes:
+            self._write_node(node)
+        self._end_line()
+        self._close_pre()
+
+        if self._references:
+            self._write_block('\n'.join(f"{number}. {content}" for number, content in self._references))
+
+        return {
+            'chars_written': self._chars_written,
+            'categories': list(self.categories),
+            'unsupported': dict(self.unsupported)
+        }
+
+    # ------------------------------------------------------------------
+    # Saída
+    # ------------------------------------------------------------------
+
+    def _emit(self, text: str):
+        self._stream.write(text)
+        self._chars_written += len(text)
+
+    def _emit_line(self, text: str):
+        if not text.strip():
+            if not self._blank_written:
+                self._emit('\n')
+                self._blank_written = True
+            return
+        self._emit(text + '\n')
+        self._blank_written = False
+
+    def _close_pre(self):
+        if self._pre_open:
+            self._emit('```\n')
+            self._pre_open = False
+            self._blank_written = False
+
+    def _end_line(self):
+        """Finaliza a linha corrente e a escreve no stream"""
+        text = ''.join(self._parts)
+        prefix, is_pre = self._prefix, self._line_is_pre
+        self._parts, self._prefix, self._line_is_pre = [], '', False
+
+        if is_pre:
+            if not self._pre_open:
+                self._emit_line('')
+                self._emit('```\n')
+                self._pre_open = True
+            self._emit(text[1:] + '\n')
+            return
+
+        self._close_pre()
+        if prefix:
+            self._emit_line(self._list_line(prefix, text.strip()))
+        else:
+            self._emit_line(text.rstrip())
+
+    def _write_block(self, block: str):
+        """Escreve um bloco (cabeçalho, tabela, código) separado por linhas em branco"""
+        if ''.join(self._parts).strip() or self._prefix:
+            self._end_line()
+        else:
+            self._parts, self._prefix, self._line_is_pre = [], '', False
+        self._close_pre()
+        self._emit_line('')
+        self._emit(block + '\n')
+        self._blank_written = False
+        self._emit_line('')
+
+    @staticmethod
+    def _list_line(prefix: str, text: str) -> str:
+        indent = ' ' * sum(_LIST_INDENT[marker] for marker in prefix[:-1])
+        marker = prefix[-1]
+        if marker == '*':
+            return f"{indent}- {text}"
+        if marker == '#':
+            return f"{indent}1. {text}"
+        if marker == ';':
+            return f"{indent}**{text}**"
+        # ':' sozinho é recuo de parágrafo; dentro de listas é continuação do item
+        return f"> {text}" if len(prefix) == 1 else f"{indent}{text}"
+
+    # ------------------------------------------------------------------
+    # Nós
+    # ------------------------------------------------------------------
+
+    def _write_node(self, node):
+        if isinstance(node, Text):
+            value = BEHAVIOR_SWITCH_PATTERN.sub('', node.value)
+            for index, chunk in enumerate(value.split('\n')):
+                if index:
+                    self._end_line()
+                if not chunk:
+                    continue
+                if not self._parts and not self._prefix and chunk.startswith(' ') and chunk.strip():
+                    self._line_is_pre = True
+                self._parts.append(chunk if self._line_is_pre else escape_markdown(chunk))
+        elif isinstance(node, Tag) and node.wiki_markup in LIST_MARKUP and str(node.tag) in ('li', 'dt', 'dd'):
+            if not ''.join(self._parts).strip():
+                self._parts = []
+                self._prefix += node.wiki_markup
+            elif node.wiki_markup == ':' and self._prefix.endswith(';'):
+                prefix = self._prefix[:-1] + ':'
+                self._end_line()
+                self._prefix = prefix
+            else:
+                self._parts.append(node.wiki_markup)
+        elif isinstance(node, Heading):
+            level = min(max(node.level, 1), 6)
+            self._write_block('#' * level + ' ' + self._inline_code(node.title).strip())
+        elif isinstance(node, Tag) and self._is_block_tag(node):
+            self._write_block_tag(node)
+        elif isinstance(node, Comment):
+            return
+        else:
+            self._parts.append(self._inline(node))
+
+    @staticmethod
+    def _is_block_tag(tag) -> bool:
+        name = str(tag.tag).strip().lower()
+        return name in ('table', 'hr', 'pre', 'references', 'div', 'center', 'blockquote') or name in CODE_TAGS
+
+    def _write_block_tag(self, tag):
+        name = str(tag.tag).strip().lower()
+
+        if name == 'table':
+            self._write_block(self._table(tag))
+        elif name == 'hr':
+            self._write_block('---')
+        elif name == 'references':
+            if self._references:
+                self._write_block('\n'.join(f"{number}. {content}" for number, content in self._references))
+                self._references = []
+        elif name == 'pre' or name in CODE_TAGS:
+            language = ''
+            for attribute in tag.attributes:
+                if str(attribute.name).strip().lower() == 'lang' and attribute.value is not None:
+                    language = str(attribute.value).strip()
+            code = str(tag.contents or '').strip('\n')
+            self._write_block(f"```{language}\n{code}\n```")
+        elif name == 'blockquote':
+            inner = WikitextMarkdownWriter()
+            inner._html = self._html
+            text = inner.to_markdown(tag.contents or '').strip()
+            self.unsupported.update(inner.unsupported)
+            self._write_block('\n'.join('> ' + line if line else '>' for line in text.split('\n')))
+        else:
+            # div/center: o conteúdo segue o fluxo normal, sem a formatação
+            self._end_line()
+            for child in (tag.contents.nodes if tag.contents else []):
+                self._write_node(child)
+            self._end_line()
+
+    def _table(self, table) -> str:
+        """Tabela GFM quando simples; HTML quando há mesclagem ou blocos nas células"""
+        rows = []
+        implicit = []
+        simple = True
+
+        for node in (table.contents.nodes if table.contents else []):
+            if not isinstance(node, Tag):
+                continue
+            name = str(node.tag).strip().lower()
+            if name == 'tr':
+                cells = [c for c in (node.contents.nodes if node.contents else [])
+                         if isinstance(c, Tag) and str(c.tag).strip().lower() in ('td', 'th')]
+                rows.append(cells)
+            elif name in ('td', 'th'):
+                if node.wiki_markup == '|' and str(node.contents or '').startswith('+'):
+                    simple = False  # legenda
+                else:
+                    implicit.append(node)
+            else:
+                simple = False
+        if implicit:
+            rows.insert(0, implicit)
+
+        rendered_rows = []
+        for cells in rows:
+            rendered = []
+            for cell in cells:
+                if any(str(a.name).strip().lower() in ('colspan', 'rowspan') for a in cell.attributes):
+                    simple = False
+                text = self._inline_code(cell.contents).strip()
+                if '\n' in text:
+                    simple = False
+                rendered.append(text)
+            rendered_rows.append(rendered)
+
+        if not simple or not rendered_rows:
+            return self._html.render(Wikicode([table]))
+
+        width = max(len(row) for row in rendered_rows)
+        lines = []
+        for index, row in enumerate(rendered_rows):
+            row = row + [''] * (width - len(row))
+            lines.append('| ' + ' | '.join(row) + ' |')
+            if index == 0:
+                lines.append('|' + '---|' * width)
+        return '\n'.join(lines)
+
+    def _inline_code(self, wikicode) -> str:
+        if wikicode is None:
+            return ''
+        return ''.join(self._inline(node) for node in wikicode.nodes)
+
+    def _inline(self, node) -> str:
+        if isinstance(node, Text):
+            return escape_markdown(BEHAVIOR_SWITCH_PATTERN.sub('', node.value))
+        if isinstance(node, Wikilink):
+            return self._wikilink(node)
+        if isinstance(node, ExternalLink):
+            url = str(node.url).strip()
+            if node.title is None:
+                return f"<{url}>" if node.brackets else url
+            return f"[{self._inline_code(node.title).strip()}]({url})"
+        if isinstance(node, HTMLEntity):
+            return str(node)
+        if isinstance(node, Tag):
+            return self._inline_tag(node)
+        if isinstance(node, Comment):
+            return ''
+        if isinstance(node, Template):
+            self.unsupported[f"template:{str(node.name).strip()}"] += 1
+            return ''
+        if isinstance(node, Argument):
+            self.unsupported['argument'] += 1
+            return self._inline_code(node.default)
+        self.unsupported[type(node).__name__.lower()] += 1
+        return escape_markdown(str(node))
+
+    def _inline_tag(self, tag) -> str:
+        name = str(tag.tag).strip().lower()
+        if tag.wiki_markup == "''":
+            return f"*{self._inline_code(tag.contents)}*"
+        if tag.wiki_markup == "'''":
+            return f"**{self._inline_code(tag.contents)}**"
+        if name == 'br':
+            return '<br>'
+        if name == 'nowiki':
+            return escape_markdown(str(tag.contents or ''))
+        if name in ('code', 'tt'):
+            code = str(tag.contents or '')
+            fence = '``' if '`' in code else '`'
+            return f"{fence}{code}{fence}"
+        if name == 'ref':
+            self._references.append((len(self._references) + 1, self._inline_code(tag.contents).strip()))
+            return f"<sup>[{len(self._references)}]</sup>"
+        if name in _INLINE_MARKUP:
+            mark = _INLINE_MARKUP[name]
+            return f"{mark}{self._inline_code(tag.contents)}{mark}"
+        if name in _INLINE_HTML_TAGS:
+            return f"<{name}>{self._inline_code(tag.contents)}</{name}>"
+        if name == 'span':
+            return self._inline_code(tag.contents)
+
+        self.unsupported[f"tag:{name}"] += 1
+        return self._inline_code(tag.contents)
+
+    def _wikilink(self, link) -> str:
+        target = str(link.title).strip()
+        leading_colon = target.startswith(':')
+        namespace, name = split_namespace(target.lstrip(':'))
+
+        if not leading_colon and namespace in FILE_NAMESPACES:
+            options = split_link_options(str(link.text)) if link.text is not None else []
+            return self._image(name, options)
+        if not leading_colon and namespace in CATEGORY_NAMESPACES:
+            self.categories.append(name)
+            return ''
+
+        target = target.lstrip(':')
+        text = self._inline_code(link.text).strip() if link.text is not None else escape_markdown(target)
+        href = self._html._resolve_link(target)
+        return f"[{text}]({href.replace(' ', '%20').replace(')', '%29')})"
+
+    def _image(self, file_name: str, options: List[str]) -> str:
+        info = parse_image_options(options)
+        file_name = normalize_file_name(file_name)
+        url = self._html.image_urls.get(file_name)
+        if not url and self._html.wiki_base_url:
+            url = f"{self._html.wiki_base_url}/index.php?title=Special:FilePath/{file_name.replace(' ', '_')}"
+        alt = info['alt'] if info['alt'] is not None else (info['caption'] or file_name)
+        alt = escape_markdown(re.sub(r'\[\[(?:[^\]|]*\|)?([^\]]*)\]\]', r'\1', alt))
+        if not url:
+            self.unsupported['image_without_url'] += 1
+            return f"*{alt}*"
+        return f"![{alt}]({url.replace(' ', '%20')})"
@@ -0,0 +1,537 @@
+"""
+Pipeline de migração MediaWiki → BookStack
+
+Quatro estágios ligados por filas limitadas:
+
+    busca (MediaWiki) → conversão (templates + HTML/Markdown)
+        → imagens (download + upload) → criação da página (BookStack)
+
+Cada estágio tem seu próprio número de threads, então a rede (busca,
+imagens, criação) e a CPU (conversão) trabalham ao mesmo tempo em páginas
+diferentes. As filas têm tamanho máximo: um estágio mais rápido espera o
+seguinte em vez de acumular páginas na memória. Uma falha afeta só a
+página em que ocorreu, que sai do pipeline com o estágio e o erro.
+
+Na conversão as imagens ainda não estão no BookStack; o conteúdo é
+renderizado com marcadores (mwimage://N.img) que o estágio de criação
+troca pelas URLs da galeria.
+
+Com split_threshold, páginas maiores que o limite não são renderizadas na
+conversão: o estágio de criação as divide com o PageSplitter em um
+capítulo com uma página por seção.
+"""
+
+import html
+import os
+import queue
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from src.conversion_pool import ConversionPool
+from src.html_renderer import WikitextHtmlRenderer, normalize_file_name
+from src.image_downloader import MediaWikiImageDownloader, sanitize_filename
+from src.isolated_parser import IsolatedParser
+from src.page_splitter import PageSplitter
+from src.wiki_document import WikiDocument
+from src.wikitext_parser import WikitextParser
+
+_DONE = object()  # sinal de fim de fila
+_IMAGE_PLACEHOLDER = "mwimage://"
+_PLACEHOLDER_PATTERN = re.compile(r'mwimage://\d+\.img')
+
+
+class _Stage:
+    """Estágio do pipeline: N threads consumindo uma fila e alimentando a próxima"""
+
+    def __init__(self, name: str, handler: Callable[[Dict], None], workers: int,
+                 input_queue: queue.Queue, output_queue: Optional[queue.Queue],
+                 next_workers: int, pipeline: 'MigrationPipeline'):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.next_workers = next_workers
+        self.pipeline = pipeline
+        self.busy_seconds = 0.0
+        self._running = self.workers
+        self._lock = threading.Lock()
+        self.threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"migracao-{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _run(self):
+        try:
+            self._consume()
+        finally:
+            # Último worker a sair avisa o próximo estágio (mesmo após erro inesperado)
+            with self._lock:
+                self._running -= 1
+                last = self._running == 0
+            if last and self.output_queue is not None:
+                for _ in range(self.next_workers):
+                    self.output_queue.put(_DONE)
+
+    def _consume(self):
+        while True:
+            item = self.input_queue.get()
+            if item is _DONE:
+                break
+
+            if self.pipeline.cancelled:
+                item['error'] = "Cancelado"
+                item['stage'] = self.name
+                self.pipeline._finish(item)
+                continue
+
+            started = time.monotonic()
+            try:
+                self.handler(item)
+            except Exception as e:
+                # Isolamento de falhas: a página sai do pipeline, as demais seguem
+                item['error'] = str(e)
+                item['stage'] = self.name
+                self.pipeline._finish(item)
+                continue
+            finally:
+                with self._lock:
+                    self.busy_seconds += time.monotonic() - started
+
+            if self.output_queue is not None:
+                self.output_queue.put(item)  # bloqueia se o próximo estágio estiver atrasado
+            else:
+                self.pipeline._finish(item)
+
+
+class MigrationPipeline:
+    """Migra páginas do MediaWiki para um livro ou capítulo do BookStack"""
+
+    STAGES = ('busca', 'conversao', 'imagens', 'criacao')
+
+    def __init__(self, mediawiki_client, bookstack_client, template_extractor=None,
+                 image_downloader: MediaWikiImageDownloader = None,
+                 fetch_workers: int = 4, convert_workers: int = 2, image_workers: int = 4,
+                 create_workers: int = 2, queue_size: int = 16, output_format: str = 'html',
+                 work_dir: str = "output/migration", link_resolver=None, parse_cache=None,
+                 isolation: Optional[Dict] = None, conversion_processes: int = 0,
+                 split_threshold: Optional[int] = None, min_section_size: int = 2_000):
+        """
+        Inicializa o pipeline
+
+        Args:
+            mediawiki_client: MediaWikiClient autenticado
+            bookstack_client: BookStackClient de destino
+            template_extractor: MediaWikiTemplateExtractor (None = sem expansão de templates)
+            image_downloader: Downloader de imagens (criado a partir do cliente se omitido)
+            fetch_workers: Threads buscando wikitext no MediaWiki
+            convert_workers: Threads expandindo templates e renderizando
+            image_workers: Threads baixando imagens e enviando à galeria
+            create_workers: Threads criando páginas no BookStack
+            queue_size: Capacidade de cada fila entre estágios (contrapressão)
+            output_format: 'html' ou 'markdown'
+            work_dir: Diretório para as imagens baixadas
+            link_resolver: Função título da wiki -> URL no BookStack (ou None)
+            parse_cache: ParseCache opcional; páginas já vistas não têm as imagens extraídas de novo
+            isolation: Opções do IsolatedParser (timeout, memory_limit_mb, pages_cache); com
+                elas, parsing e renderização rodam num processo worker por thread de conversão.
+                O link_resolver, se houver, precisa ser serializável (pickle)
+            conversion_processes: Processos de um ConversionPool para expandir e renderizar
+                (0 = nas threads de conversão). Os templates são buscados pela thread e a
+                expansão no pool é só local, sem o fallback pela API
+            split_threshold: Tamanho (bytes de wikitext) a partir do qual a página vira um
+                capítulo com uma página por seção (None/0 = nunca dividir)
+            min_section_size: Seções menores que isso são agrupadas com as seguintes
+        """
+        if output_format not in ('html', 'markdown'):
+            raise ValueError(f"Formato de saída inválido: {output_format}")
+        if conversion_processes and (isolation is not None or link_resolver is not None):
+            raise ValueError("conversion_processes não pode ser combinado com isolation ou link_resolver")
+
+        self.mediawiki = mediawiki_client
+        self.bookstack = bookstack_client
+        self.template_extractor = template_extractor
+        self.image_downloader = image_downloader or MediaWikiImageDownloader(mediawiki_client)
+        self.wiki_base_url = self.image_downloader.base_url
+        self.workers = {
+            'busca': fetch_workers,
+            'conversao': convert_workers,
+            'imagens': image_workers,
+            'criacao': create_workers
+        }
+        self.queue_size = queue_size
+        self.output_format = output_format
+        self.work_dir = work_dir
+        self.link_resolver = link_resolver
+        self.parse_cache = parse_cache
+        self.parser = WikitextParser(parse_cache=parse_cache)
+        self.isolation = isolation
+        # Um IsolatedParser por thread de conversão (cada um com seu processo worker)
+        self._isolated = threading.local()
+        self._isolated_parsers: List[IsolatedParser] = []
+        self.conversion_processes = conversion_processes
+        self._pool: Optional[ConversionPool] = None
+        self.split_threshold = split_threshold or None
+        self.min_section_size = min_section_size
+        # Só para medir as páginas; a divisão usa um PageSplitter por página (URLs das imagens)
+        self._splitter = PageSplitter(self.split_threshold, min_section_size, output_format=output_format) \
+            if self.split_threshold else None
+
+        self.cancelled = False
+        # Caches e memos do extrator de templates não são thread-safe: expansão serializada
+        self._expand_lock = threading.Lock()
+        # Imagem usada em várias páginas é enviada uma vez só
+        self._uploaded_images: Dict[str, Optional[str]] = {}
+        self._image_locks: Dict[str, threading.Lock] = {}
+        self._images_lock = threading.Lock()
+
+        self._results: List[Dict] = []
+        self._results_lock = threading.Lock()
+        self._progress_callback = None
+        self._total = 0
+
+    def cancel(self):
+        """Interrompe a migração: páginas ainda não concluídas saem como canceladas"""
+        self.cancelled = True
+
+    # ------------------------------------------------------------------
+    # Execução
+    # ------------------------------------------------------------------
+
+    def run(self, pages: Iterable[Dict], target: Dict,
+            progress_callback: Callable[[int, int, Dict], None] = None) -> Dict:
+        """
+        Migra as páginas e espera todos os estágios terminarem
+
+        Args:
+            pages: Páginas do cache (com 'title' e 'pageid')
+            target: {'book_id': id} ou {'chapter_id': id}
+            progress_callback: Chamado (de threads do pipeline) com
+                (concluídas, total, item) a cada página que sai do pipeline
+
+        Returns:
+            Relatório com contagens, resultado por página, tempo ocupado por estágio
+            e estatísticas de expansão de templates ('template_stats', None sem extrator)
+        """
+        if not target or not (target.get('book_id') or target.get('chapter_id')):
+            raise ValueError("Destino deve ter book_id ou chapter_id")
+
+        pages = list(pages)
+        self.cancelled = False
+        self._results = []
+        self._total = len(pages)
+        self._progress_callback = progress_callback
+        self._target = {key: value for key, value in target.items() if key in ('book_id', 'chapter_id') and value}
+        started = time.monotonic()
+
+        handlers = {
+            'busca': self._fetch,
+            'conversao': self._convert,
+            'imagens': self._upload_images,
+            'criacao': self._create
+        }
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.STAGES]
+        stages = []
+        for index, name in enumerate(self.STAGES):
+            last = index == len(self.STAGES) - 1
+            stages.append(_Stage(
+                name, handlers[name], self.workers[name], queues[index],
+                None if last else queues[index + 1],
+                0 if last else max(1, self.workers[self.STAGES[index + 1]]),
+                self
+            ))
+        if self.conversion_processes:
+            self._pool = self._create_conversion_pool()
+        for stage in stages:
+            stage.start()
+
+        # Alimentação também sofre contrapressão: put bloqueia com a fila cheia
+        for page in pages:
+            queues[0].put({
+                'title': page.get('title', ''),
+                'pageid': page.get('pageid'),
+                'error': None,
+                'stage': None
+            })
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+
+        for stage in stages:
+            for thread in stage.threads:
+                thread.join()
+        for isolated_parser in self._isolated_parsers:
+            isolated_parser.close()
+        self._isolated_parsers = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.parse_cache is not None:
+            self.parse_cache.save_cache()
+
+        created = [item for item in self._results if not item['error']]
+        return {
+            'total': self._total,
+            'created': len(created),
+            'failed': sum(1 for item in self._results if item['error'] and item['error'] != "Cancelado"),
+            'cancelled': sum(1 for item in self._results if item['error'] == "Cancelado"),
+            'pages': [self._summary(item) for item in self._results],
+            'stage_seconds': {stage.name: round(stage.busy_seconds, 2) for stage in stages},
+            'elapsed_seconds': round(time.monotonic() - started, 2),
+            'template_stats': self._template_stats()
+        }
+
+    def _template_stats(self) -> Optional[Dict]:
+        """Memo e expansão local do extrator (só as expansões feitas nas threads, não no pool)"""
+        if self.template_extractor is None or not hasattr(self.template_extractor, 'get_expansion_stats'):
+            return None
+        return self.template_extractor.get_expansion_stats()
+
+    def _finish(self, item: Dict):
+        """Registra o item que saiu do pipeline (concluído ou com falha)"""
+        # Conteúdo e wikitext não são mais necessários: liberar memória
+        for key in ('wikitext', 'document', 'content'):
+            item.pop(key, None)
+        with self._results_lock:
+            self._results.append(item)
+            completed = len(self._results)
+        if self._progress_callback:
+            try:
+                self._progress_callback(completed, self._total, item)
+            except Exception as e:
+                # Erro no callback não pode derrubar o worker (e travar o run())
+                print(f"⚠️ Erro no callback de progresso da migração: {e}")
+
+    @staticmethod
+    def _summary(item: Dict) -> Dict:
+        return {
+            'title': item['title'],
+            'pageid': item['pageid'],
+            'bookstack_id': item.get('bookstack_id'),
+            'split_pages': item.get('split_pages', 0),
+            'images_uploaded': item.get('images_uploaded', 0),
+            'images_failed': item.get('images_failed', 0),
+            'error': item['error'],
+            'stage': item['stage']
+        }
+
+    # ------------------------------------------------------------------
+    # Estágios
+    # ------------------------------------------------------------------
+
+    def _fetch(self, item: Dict):
+        """Busca o wikitext e as categorias da página no MediaWiki"""
+        data = self.mediawiki.get_page_content_wikitext(item['title'])
+        if isinstance(data, dict):
+            item['wikitext'] = data.get('wikitext') or ''
+            item['categories'] = data.get('categories', [])
+        else:
+            item['wikitext'] = data or ''
+            item['categories'] = []
+        if not item['wikitext'].strip():
+            raise ValueError("Página sem conteúdo")
+
+    def _convert(self, item: Dict):
+        """Expande templates e renderiza, com marcadores no lugar das imagens"""
+        document = WikiDocument(item['wikitext'], item['title'], item['categories'])
+        # No pool a página expandida não volta para o pipeline: páginas que já
+        # passam do limite antes da expansão são convertidas aqui para a divisão
+        if self._pool is not None and not (self._splitter and self._splitter.needs_split(document)):
+            self._convert_in_pool(item)
+            return
+
+        if self.template_extractor is not None:
+            with self._expand_lock:
+                document = document.expand_templates(self.template_extractor)
+
+        isolated_parser = self._isolated_parser()
+        if self._splitter is not None and self._splitter.needs_split(document):
+            self._prepare_split(item, document, isolated_parser)
+            return
+        if isolated_parser is not None:
+            self._convert_isolated(item, document, isolated_parser)
+            return
+
+        # Com o cache de parsing, conteúdo já visto não percorre a árvore para achar as imagens
+        parsed = self.parser.parse_wikitext(document, item['title'], item['categories'])
+        item['placeholders'] = self._placeholders(parsed)
+        if self.output_format == 'markdown':
+            from src.markdown_writer import WikitextMarkdownWriter
+            writer = WikitextMarkdownWriter(item['placeholders'], self.link_resolver, self.wiki_base_url)
+            item['content'] = writer.to_markdown(document.wikicode)
+        else:
+            renderer = WikitextHtmlRenderer(item['placeholders'], self.link_resolver, self.wiki_base_url)
+            item['content'] = renderer.render(document.wikicode)
+        item.pop('wikitext', None)
+
+    def _prepare_split(self, item: Dict, document: WikiDocument, isolated_parser: Optional[IsolatedParser]):
+        """Guarda o documento expandido para a divisão no estágio de criação"""
+        if isolated_parser is not None:
+            parsed = isolated_parser.parse(document.wikitext, item['title'], item['categories'],
+                                           pageid=item['pageid'])
+            if parsed.get('parse_error'):
+                raise ValueError(parsed['parse_error'])
+        else:
+            parsed = self.parser.parse_wikitext(document, item['title'], item['categories'])
+        item['placeholders'] = self._placeholders(parsed)
+        item['document'] = document
+        item.pop('wikitext', None)
+
+    @staticmethod
+    def _placeholders(parsed) -> Dict[str, str]:
+        return {
+            image['name']: f"{_IMAGE_PLACEHOLDER}{index}.img"
+            for index, image in enumerate(parsed.get('images', []))
+        }
+
+    def _isolated_parser(self) -> Optional[IsolatedParser]:
+        """IsolatedParser da thread atual (None sem isolamento configurado)"""
+        if self.isolation is None:
+            return None
+        isolated_parser = getattr(self._isolated, 'parser', None)
+        if isolated_parser is None:
+            isolated_parser = IsolatedParser(parse_cache=self.parse_cache, **self.isolation)
+            self._isolated.parser = isolated_parser
+            with self._results_lock:
+                self._isolated_parsers.append(isolated_parser)
+        return isolated_parser
+
+    def _convert_isolated(self, item: Dict, document: WikiDocument, isolated_parser: IsolatedParser):
+        """Parsing e renderização no processo worker, dentro do orçamento de tempo e memória"""
+        parsed = isolated_parser.parse(document.wikitext, item['title'], item['categories'],
+                                       pageid=item['pageid'])
+        if parsed.get('parse_error'):
+            raise ValueError(parsed['parse_error'])
+        item['placeholders'] = self._placeholders(parsed)
+
+        options = {'image_urls': item['placeholders'], 'wiki_base_url': self.wiki_base_url}
+        if self.link_resolver is not None:
+            options['link_resolver'] = self.link_resolver
+        content = isolated_parser.render(document.wikitext, self.output_format, item['title'],
+                                         pageid=item['pageid'], **options)
+        if content is None:
+            raise ValueError("Conversão excedeu o orçamento de tempo/memória")
+        item['content'] = content
+        item.pop('wikitext', None)
+
+    def _create_conversion_pool(self) -> ConversionPool:
+        options = {
+            'max_workers': self.conversion_processes,
+            'chunk_size': 1,
+            'wiki_base_url': self.wiki_base_url,
+            'output_format': self.output_format,
+            'image_placeholder': _IMAGE_PLACEHOLDER
+        }
+        if self.template_extractor is not None:
+            return self.template_extractor.create_conversion_pool(**options)
+        return ConversionPool(expand_templates=False, **options)
+
+    def _convert_in_pool(self, item: Dict):
+        """Expansão, parsing e renderização num processo do ConversionPool (fora do GIL)"""
+        page = {
+            'title': item['title'],
+            'pageid': item['pageid'],
+            'wikitext': item['wikitext'],
+            'categories': item['categories']
+        }
+        if self.template_extractor is not None:
+            # Templates que a página usa e o snapshot do pool ainda não tem (busca pela API)
+            with self._expand_lock:
+                page['template_sources'] = self.template_extractor.prefetch_template_sources([item['wikitext']])
+        result = self._pool.convert_page(page)
+        if result['error']:
+            raise ValueError(result['error'])
+        item['placeholders'] = result['placeholders']
+        item['content'] = result['markdown' if self.output_format == 'markdown' else 'html']
+        item.pop('wikitext', None)
+
+    def _upload_images(self, item: Dict):
+        """Baixa cada imagem da wiki e a envia à galeria do BookStack"""
+        item['image_urls'] = {}
+        item['images_uploaded'] = 0
+        item['images_failed'] = 0
+        for name, placeholder in item['placeholders'].items():
+            url = self._gallery_url(name)
+            if url:
+                item['images_uploaded'] += 1
+            else:
+                # Sem upload: apontar para o arquivo na wiki
+                item['images_failed'] += 1
+                url = self._wiki_file_url(name)
+            item['image_urls'][placeholder] = url
+
+    def _gallery_url(self, name: str) -> Optional[str]:
+        """URL da imagem na galeria do BookStack (envia na primeira vez; None se falhar)"""
+        key = normalize_file_name(name)
+        with self._images_lock:
+            if key in self._uploaded_images:
+                return self._uploaded_images[key]
+            lock = self._image_locks.setdefault(key, threading.Lock())
+
+        with lock:  # outra página pode estar enviando a mesma imagem
+            with self._images_lock:
+                if key in self._uploaded_images:
+                    return self._uploaded_images[key]
+            url = None
+            try:
+                info = self.image_downloader.get_image_info(name)
+                if info and info.get('url'):
+                    path = os.path.join(self.work_dir, "images", sanitize_filename(key))
+                    if os.path.exists(path) or self.image_downloader.download_image(info['url'], path):
+                        url = self.bookstack.upload_image(path).get('url')
+            except Exception as e:
+                print(f"⚠️ Imagem {name} não enviada: {e}")
+            with self._images_lock:
+                self._uploaded_images[key] = url
+            return url
+
+    def _wiki_file_url(self, name: str) -> str:
+        file_name = normalize_file_name(name).replace(' ', '_')
+        return f"{self.wiki_base_url}/index.php?title=Special:FilePath/{quote(file_name)}"
+
+    def _create(self, item: Dict):
+        """Troca os marcadores pelas URLs das imagens e cria a página no BookStack"""
+        if item.get('document') is not None:
+            self._create_split(item)
+            return
+
+        image_urls = item.get('image_urls', {})
+        escape = html.escape if self.output_format == 'html' else (lambda url: url)
+        content = _PLACEHOLDER_PATTERN.sub(
+            lambda match: escape(image_urls.get(match.group(0), match.group(0))), item['content'])
+
+        data = {
+            'name': item['title'][:255],
+            self.output_format: content,
+            'tags': [{'name': 'mediawiki_pageid', 'value': str(item['pageid'])}]
+        }
+        data['tags'].extend({'name': 'categoria', 'value': category} for category in item.get('categories', []))
+        data.update(self._target)
+
+        page = self.bookstack.create_page(data)
+        item['bookstack_id'] = page.get('id')
+
+    def _create_split(self, item: Dict):
+        """Cria a página grande como capítulo + uma página por seção"""
+        image_urls = item.get('image_urls', {})
+        splitter = PageSplitter(
+            self.split_threshold, self.min_section_size, output_format=self.output_format,
+            image_urls={name: image_urls.get(placeholder, placeholder)
+                        for name, placeholder in item['placeholders'].items()},
+            link_resolver=self.link_resolver, wiki_base_url=self.wiki_base_url
+        )
+        # Sem a tag de origem: as seções compartilham a página do MediaWiki
+        tags = [{'name': 'mediawiki_split_of', 'value': str(item['pageid'])}]
+        tags.extend({'name': 'categoria', 'value': category} for category in item.get('categories', []))
+
+        result = splitter.split_to_bookstack(
+            item['document'], self.bookstack, self._target.get('book_id'),
+            chapter_name=item['title'][:255], tags=tags, chapter_id=self._target.get('chapter_id')
+        )
+        item['bookstack_id'] = (result['chapter'] or {}).get('id', self._target.get('chapter_id'))
+        item['split_pages'] = len(result['pages'])
@@ -0,0 +1,135 @@
+"""
+Registro compacto de página do cache
+
+Cada página do catálogo era um dict de 6-7 chaves com um 'link'
+(index.php?curid=...) repetido e derivável do pageid. PageRecord guarda
+os mesmos campos em __slots__ e continua se comportando como dict
+(page['title'], page.get('status'), 'content_ref' in page, ...), então
+o restante do código não precisa mudar.
+"""
+
+import sys
+from collections.abc import MutableMapping
+from typing import Dict, Optional
+
+_FIELDS = ('pageid', 'title', 'status', 'last_processed', 'error_message', 'version', 'content_ref')
+_OPTIONAL_FIELDS = ('content_ref',)  # ausentes (None) não aparecem como chave
+
+
+def page_link(pageid) -> str:
+    """Link relativo da página na wiki, derivado do pageid"""
+    return f"index.php?curid={pageid}"
+
+
+class PageRecord(MutableMapping):
+    """Página do cache em __slots__, com interface de dict"""
+
+    __slots__ = _FIELDS + ('_extra',)
+
+    def __init__(self, pageid=None, title: str = '', status: int = 0, last_processed: Optional[str] = None,
+                 error_message: Optional[str] = None, content_ref: Optional[Dict] = None, version: int = 0):
+        self.pageid = pageid
+        self.title = title
+        self.status = status
+        self.last_processed = last_processed
+        self.error_message = sys.intern(error_message) if error_message else error_message
+        self.content_ref = content_ref
+        self.version = version  # incrementada a cada mudança; base do merge entre processos
+        self._extra = None  # chaves fora do esquema (raras), só alocado se necessário
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PageRecord':
+        """Converte um dict de página (formato do arquivo) em registro"""
+        record = cls(data.get('pageid'), data.get('title', ''), data.get('status', 0),
+                     data.get('last_processed'), data.get('error_message'), data.get('content_ref'),
+                     data.get('version', 0))
+        for key, value in data.items():
+            if key in _FIELDS:
+                continue
+            if key == 'link' and value == page_link(record.pageid):
+                continue  # derivado do pageid: não precisa ser guardado
+            record[key] = value
+        return record
+
+    def to_dict(self, include_version: bool = True) -> Dict:
+        """
+        Dict equivalente (formato gravado no arquivo)
+
+        Args:
+            include_version: False omite 'version' (só o modo compartilhado a grava)
+        """
+        data = dict(self.items())
+        if not include_version:
+            del data['version']
+        return data
+
+    # ------------------------------------------------------------------
+    # Interface de dict
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key):
+        if key in _FIELDS:
+            value = getattr(self, key)
+            if value is None and key in _OPTIONAL_FIELDS:
+                raise KeyError(key)
+            return value
+        if key == 'link' and not (self._extra and 'link' in self._extra):
+            return page_link(self.pageid)
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, value):
+        if key in _FIELDS:
+            if key == 'error_message' and value:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _OPTIONAL_FIELDS and getattr(self, key) is not None:
+            setattr(self, key, None)
+        elif self._extra and key in self._extra:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        yield 'pageid'
+        yield 'title'
+        if not (self._extra and 'link' in self._extra):
+            yield 'link'
+        yield 'status'
+        yield 'last_processed'
+        yield 'error_message'
+        yield 'version'
+        if self.content_ref is not None:
+            yield 'content_ref'
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return 7 + (self.content_ref is not None) + len(self._extra or ()) - bool(self._extra and 'link' in self._extra)
+
+    def __contains__(self, key):
+        if key in _FIELDS:
+            return key not in _OPTIONAL_FIELDS or getattr(self, key) is not None
+        return key == 'link' or bool(self._extra and key in self._extra)
+
+    def touch(self):
+        """Marca o registro como modificado (nova versão)"""
+        self.version += 1
+
+    def __repr__(self):
+        return f"PageRecord({self.to_dict()!r})"
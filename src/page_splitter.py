@@ -0,0 +1,201 @@
+"""
+Divisão de páginas muito grandes em capítulo + páginas do BookStack
+
+Páginas de vários MB ficam lentas para renderizar, buscar e versionar no
+BookStack. Acima de um limite de tamanho, a página é dividida nos
+cabeçalhos de nível 1 e 2: vira um capítulo com uma página por seção. As
+seções são renderizadas uma a uma, sob demanda, de modo que o HTML da
+página inteira nunca existe de uma vez na memória.
+"""
+
+from typing import Dict, Iterator, List, Optional
+
+from mwparserfromhell.nodes import Heading
+from mwparserfromhell.wikicode import Wikicode
+
+from src.wiki_document import WikiDocument
+
+_SIZE_CHUNK = 64 * 1024  # caracteres codificados por vez ao medir a página
+
+
+class PageSplitter:
+    """Divide páginas grandes por seções de nível 1 e 2"""
+
+    def __init__(self, split_threshold: int = 500_000, min_section_size: int = 2_000,
+                 lead_title: str = "Introdução", output_format: str = 'html',
+                 image_urls: Dict[str, str] = None, link_resolver=None, wiki_base_url: str = ""):
+        """
+        Inicializa o divisor
+
+        Args:
+            split_threshold: Tamanho (bytes de wikitext) a partir do qual a página é dividida
+            min_section_size: Seções menores que isso são agrupadas com as seguintes
+            lead_title: Nome da página com o conteúdo anterior ao primeiro cabeçalho
+            output_format: 'html' ou 'markdown'
+            image_urls: Mapa nome do arquivo -> URL da imagem no BookStack
+            link_resolver: Função título da wiki -> URL no BookStack
+            wiki_base_url: URL base da wiki para links não mapeados
+        """
+        if output_format not in ('html', 'markdown'):
+            raise ValueError(f"Formato de saída inválido: {output_format}")
+
+        self.split_threshold = split_threshold
+        self.min_section_size = min_section_size
+        self.lead_title = lead_title
+        self.output_format = output_format
+
+        if output_format == 'markdown':
+            from src.markdown_writer import WikitextMarkdownWriter
+            self._renderer = WikitextMarkdownWriter(image_urls, link_resolver, wiki_base_url)
+        else:
+            from src.html_renderer import WikitextHtmlRenderer
+            self._renderer = WikitextHtmlRenderer(image_urls, link_resolver, wiki_base_url)
+
+    def _as_document(self, page) -> WikiDocument:
+        if isinstance(page, WikiDocument):
+            return page
+        if isinstance(page, dict):
+            return WikiDocument.from_page_content(page)
+        return WikiDocument(page)
+
+    def needs_split(self, page) -> bool:
+        """Indica se a página passa do limite e tem cabeçalhos de nível 1 ou 2"""
+        document = self._as_document(page)
+        if not self._exceeds_threshold(document.wikitext):
+            return False
+        return any(heading.level <= 2 for heading in document.wikicode.filter_headings(recursive=False))
+
+    def _exceeds_threshold(self, wikitext: str) -> bool:
+        """
+        Compara o tamanho em UTF-8 com o limite sem copiar a página inteira
+
+        Cada caractere ocupa de 1 a 4 bytes, então o número de caracteres já
+        decide a maioria dos casos; no restante, os bytes são somados em
+        blocos até passar do limite.
+        """
+        if len(wikitext) > self.split_threshold:
+            return True
+        if len(wikitext) * 4 <= self.split_threshold:
+            return False
+        size = 0
+        for start in range(0, len(wikitext), _SIZE_CHUNK):
+            size += len(wikitext[start:start + _SIZE_CHUNK].encode('utf-8'))
+            if size > self.split_threshold:
+                return True
+        return False
+
+    def _render(self, nodes: List) -> str:
+        wikicode = Wikicode(nodes)
+        if self.output_format == 'markdown':
+            return self._renderer.to_markdown(wikicode)
+        return self._renderer.render(wikicode)
+
+    @staticmethod
+    def _iter_sections(document: WikiDocument) -> Iterator[tuple]:
+        """
+        Divide os nós de primeiro nível em seções (cabeçalho, nós)
+
+        Cada cabeçalho de nível 1 ou 2 abre uma nova seção; todo nó da página
+        fica em exatamente uma seção, incluindo o que vem sob '= Título ='.
+        """
+        heading, nodes = None, []
+        for node in document.wikicode.nodes:
+            if isinstance(node, Heading) and node.level <= 2:
+                if nodes:
+                    yield heading, nodes
+                heading, nodes = node, []
+            nodes.append(node)
+        if nodes:
+            yield heading, nodes
+
+    def _iter_groups(self, document: WikiDocument) -> Iterator[Dict]:
+        """Agrupa as seções (sem renderizar) respeitando min_section_size"""
+        group = None
+        pending = []  # introdução só com espaços: vai junto com a primeira seção
+        for heading, nodes in self._iter_sections(document):
+            size = sum(len(str(node)) for node in nodes)
+            if heading is None and not ''.join(str(node) for node in nodes).strip():
+                pending.extend(nodes)
+                continue
+            nodes, pending = pending + nodes, []
+            title = (heading.title.strip_code().strip() if heading is not None else '') or self.lead_title
+
+            if group is not None and group['size'] < self.min_section_size:
+                # Seção anterior pequena demais: incorporar esta (com o cabeçalho)
+                group['nodes'].extend(nodes)
+                group['size'] += size
+                continue
+            if group is not None:
+                yield group
+            # O cabeçalho que dá nome à página fica nos nós, mas não é renderizado
+            group = {'title': title, 'heading': heading, 'nodes': nodes, 'size': size}
+
+        if group is not None:
+            yield group
+
+    def iter_pages(self, page) -> Iterator[Dict]:
+        """
+        Produz as páginas da divisão, renderizando uma seção por vez
+
+        Args:
+            page: WikiDocument, dict de get_page_content_wikitext ou wikitext
+
+        Yields:
+            Dict com 'name', 'priority' e 'html' (ou 'markdown')
+        """
+        document = self._as_document(page)
+        for priority, group in enumerate(self._iter_groups(document), 1):
+            yield {
+                'name': group['title'],
+                'priority': priority,
+                self.output_format: self._render([node for node in group['nodes'] if node is not group['heading']])
+            }
+
+    def split_to_bookstack(self, page, bookstack_client, book_id: Optional[int],
+                           chapter_name: Optional[str] = None, tags: List[Dict] = None,
+                           chapter_id: Optional[int] = None) -> Dict:
+        """
+        Cria um capítulo com uma página por seção no BookStack
+
+        Cada seção é renderizada, enviada e descartada antes da próxima. Com o
+        índice do cliente carregado, o capítulo de mesmo nome no livro é
+        reaproveitado e as seções são atualizadas em vez de duplicadas.
+
+        Args:
+            page: WikiDocument, dict de get_page_content_wikitext ou wikitext
+            bookstack_client: BookStackClient configurado
+            book_id: Livro de destino (ignorado com chapter_id)
+            chapter_name: Nome do capítulo (padrão: título da página)
+            tags: Tags aplicadas a cada página criada
+            chapter_id: Capítulo já existente; o BookStack não aninha capítulos, então
+                as seções entram nele com o título da página como prefixo
+
+        Returns:
+            Dict com 'chapter' (None com chapter_id) e a lista 'pages' (id e nome) criadas
+        """
+        document = self._as_document(page)
+        chapter, prefix = None, ''
+        if chapter_id is None:
+            name = chapter_name or document.title
+            index = getattr(bookstack_client, 'index', None)
+            chapter = index.find_chapter(book_id, name=name) if index is not None else None
+            if chapter is None:
+                chapter = bookstack_client.create_chapter(book_id, name)
+                if index is not None:
+                    index.add_chapter({**chapter, 'book_id': book_id})
+            chapter_id = chapter.get('id')
+        else:
+            prefix = f"{chapter_name or document.title} - "
+        print(f"📚 Dividindo '{document.title}' no capítulo {chapter_id}")
+
+        created = []
+        for section_page in self.iter_pages(document):
+            section_page['name'] = (prefix + section_page['name'])[:255]
+            section_page['chapter_id'] = chapter_id
+            if tags:
+                section_page['tags'] = tags
+            result = bookstack_client.create_page(section_page)
+            created.append({'id': result.get('id'), 'name': section_page['name']})
+            print(f"   ✅ Seção criada: {section_page['name']}")
+
+        return {'chapter': chapter, 'pages': created}
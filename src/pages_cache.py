@@ -1,22 +1,89 @@
+import hashlib
 import json
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import List, Dict, Optional, Set
+
+from src.content_store import ContentStore
+from src.file_lock import FileLock
+from src.page_record import PageRecord
+from src.status_journal import StatusJournal
+from src.title_index import TitleSearchIndex
+
+# Versão do formato do arquivo; a primeira linha traz o cabeçalho
+CACHE_SCHEMA_VERSION = 2
+_HEADER_PREFIX = '{"header": '
 
 class PagesCache:
     """Gerencia cache de páginas da wiki para melhorar performance"""
     
-    def __init__(self, cache_file: str = "config/pages_cache.json"):
+    def __init__(self, cache_file: str = "config/pages_cache.json", use_journal: bool = True,
+                 compact_threshold: int = 5000, lazy: bool = False, shared: bool = False,
+                 content_dir: Optional[str] = None):
+        """
+        Inicializa o cache
+        
+        Args:
+            cache_file: Arquivo JSON do cache
+            use_journal: Registrar transições de status em journal
+            compact_threshold: Entradas do journal que disparam compactação
+            lazy: Ler só o cabeçalho agora; o catálogo é carregado no primeiro
+                uso (ou em background com load_async)
+            shared: Arquivo compartilhado entre processos: save_cache grava sob
+                lock do sistema operacional e antes incorpora, registro a registro
+                (pela versão), o que os outros processos gravaram. Exclusões são
+                gravadas como marcadores (pageid -> versão) para não voltarem no merge
+            content_dir: Diretório do conteúdo das páginas (padrão: <cache>_content)
+        """
         self.cache_file = cache_file
         self.pages_data = []
         self.last_updated = None
+        self.header = None
+        
+        # Modo compartilhado: lock entre processos e merge por versão de registro
+        self.shared = shared
+        self.lock_file = cache_file + ".lock"
+        self._disk_checksum = None  # checksum do arquivo na última leitura/gravação deste processo
+        self._tombstones: Dict[int, int] = {}  # páginas excluídas -> versão do registro excluído
+        
+        # Carga completa do catálogo: feita uma única vez, sob demanda
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._load_thread = None
+        self._load_callbacks = []
+        self._load_result = False
+        
+        # Journal de status: cada transição custa um append, o snapshot só é
+        # reescrito na compactação (save_cache ou em background)
+        self._lock = threading.RLock()
+        # (no modo compartilhado o arquivo é a fonte da verdade: sem journal por processo)
+        use_journal = use_journal and not shared
+        self.journal = StatusJournal(os.path.splitext(cache_file)[0] + ".journal.jsonl") if use_journal else None
+        self.compact_threshold = compact_threshold
+        self._compact_thread = None
+        # Serializa gravações inteiras (rotate → temp → replace → discard): uma compactação
+        # em background e um save_cache explícito não podem se intercalar
+        self._save_lock = threading.Lock()
+        
+        # Conteúdo das páginas fica fora do catálogo, lido sob demanda
+        self.content_store = ContentStore(content_dir or os.path.splitext(cache_file)[0] + "_content")
+        
+        # Alterações ainda não gravadas no snapshot (save_cache pode ser pulado se False)
+        self._dirty = False
         
         # Otimização: Índices para acesso rápido O(1)
         self._pages_by_id = {}      # {pageid: page_dict}
-        self._pages_by_status = {}  # {status: [page_dict, ...]}
+        self._pages_by_status = {}  # {status: {pageid: page_dict}} - ordem de inserção, movimentação O(1)
+        self._title_index = TitleSearchIndex()  # trigramas/prefixo sobre títulos, atualizado por diferença
+        self._title_index_stale = True
         self._indices_built = False
         
-        self.load_cache()
+        if lazy:
+            self.read_header()
+        else:
+            self.load_cache()
     
     def _build_indices(self):
         """Constrói índices para acesso rápido"""
@@ -32,98 +99,464 @@ class PagesCache:
                 self._pages_by_id[page_id] = page
             
             # Índice por status
-            if status not in self._pages_by_status:
-                self._pages_by_status[status] = []
-            self._pages_by_status[status].append(page)
+            self._pages_by_status.setdefault(status, {})[self._status_key(page)] = page
+        
+        # Índice de títulos: sincronizado na próxima busca (não atrasa a carga)
+        self._title_index_stale = True
         
         self._indices_built = True
     
+    @staticmethod
+    def _status_key(page: Dict):
+        """Chave da página nos buckets de status (pageid; identidade se não houver)"""
+        page_id = page.get('pageid')
+        return page_id if page_id is not None else id(page)
+    
     def _ensure_indices(self):
-        """Garante que os índices estão construídos"""
+        """Garante que o catálogo está carregado e os índices construídos"""
+        self._ensure_loaded()
         if not self._indices_built:
             self._build_indices()
     
+    def _ensure_loaded(self):
+        """Carrega o catálogo completo se ainda não foi carregado (espera carga em andamento)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_full()
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Indica se o catálogo completo já está em memória"""
+        return self._loaded
+    
+    def read_header(self) -> Optional[Dict]:
+        """
+        Lê apenas o cabeçalho (primeira linha) do arquivo de cache
+        
+        Returns:
+            Cabeçalho com contagens por status, last_updated, schema_version e
+            checksum, ou None se o arquivo não existir ou for do formato antigo
+        """
+        header = self._read_disk_header()
+        if header is None:
+            return None
+        self.header = header
+        self.last_updated = header.get('last_updated')
+        return header
+    
+    def _read_disk_header(self) -> Optional[Dict]:
+        """Cabeçalho atualmente gravado no arquivo (sem alterar o estado em memória)"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                first_line = f.readline()
+        except OSError:
+            return None
+        if not first_line.startswith(_HEADER_PREFIX):
+            return None
+        try:
+            return json.loads(first_line[len(_HEADER_PREFIX):].rstrip().rstrip(','))
+        except ValueError:
+            return None
+    
     def load_cache(self) -> bool:
-        """Carrega o cache do arquivo JSON"""
+        """Carrega o cache do arquivo JSON e reaplica o journal de status"""
+        with self._load_lock:
+            return self._load_full()
+    
+    def load_async(self, callback=None) -> threading.Thread:
+        """
+        Carrega o catálogo completo em uma thread de fundo
+        
+        Args:
+            callback: Chamado na thread de fundo com True/False (arquivo lido) ao terminar
+        
+        Returns:
+            Thread da carga (a mesma, se já houver uma em andamento)
+        """
+        def worker():
+            self._ensure_loaded()
+            with self._lock:
+                callbacks, self._load_callbacks = self._load_callbacks, []
+                self._load_thread = None
+            for pending_callback in callbacks:
+                pending_callback(self._load_result)
+        
+        with self._lock:
+            if callback:
+                self._load_callbacks.append(callback)
+            if self._load_thread is None:
+                self._load_thread = threading.Thread(target=worker, daemon=True)
+                self._load_thread.start()
+            return self._load_thread
+    
+    def _load_full(self) -> bool:
+        """Lê o arquivo inteiro, confere o checksum e reaplica o journal (chamar com _load_lock)"""
         try:
             if os.path.exists(self.cache_file):
                 with open(self.cache_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.pages_data = data.get('pages', [])
+                    text = f.read()
+                data = json.loads(text)
+                header = data.get('header')
+                if header and header.get('checksum') != self._body_checksum(text):
+                    print("⚠️ Checksum do cache não confere (arquivo editado ou gravação incompleta)")
+                with self._lock:
+                    self.header = header
+                    self._disk_checksum = header.get('checksum') if header else None
+                    # Registros compactos (__slots__) no lugar de um dict por página
+                    self.pages_data = [PageRecord.from_dict(page) for page in data.get('pages', [])]
                     self.last_updated = data.get('last_updated')
-                    return True
-            return False
+                    if self.shared:
+                        self._tombstones = self._read_tombstones(data)
+                    self._replay_journal()
+                    self._migrate_inline_content()
+                self._load_result = True
+            else:
+                self._load_result = False
         except Exception as e:
             print(f"Erro ao carregar cache: {e}")
-            return False
+            self._load_result = False
+        finally:
+            # Mesmo sem arquivo (ou com erro) o catálogo em memória passa a valer
+            self._loaded = True
+        return self._load_result
+    
+    @staticmethod
+    def _body_checksum(text: str) -> Optional[str]:
+        """SHA-1 do corpo do arquivo (tudo depois da linha do cabeçalho)"""
+        newline = text.find('\n')
+        if newline < 0:
+            return None
+        return hashlib.sha1(('{' + text[newline:]).encode('utf-8')).hexdigest()
+    
+    def _replay_journal(self):
+        """Aplica sobre o snapshot as transições registradas depois dele"""
+        self._build_indices()
+        if not self.journal:
+            return
+        
+        replayed = 0
+        for entry in self.journal.replay():
+            if entry.get('op') == 'reset':
+                for page in self.pages_data:
+                    page['status'] = 0
+                    page['last_processed'] = None
+                    page['error_message'] = None
+                    page.touch()
+            else:
+                page = self._pages_by_id.get(entry.get('pageid'))
+                if page is None:
+                    continue
+                page['status'] = entry.get('status', 0)
+                page['last_processed'] = entry.get('last_processed')
+                page['error_message'] = entry.get('error_message')
+                page['version'] = entry.get('version', page['version'] + 1)
+            replayed += 1
+        
+        if replayed:
+            self._dirty = True
+            self._build_indices()
+            self.journal.entries = replayed
+            print(f"📒 {replayed} transições de status recuperadas do journal")
+    
+    def _migrate_inline_content(self):
+        """Move conteúdos gravados dentro do catálogo (formato antigo) para o content_store"""
+        migrated = 0
+        for page in self.pages_data:
+            if 'content' in page:
+                content = page.pop('content')
+                if content is not None and page.get('pageid') is not None:
+                    page['content_ref'] = self.content_store.put(page['pageid'], content)
+                    migrated += 1
+        if migrated:
+            print(f"📦 {migrated} conteúdos movidos do catálogo para {self.content_store.directory}")
+    
+    def _journal(self, entry: Dict):
+        """Registra uma transição no journal e agenda compactação se necessário"""
+        if not self.journal:
+            return
+        self.journal.append(entry)
+        if self.journal.entries >= self.compact_threshold:
+            self.compact_async()
+    
+    def compact_async(self):
+        """Compacta o journal no snapshot em uma thread de fundo"""
+        with self._lock:
+            if self._compact_thread is not None and self._compact_thread.is_alive():
+                return
+            self._compact_thread = threading.Thread(target=self.save_cache, daemon=True)
+            self._compact_thread.start()
     
     def save_cache(self) -> bool:
-        """Salva o cache no arquivo JSON"""
+        """Salva o snapshot no arquivo JSON e descarta o journal incorporado"""
+        # Nunca gravar um catálogo que ainda não foi lido por cima do arquivo
+        self._ensure_loaded()
+        if not self.shared:
+            return self._write_snapshot()
+        
+        # Modo compartilhado: ler-mesclar-gravar sob lock exclusivo entre processos
         try:
-            # Criar diretório se não existir
-            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
-            
-            cache_data = {
-                'last_updated': datetime.now().isoformat(),
-                'total_pages': len(self.pages_data),
-                'pages': self.pages_data
-            }
-            
-            with open(self.cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-            
-            self.last_updated = cache_data['last_updated']
-            return True
-        except Exception as e:
+            with FileLock(self.lock_file):
+                with self._lock:
+                    self._merge_from_disk()
+                return self._write_snapshot()
+        except TimeoutError as e:
             print(f"Erro ao salvar cache: {e}")
             return False
     
+    @staticmethod
+    def _read_tombstones(data: Dict) -> Dict[int, int]:
+        """Marcadores de exclusão gravados no snapshot (chaves JSON são strings)"""
+        return {int(pageid): version for pageid, version in (data.get('deleted') or {}).items()}
+    
+    def _record_deletion(self, page: Dict):
+        """Marca a página como excluída por este processo (só no modo compartilhado)"""
+        if self.shared and page.get('pageid'):
+            self._tombstones[page['pageid']] = max(page.get('version', 0),
+                                                   self._tombstones.get(page['pageid'], -1))
+    
+    def _revive(self, page: PageRecord):
+        """Página excluída que voltou: a versão passa a superar o marcador de exclusão"""
+        version = self._tombstones.pop(page.get('pageid'), None)
+        if version is not None and page['version'] <= version:
+            page['version'] = version + 1
+    
+    def _merge_from_disk(self) -> int:
+        """
+        Incorpora registros gravados por outros processos desde a nossa última leitura
+        
+        Para cada página prevalece o registro de maior versão; em empate, o
+        processado mais recentemente. Páginas que só existem no disco são
+        adicionadas, a menos que este processo as tenha excluído (marcador com
+        versão maior ou igual); páginas que outro processo excluiu saem daqui
+        se o registro local não for mais novo que o marcador. Chamar com o
+        lock de arquivo e self._lock adquiridos.
+        
+        Returns:
+            Número de registros adotados do disco (exclusões incluídas)
+        """
+        header = self._read_disk_header()
+        if header is None or header.get('checksum') == self._disk_checksum:
+            return 0  # ninguém gravou desde a nossa última leitura/gravação
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            disk_pages = data.get('pages', [])
+            disk_tombstones = self._read_tombstones(data)
+        except Exception as e:
+            print(f"⚠️ Não foi possível ler o cache para merge: {e}")
+            return 0
+        
+        self._ensure_indices()
+        adopted = 0
+        for disk_page in disk_pages:
+            pageid = disk_page.get('pageid')
+            local = self._pages_by_id.get(pageid)
+            if local is None:
+                if not pageid or self._tombstones.get(pageid, -1) >= disk_page.get('version', 0):
+                    continue  # sem pageid, ou excluída aqui depois dessa versão
+                self._tombstones.pop(pageid, None)
+                record = PageRecord.from_dict(disk_page)
+                self.pages_data.append(record)
+                self._pages_by_id[pageid] = record
+                self._pages_by_status.setdefault(record['status'], {})[pageid] = record
+                adopted += 1
+                continue
+            
+            disk_version = disk_page.get('version', 0)
+            if disk_version < local['version'] or (
+                    disk_version == local['version']
+                    and (disk_page.get('last_processed') or '') <= (local['last_processed'] or '')):
+                continue
+            
+            old_status = local['status']
+            for key in ('title', 'status', 'last_processed', 'error_message', 'content_ref', 'version'):
+                local[key] = disk_page.get(key, 0 if key in ('status', 'version') else None)
+            if old_status != local['status']:
+                self._pages_by_status.get(old_status, {}).pop(pageid, None)
+                self._pages_by_status.setdefault(local['status'], {})[pageid] = local
+            adopted += 1
+        
+        # Exclusões feitas por outros processos (o conteúdo já foi apagado por quem excluiu)
+        removed = set()
+        for pageid, version in disk_tombstones.items():
+            local = self._pages_by_id.get(pageid)
+            if local is not None and local['version'] > version:
+                continue  # alterada aqui depois da exclusão: o registro local prevalece
+            if local is not None:
+                del self._pages_by_id[pageid]
+                self._pages_by_status.get(local['status'], {}).pop(pageid, None)
+                removed.add(id(local))
+            self._tombstones[pageid] = max(version, self._tombstones.get(pageid, -1))
+        if removed:
+            self.pages_data = [page for page in self.pages_data if id(page) not in removed]
+            adopted += len(removed)
+        
+        if adopted:
+            self._dirty = True
+            self._title_index_stale = True
+            print(f"🔀 {adopted} registros gravados por outro processo incorporados ao cache")
+        return adopted
+    
+    def _write_snapshot(self) -> bool:
+        """Serializa o catálogo e o grava atomicamente (arquivo temporário + rename)"""
+        with self._save_lock:
+            try:
+                # Criar diretório se não existir
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                
+                with self._lock:
+                    # Transições a partir daqui vão para um journal novo
+                    if self.journal:
+                        self.journal.rotate()
+                    cache_data = {
+                        'last_updated': datetime.now().isoformat(),
+                        'total_pages': len(self.pages_data),
+                        'pages': self.pages_data
+                    }
+                    if self.shared and self._tombstones:
+                        cache_data['deleted'] = {str(pageid): version for pageid, version in self._tombstones.items()}
+                    # 'version' só serve ao merge entre processos: fora do modo compartilhado
+                    # o arquivo mantém o formato de antes dos registros compactos
+                    body = json.dumps(cache_data, ensure_ascii=False, indent=2,
+                                      default=lambda record: record.to_dict(include_version=self.shared))
+                    status_counts = {}
+                    for page in self.pages_data:
+                        status = str(page.get('status', 0))
+                        status_counts[status] = status_counts.get(status, 0) + 1
+                    header = {
+                        'schema_version': CACHE_SCHEMA_VERSION,
+                        'last_updated': cache_data['last_updated'],
+                        'total_pages': cache_data['total_pages'],
+                        'status_counts': status_counts,
+                        'checksum': hashlib.sha1(body.encode('utf-8')).hexdigest()
+                    }
+                    # Cabeçalho sozinho na primeira linha; o arquivo continua sendo um JSON válido
+                    serialized = _HEADER_PREFIX + json.dumps(header, ensure_ascii=False) + ',' + body[1:]
+                    # Alterações feitas durante a gravação voltam a marcar o cache como sujo
+                    self._dirty = False
+                
+                # Gravação atômica: o snapshot anterior continua válido até o replace
+                temp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.write(serialized)
+                os.replace(temp_file, self.cache_file)
+                
+                # Só agora o segmento rotacionado está incorporado a um snapshot gravado
+                if self.journal:
+                    self.journal.discard_rotated()
+                
+                self.last_updated = cache_data['last_updated']
+                self.header = header
+                self._disk_checksum = header['checksum']
+                return True
+            except Exception as e:
+                self._dirty = True
+                print(f"Erro ao salvar cache: {e}")
+                return False
+    
     def update_pages_from_api(self, api_pages: List[Dict]) -> int:
         """Atualiza o cache com páginas da API, preservando status existente"""
-        # Criar dicionário de páginas existentes por ID para lookup rápido
-        existing_pages = {page['pageid']: page for page in self.pages_data}
+        return self.merge_pages_from_api(api_pages)['added']
+    
+    def merge_pages_from_api(self, api_pages: List[Dict]) -> Dict:
+        """
+        Aplica a lista da API ao cache em uma única passada (delta merge)
+        
+        Registros existentes são reaproveitados e só são modificados quando o
+        título mudou; páginas ausentes da lista são removidas (com o conteúdo
+        armazenado) na mesma operação. Os índices são ajustados por diferença.
         
-        updated_pages = []
-        new_count = 0
+        Args:
+            api_pages: Páginas retornadas pela API ({'pageid', 'title'})
         
-        for api_page in api_pages:
-            pageid = api_page.get('pageid')
-            title = api_page.get('title', '')
+        Returns:
+            Diff com as contagens 'added', 'renamed', 'deleted' e 'unchanged'
+            e os pageids em 'added_pageids', 'renamed_pageids' e 'deleted_pageids'
+        """
+        self._ensure_loaded()
+        with self._lock:
+            self._ensure_indices()
+            # Páginas sem pageid não têm como casar com a API: exigem reconstrução
+            rebuild = len(self._pages_by_id) != len(self.pages_data)
+            remaining = dict(self._pages_by_id)  # o que sobrar no fim foi apagado na wiki
+            merged_pages = []
+            diff = {'added': 0, 'renamed': 0, 'deleted': 0, 'unchanged': 0,
+                    'added_pageids': [], 'renamed_pageids': [], 'deleted_pageids': []}
             
-            # Se página já existe, preservar status
-            if pageid in existing_pages:
-                existing_page = existing_pages[pageid]
-                updated_page = {
-                    'pageid': pageid,
-                    'title': title,
-                    'link': f"index.php?curid={pageid}",
-                    'status': existing_page.get('status', 0),  # Preservar status
-                    'last_processed': existing_page.get('last_processed'),
-                    'error_message': existing_page.get('error_message')
-                }
-            else:
-                # Nova página
-                updated_page = {
-                    'pageid': pageid,
-                    'title': title,
-                    'link': f"index.php?curid={pageid}",
-                    'status': 0,  # Não processada
-                    'last_processed': None,
-                    'error_message': None
-                }
-                new_count += 1
+            for api_page in api_pages:
+                pageid = api_page.get('pageid')
+                title = api_page.get('title', '')
+                
+                page = remaining.pop(pageid, None)
+                if page is None:
+                    if pageid is not None and pageid in self._pages_by_id:
+                        continue  # pageid repetido na resposta da API
+                    # Nova página
+                    page = PageRecord(pageid, title, status=0)  # Não processada
+                    self._revive(page)
+                    diff['added'] += 1
+                    diff['added_pageids'].append(pageid)
+                    if pageid:
+                        self._pages_by_id[pageid] = page
+                    self._pages_by_status.setdefault(0, {})[self._status_key(page)] = page
+                elif page.get('title') != title:
+                    page['title'] = title
+                    page.touch()
+                    diff['renamed'] += 1
+                    diff['renamed_pageids'].append(pageid)
+                else:
+                    diff['unchanged'] += 1
+                
+                merged_pages.append(page)
             
-            updated_pages.append(updated_page)
+            for pageid, page in remaining.items():
+                del self._pages_by_id[pageid]
+                self._pages_by_status.get(page.get('status', 0), {}).pop(pageid, None)
+                self._record_deletion(page)
+                if page.get('content_ref'):
+                    self.content_store.delete(pageid)
+                diff['deleted'] += 1
+                diff['deleted_pageids'].append(pageid)
+            
+            self.pages_data = merged_pages
+            changed = bool(diff['added'] or diff['renamed'] or diff['deleted'])
+            if changed:
+                self._dirty = True
+            if rebuild:
+                self._build_indices()
+            elif changed:
+                self._title_index_stale = True
         
-        self.pages_data = updated_pages
-        # Reconstruir índices após atualização
-        self._build_indices()
-        return new_count
+        return diff
     
     def get_pages_by_status(self, status: int) -> List[Dict]:
         """Retorna páginas filtradas por status (otimizado com índices)"""
         self._ensure_indices()
-        return self._pages_by_status.get(status, []).copy()  # Retorna cópia para segurança
+        return list(self._pages_by_status.get(status, {}).values())  # Retorna cópia para segurança
+    
+    def count_by_status(self, status: int) -> int:
+        """Número de páginas com o status (O(1))"""
+        self._ensure_indices()
+        return len(self._pages_by_status.get(status, ()))
+    
+    def iter_page(self, status: int, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """
+        Retorna uma janela das páginas com o status, na ordem do índice
+        
+        Args:
+            status: Status das páginas (0 = pendente, 1 = processada)
+            offset: Quantidade de páginas a pular
+            limit: Tamanho máximo da janela
+        
+        Returns:
+            Lista com até `limit` páginas
+        """
+        self._ensure_indices()
+        bucket = self._pages_by_status.get(status, {})
+        offset = max(0, offset)
+        return list(islice(bucket.values(), offset, offset + max(0, limit)))
     
     def get_pending_pages(self) -> List[Dict]:
         """Retorna páginas não processadas (status = 0) - otimizado"""
@@ -135,45 +568,67 @@ class PagesCache:
     
     def update_page_status(self, pageid: int, status: int, error_message: str = None) -> bool:
         """Atualiza o status de uma página específica (otimizado com índice)"""
-        self._ensure_indices()
+        # Carga fora do _lock: a thread de carga adquire _load_lock e depois _lock
+        self._ensure_loaded()
+        with self._lock:
+            self._ensure_indices()
         
-        # Busca rápida O(1) usando índice
-        page = self._pages_by_id.get(pageid)
-        if page:
-            old_status = page.get('status', 0)
+            # Busca rápida O(1) usando índice
+            page = self._pages_by_id.get(pageid)
+            if page:
+                old_status = page.get('status', 0)
             
-            # Atualizar dados
-            page['status'] = status
-            page['last_processed'] = datetime.now().isoformat()
-            if error_message:
-                page['error_message'] = error_message
-            elif status == 1:  # Sucesso - limpar erro anterior
-                page['error_message'] = None
+                # Atualizar dados
+                page.touch()
+                self._dirty = True
+                page['status'] = status
+                page['last_processed'] = datetime.now().isoformat()
+                if error_message:
+                    page['error_message'] = error_message
+                elif status == 1:  # Sucesso - limpar erro anterior
+                    page['error_message'] = None
             
-            # Atualizar índices apenas se status mudou
-            if old_status != status:
-                # Remover da lista do status antigo
-                if old_status in self._pages_by_status:
-                    self._pages_by_status[old_status] = [
-                        p for p in self._pages_by_status[old_status] if p.get('pageid') != pageid
-                    ]
-                
-                # Adicionar na lista do novo status
-                if status not in self._pages_by_status:
-                    self._pages_by_status[status] = []
-                self._pages_by_status[status].append(page)
+                self._journal({
+                    'pageid': pageid,
+                    'status': status,
+                    'last_processed': page['last_processed'],
+                    'error_message': page.get('error_message'),
+                    'version': page['version']
+                })
             
-            return True
-        return False
+                # Atualizar índices apenas se status mudou (O(1): remoção/inserção em dict)
+                if old_status != status:
+                    self._pages_by_status.get(old_status, {}).pop(pageid, None)
+                    self._pages_by_status.setdefault(status, {})[pageid] = page
+            
+                return True
+            return False
     
     def get_statistics(self) -> Dict:
-        """Retorna estatísticas do cache (otimizado)"""
+        """
+        Retorna estatísticas do cache (otimizado)
+        
+        Antes da carga completa, usa as contagens do cabeçalho (estado do
+        último snapshot, sem as transições ainda no journal).
+        """
+        if not self._loaded and self.header:
+            counts = self.header.get('status_counts', {})
+            total = self.header.get('total_pages', 0)
+            processed = counts.get('1', 0)
+            return {
+                'total_pages': total,
+                'pending_pages': counts.get('0', 0),
+                'processed_pages': processed,
+                'progress_percentage': (processed / total * 100) if total > 0 else 0,
+                'last_updated': self.header.get('last_updated')
+            }
+        
         self._ensure_indices()
         
         total = len(self.pages_data)
         # Usar índices para contagem rápida
-        pending = len(self._pages_by_status.get(0, []))
-        processed = len(self._pages_by_status.get(1, []))
+        pending = len(self._pages_by_status.get(0, ()))
+        processed = len(self._pages_by_status.get(1, ()))
         
         return {
             'total_pages': total,
@@ -183,23 +638,51 @@ class PagesCache:
             'last_updated': self.last_updated
         }
     
-    def search_pages(self, search_term: str) -> List[Dict]:
-        """Busca páginas por termo no título"""
-        search_term = search_term.lower()
-        return [
-            page for page in self.pages_data 
-            if search_term in page.get('title', '').lower()
-        ]
+    def search_pages(self, search_term: str, limit: Optional[int] = None, prefix: bool = False,
+                     status: Optional[int] = None) -> List[Dict]:
+        """
+        Busca páginas por termo no título (índice de trigramas, sem varrer o cache)
+        
+        Acentos e maiúsculas são ignorados: "aplicacao" encontra "Aplicação".
+        
+        Args:
+            search_term: Trecho (ou início, com prefix=True) do título
+            limit: Número máximo de resultados (None = todos)
+            prefix: Buscar títulos que começam com o termo
+            status: Restringir a páginas com este status
+        
+        Returns:
+            Páginas encontradas, em ordem alfabética de título
+        """
+        # Carga fora do _lock: a thread de carga adquire _load_lock e depois _lock
+        self._ensure_loaded()
+        with self._lock:
+            self._ensure_indices()
+            if self._title_index_stale:
+                # Só títulos novos/alterados/removidos são reindexados
+                self._title_index.sync({
+                    page_id: page.get('title', '') for page_id, page in self._pages_by_id.items()
+                })
+                self._title_index_stale = False
+            pages = (self._pages_by_id[page_id] for page_id in self._title_index.search(search_term, prefix=prefix))
+            if status is not None:
+                pages = (page for page in pages if page.get('status', 0) == status)
+            return list(islice(pages, limit))
     
     def reset_all_status(self):
         """Reseta o status de todas as páginas para 0 (não processado)"""
-        for page in self.pages_data:
-            page['status'] = 0
-            page['last_processed'] = None
-            page['error_message'] = None
-        
-        # Reconstruir índices após reset
-        self._build_indices()
+        self._ensure_loaded()
+        with self._lock:
+            for page in self.pages_data:
+                page['status'] = 0
+                page['last_processed'] = None
+                page['error_message'] = None
+                page.touch()
+            self._dirty = True
+            self._journal({'op': 'reset'})
+            
+            # Reconstruir índices após reset
+            self._build_indices()
     
     def mark_pages_as_processed(self, pageids: List[int]):
         """Marca múltiplas páginas como processadas (otimizado)"""
@@ -213,16 +696,87 @@ class PagesCache:
         self._ensure_indices()
         return self._pages_by_id.get(pageid)
     
-    def remove_deleted_pages(self, current_pageids: List[int]):
-        """Remove páginas que não existem mais na wiki"""
+    def remove_deleted_pages(self, current_pageids: List[int]) -> int:
+        """Remove páginas que não existem mais na wiki (já feito por merge_pages_from_api)"""
+        self._ensure_indices()
         current_ids_set = set(current_pageids)
-        self.pages_data = [
-            page for page in self.pages_data 
-            if page.get('pageid') in current_ids_set
-        ]
+        deleted = [page for page in self.pages_data if page.get('pageid') not in current_ids_set]
+        if not deleted:
+            return 0
         
-        # Reconstruir índices após remoção
-        self._build_indices()
+        with self._lock:
+            self._dirty = True
+            for page in deleted:
+                self._record_deletion(page)
+                if page.get('content_ref'):
+                    self.content_store.delete(page['pageid'])
+            self.pages_data = [
+                page for page in self.pages_data 
+                if page.get('pageid') in current_ids_set
+            ]
+            
+            # Reconstruir índices após remoção
+            self._build_indices()
+        return len(deleted)
+    
+    @property
+    def is_dirty(self) -> bool:
+        """Indica se há alterações ainda não gravadas no snapshot"""
+        return self._dirty
+    
+    def detach_page(self, pageid: int) -> Optional[PageRecord]:
+        """
+        Retira uma página do catálogo preservando seu conteúdo armazenado
+        
+        Usado para mover a página para outro cache (ex.: mudança de namespace).
+        
+        Returns:
+            Registro retirado ou None se a página não existir
+        """
+        detached = self.detach_pages({pageid})
+        return detached[0] if detached else None
+    
+    def detach_pages(self, pageids: Set[int]) -> List[PageRecord]:
+        """
+        Retira várias páginas do catálogo de uma vez (lista reconstruída uma só vez)
+        
+        Args:
+            pageids: IDs das páginas a retirar (IDs ausentes são ignorados)
+        
+        Returns:
+            Registros retirados, com status e referência de conteúdo preservados
+        """
+        self._ensure_indices()
+        with self._lock:
+            detached = []
+            for pageid in pageids:
+                page = self._pages_by_id.pop(pageid, None)
+                if page is None:
+                    continue
+                self._pages_by_status.get(page.get('status', 0), {}).pop(pageid, None)
+                self._record_deletion(page)
+                detached.append(page)
+            if detached:
+                detached_ids = {id(page) for page in detached}
+                self.pages_data = [page for page in self.pages_data if id(page) not in detached_ids]
+                self._title_index_stale = True
+                self._dirty = True
+            return detached
+    
+    def attach_pages(self, pages: List[PageRecord]):
+        """Inclui registros vindos de outro cache (status e conteúdo preservados)"""
+        self._ensure_indices()
+        with self._lock:
+            for page in pages:
+                pageid = page.get('pageid')
+                if not pageid or pageid in self._pages_by_id:
+                    continue
+                self._revive(page)
+                self.pages_data.append(page)
+                self._pages_by_id[pageid] = page
+                self._pages_by_status.setdefault(page.get('status', 0), {})[pageid] = page
+            self._title_index_stale = True
+            self._dirty = True
     
     def get_page_content(self, pageid: int) -> Optional[str]:
         """
@@ -236,7 +790,10 @@ class PagesCache:
         """
         self._ensure_indices()
         page = self._pages_by_id.get(pageid)
-        return page.get('content') if page else None
+        if not page:
+            return None
+        # O arquivo é lido só agora; o catálogo guarda apenas a referência
+        return self.content_store.get(pageid)
     
     def set_page_content(self, pageid: int, content: str) -> bool:
         """
@@ -252,8 +809,10 @@ class PagesCache:
         self._ensure_indices()
         page = self._pages_by_id.get(pageid)
         if page:
-            page['content'] = content
+            page['content_ref'] = self.content_store.put(pageid, content)
             page['last_processed'] = datetime.now().isoformat()
+            page.touch()
+            self._dirty = True
             return True
         return False
     
@@ -264,4 +823,43 @@ class PagesCache:
         Returns:
             Lista de todas as páginas
         """
+        self._ensure_loaded()
         return self.pages_data.copy()
+
+
+def create_pages_cache(backend: str = "json", cache_file: str = None, **options):
+    """
+    Cria o cache de páginas com o backend escolhido
+
+    Args:
+        backend: 'json' (PagesCache), 'sqlite' (SQLitePagesCache) ou
+            'sharded' (ShardedPagesCache, um arquivo por namespace)
+        cache_file: Arquivo do cache (diretório no 'sharded'; padrão de cada backend se omitido)
+        **options: Opções do PagesCache (lazy, shared, ...) para 'json' e 'sharded'; o
+            SQLite as ignora (consultas vão direto ao banco, compartilhado pelo WAL)
+
+    Returns:
+        Instância de cache com a API do PagesCache
+    """
+    if backend == "sqlite":
+        from src.pages_cache_sqlite import SQLitePagesCache
+        cache = SQLitePagesCache(cache_file or "config/pages_cache.db")
+        # Primeira execução com SQLite: migrar o cache JSON existente
+        json_file = "config/pages_cache.json"
+        if not cache.load_cache() and os.path.exists(json_file):
+            cache.import_json(json_file)
+        return cache
+    if backend == "sharded":
+        from src.sharded_pages_cache import ShardedPagesCache
+        cache = ShardedPagesCache(cache_file or "config/pages_cache", **options)
+        # Primeira execução particionada: o cache JSON vai inteiro para o namespace 0;
+        # a próxima atualização da API move cada página para o shard do seu namespace
+        json_file = "config/pages_cache.json"
+        if not cache.namespaces and os.path.exists(json_file):
+            cache.shard(0).attach_pages(PagesCache(json_file).get_all_pages())
+            cache.save_cache()
+            cache.load_cache()
+        return cache
+    if backend == "json":
+        return PagesCache(cache_file or "config/pages_cache.json", **options)
+    raise ValueError(f"Backend de cache desconhecido: {backend}")
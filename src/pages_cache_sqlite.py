@@ -0,0 +1,514 @@
+"""
+Backend SQLite do cache de páginas
+
+Mesma API pública do PagesCache, mas as páginas ficam numa tabela
+indexada (pageid, status, título) em vez de um JSON monolítico: mudar o
+status de uma página é um UPDATE de uma linha, as escritas são agrupadas
+em transações e o modo WAL permite leitores concorrentes.
+
+A busca por título usa a coluna title_folded (título sem acentos e em
+minúsculas, gravado junto com o título): o prefixo é uma faixa no índice
+dela e o trecho, uma consulta FTS5 com tokenizador de trigramas.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.title_index import fold_text
+
+# Colunas expostas nos dicts de página (o conteúdo fica fora, ver get_page_content)
+_PAGE_COLUMNS = ('pageid', 'title', 'link', 'status', 'last_processed', 'error_message')
+_SELECT_PAGES = f"SELECT {', '.join(_PAGE_COLUMNS)} FROM pages"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    pageid INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_folded TEXT NOT NULL DEFAULT '',
+    link TEXT,
+    status INTEGER NOT NULL DEFAULT 0,
+    last_processed TEXT,
+    error_message TEXT,
+    content TEXT,
+    position INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_pages_status ON pages (status, position);
+CREATE INDEX IF NOT EXISTS idx_pages_title ON pages (title);
+CREATE INDEX IF NOT EXISTS idx_pages_position ON pages (position);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Criado depois da migração (bancos antigos ainda não têm a coluna)
+_TITLE_FOLDED_INDEX = "CREATE INDEX IF NOT EXISTS idx_pages_title_folded ON pages (title_folded, pageid)"
+
+# Índice de trigramas sobre title_folded, mantido pelos triggers
+_TITLE_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE pages_title_fts USING fts5(
+    title_folded, content='pages', content_rowid='pageid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS pages_title_fts_insert AFTER INSERT ON pages BEGIN
+    INSERT INTO pages_title_fts (rowid, title_folded) VALUES (new.pageid, new.title_folded);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_title_fts_delete AFTER DELETE ON pages BEGIN
+    INSERT INTO pages_title_fts (pages_title_fts, rowid, title_folded)
+    VALUES ('delete', old.pageid, old.title_folded);
+END;
+CREATE TRIGGER IF NOT EXISTS pages_title_fts_update AFTER UPDATE OF title_folded ON pages
+WHEN old.title_folded IS NOT new.title_folded BEGIN
+    INSERT INTO pages_title_fts (pages_title_fts, rowid, title_folded)
+    VALUES ('delete', old.pageid, old.title_folded);
+    INSERT INTO pages_title_fts (rowid, title_folded) VALUES (new.pageid, new.title_folded);
+END;
+INSERT INTO pages_title_fts (pages_title_fts) VALUES ('rebuild');
+"""
+
+# Maior caractere Unicode: limite superior da faixa de um prefixo no índice
+_MAX_CHAR = '\U0010ffff'
+
+
+class SQLitePagesCache:
+    """Cache de páginas da wiki armazenado em SQLite (WAL)"""
+
+    def __init__(self, cache_file: str = "config/pages_cache.db", batch_size: int = 500):
+        """
+        Inicializa o cache
+
+        Args:
+            cache_file: Arquivo do banco SQLite
+            batch_size: Número de escritas agrupadas por transação
+        """
+        self.cache_file = cache_file
+        self.batch_size = batch_size
+        self.last_updated = None
+        self.header = None
+
+        directory = os.path.dirname(cache_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Uma conexão compartilhada (protegida por lock) vê as próprias escritas
+        # ainda não confirmadas; outros processos leem em paralelo graças ao WAL
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.create_function('py_fold', 1, fold_text, deterministic=True)
+        self._conn.executescript(_SCHEMA)
+        self._migrate_title_folded()
+        self._has_title_fts = self._create_title_fts()
+        self._pending_writes = 0
+
+        self.load_cache()
+
+    # ------------------------------------------------------------------
+    # Infraestrutura
+    # ------------------------------------------------------------------
+
+    def _migrate_title_folded(self):
+        """Bancos criados antes da coluna title_folded: adicioná-la e preenchê-la uma vez"""
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(pages)")}
+        if 'title_folded' not in columns:
+            self._conn.execute("ALTER TABLE pages ADD COLUMN title_folded TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("UPDATE pages SET title_folded = py_fold(title)")
+        self._conn.execute(_TITLE_FOLDED_INDEX)
+        self._conn.commit()
+
+    def _create_title_fts(self) -> bool:
+        """
+        Cria (na primeira vez) a tabela FTS5 de trigramas dos títulos
+
+        Returns:
+            False se o SQLite não tiver FTS5/trigram (a busca por trecho varre title_folded)
+        """
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pages_title_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            self._conn.executescript(_TITLE_FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError as e:
+            self._conn.rollback()
+            print(f"⚠️ FTS5 com trigramas indisponível ({e}): busca por trecho sem índice")
+            return False
+
+    @staticmethod
+    def _row_to_page(row) -> Dict:
+        return {column: row[column] for column in _PAGE_COLUMNS}
+
+    def _wrote(self, count: int = 1):
+        """Contabiliza escritas e confirma a transação quando o lote enche"""
+        self._pending_writes += count
+        if self._pending_writes >= self.batch_size:
+            self._commit()
+
+    def _commit(self):
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def _set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self):
+        """Confirma escritas pendentes e fecha o banco"""
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+
+    def load_cache(self) -> bool:
+        """Lê os metadados do banco; True se já existem páginas"""
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = 'last_updated'").fetchone()
+                self.last_updated = row['value'] if row else None
+                self.read_header()
+                return self._conn.execute("SELECT 1 FROM pages LIMIT 1").fetchone() is not None
+        except Exception as e:
+            print(f"Erro ao carregar cache: {e}")
+            return False
+
+    @property
+    def is_loaded(self) -> bool:
+        """Sempre True: as consultas vão direto ao banco, não há catálogo a carregar"""
+        return True
+
+    def read_header(self) -> Optional[Dict]:
+        """
+        Monta o cabeçalho (contagens por status e last_updated) a partir do banco
+
+        Returns:
+            Cabeçalho no formato do PagesCache, ou None se o banco estiver vazio
+        """
+        with self._lock:
+            counts = self._conn.execute("SELECT status, COUNT(*) FROM pages GROUP BY status").fetchall()
+        if not counts:
+            self.header = None
+            return None
+        status_counts = {str(status): count for status, count in counts}
+        self.header = {
+            'last_updated': self.last_updated,
+            'total_pages': sum(status_counts.values()),
+            'status_counts': status_counts
+        }
+        return self.header
+
+    def load_async(self, callback=None) -> threading.Thread:
+        """
+        Equivalente ao PagesCache.load_async: relê os metadados numa thread de fundo
+
+        Args:
+            callback: Chamado na thread de fundo com True/False (banco com páginas) ao terminar
+
+        Returns:
+            Thread da carga
+        """
+        def worker():
+            loaded = self.load_cache()
+            if callback:
+                callback(loaded)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    def save_cache(self) -> bool:
+        """Confirma as escritas pendentes (não reescreve o cache inteiro)"""
+        try:
+            with self._lock:
+                self.last_updated = datetime.now().isoformat()
+                self._set_meta('last_updated', self.last_updated)
+                self._commit()
+                self.read_header()
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar cache: {e}")
+            return False
+
+    def import_json(self, json_file: str = "config/pages_cache.json") -> int:
+        """
+        Importa um cache JSON do PagesCache (migração)
+
+        A leitura passa pelo PagesCache: o journal de status ainda não
+        compactado é reaplicado e o conteúdo das páginas vem do ContentStore.
+
+        Args:
+            json_file: Arquivo pages_cache.json existente
+
+        Returns:
+            Número de páginas importadas
+        """
+        from src.pages_cache import PagesCache
+        source = PagesCache(json_file)
+        pages = [page for page in source.get_all_pages() if page.get('pageid') is not None]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages "
+                "(pageid, title, title_folded, link, status, last_processed, error_message, content, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (page['pageid'], page.get('title', ''), fold_text(page.get('title', '')),
+                     page.get('link') or f"index.php?curid={page['pageid']}",
+                     page.get('status', 0), page.get('last_processed'), page.get('error_message'),
+                     source.get_page_content(page['pageid']), position)
+                    for position, page in enumerate(pages)
+                )
+            )
+            self.last_updated = source.last_updated or datetime.now().isoformat()
+            self._set_meta('last_updated', self.last_updated)
+            self._commit()
+            self.read_header()
+
+        print(f"📥 {len(pages)} páginas importadas de {json_file}")
+        return len(pages)
+
+    # ------------------------------------------------------------------
+    # API compatível com PagesCache
+    # ------------------------------------------------------------------
+
+    @property
+    def pages_data(self) -> List[Dict]:
+        """Lista de páginas (materializada do banco; alterações nela não persistem)"""
+        return self.get_all_pages()
+
+    def update_pages_from_api(self, api_pages: List[Dict]) -> int:
+        """Atualiza o cache com páginas da API, preservando status existente"""
+        return self.merge_pages_from_api(api_pages)['added']
+
+    def merge_pages_from_api(self, api_pages: List[Dict]) -> Dict:
+        """
+        Aplica a lista da API ao cache numa única transação (delta merge)
+
+        Só as linhas novas ou renomeadas são gravadas; páginas ausentes da
+        lista são removidas na mesma transação.
+
+        Args:
+            api_pages: Páginas retornadas pela API ({'pageid', 'title'})
+
+        Returns:
+            Diff no formato do PagesCache.merge_pages_from_api
+        """
+        diff = {'added': 0, 'renamed': 0, 'deleted': 0, 'unchanged': 0,
+                'added_pageids': [], 'renamed_pageids': [], 'deleted_pageids': []}
+        with self._lock:
+            remaining = dict(self._conn.execute("SELECT pageid, title FROM pages").fetchall())
+            seen = set()
+            rows = []
+            for api_page in api_pages:
+                pageid = api_page.get('pageid')
+                if pageid is None or pageid in seen:
+                    continue  # sem pageid não há como casar; repetido na resposta da API
+                seen.add(pageid)
+                title = api_page.get('title', '')
+                if pageid not in remaining:
+                    diff['added'] += 1
+                    diff['added_pageids'].append(pageid)
+                elif remaining.pop(pageid) != title:
+                    diff['renamed'] += 1
+                    diff['renamed_pageids'].append(pageid)
+                else:
+                    diff['unchanged'] += 1
+                rows.append((pageid, title, fold_text(title), f"index.php?curid={pageid}", len(rows)))
+
+            self._conn.executemany(
+                "INSERT INTO pages (pageid, title, title_folded, link, position) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(pageid) DO UPDATE SET title = excluded.title, title_folded = excluded.title_folded, "
+                "link = excluded.link, position = excluded.position",
+                rows
+            )
+            # Como no JSON, páginas fora da lista da API deixam o cache
+            self._conn.executemany("DELETE FROM pages WHERE pageid = ?", ((pageid,) for pageid in remaining))
+            diff['deleted'] = len(remaining)
+            diff['deleted_pageids'] = list(remaining)
+            self._commit()
+        return diff
+
+    def get_pages_by_status(self, status: int) -> List[Dict]:
+        """Retorna páginas filtradas por status (consulta indexada)"""
+        with self._lock:
+            rows = self._conn.execute(f"{_SELECT_PAGES} WHERE status = ? ORDER BY position", (status,))
+            return [self._row_to_page(row) for row in rows]
+
+    def count_by_status(self, status: int) -> int:
+        """Número de páginas com o status (COUNT sobre o índice de status)"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages WHERE status = ?", (status,)).fetchone()[0]
+
+    def iter_page(self, status: int, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """
+        Retorna uma janela das páginas com o status, na ordem da API
+
+        Args:
+            status: Status das páginas (0 = pendente, 1 = processada)
+            offset: Quantidade de páginas a pular
+            limit: Tamanho máximo da janela
+
+        Returns:
+            Lista com até `limit` páginas
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT_PAGES} WHERE status = ? ORDER BY position LIMIT ? OFFSET ?",
+                (status, max(0, limit), max(0, offset)))
+            return [self._row_to_page(row) for row in rows]
+
+    def get_pending_pages(self) -> List[Dict]:
+        """Retorna páginas não processadas (status = 0)"""
+        return self.get_pages_by_status(0)
+
+    def get_processed_pages(self) -> List[Dict]:
+        """Retorna páginas processadas (status = 1)"""
+        return self.get_pages_by_status(1)
+
+    def update_page_status(self, pageid: int, status: int, error_message: str = None) -> bool:
+        """Atualiza o status de uma página (UPDATE de uma linha, confirmado em lote)"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            if error_message:
+                cursor = self._conn.execute(
+                    "UPDATE pages SET status = ?, last_processed = ?, error_message = ? WHERE pageid = ?",
+                    (status, now, error_message, pageid))
+            elif status == 1:  # Sucesso - limpar erro anterior
+                cursor = self._conn.execute(
+                    "UPDATE pages SET status = ?, last_processed = ?, error_message = NULL WHERE pageid = ?",
+                    (status, now, pageid))
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE pages SET status = ?, last_processed = ? WHERE pageid = ?",
+                    (status, now, pageid))
+            self._wrote()
+            return cursor.rowcount > 0
+
+    def get_statistics(self) -> Dict:
+        """Retorna estatísticas do cache"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM pages GROUP BY status").fetchall())
+        total = sum(counts.values())
+        processed = counts.get(1, 0)
+        return {
+            'total_pages': total,
+            'pending_pages': counts.get(0, 0),
+            'processed_pages': processed,
+            'progress_percentage': (processed / total * 100) if total > 0 else 0,
+            'last_updated': self.last_updated
+        }
+
+    def search_pages(self, search_term: str, limit: Optional[int] = None, prefix: bool = False,
+                     status: Optional[int] = None) -> List[Dict]:
+        """
+        Busca páginas por termo no título (sem acentos/maiúsculas), em ordem alfabética
+
+        Prefixo: faixa no índice de title_folded. Trecho: índice de trigramas
+        (FTS5); termos com menos de 3 caracteres não formam trigrama e são
+        procurados em title_folded diretamente.
+        """
+        folded = fold_text(search_term)
+        if prefix:
+            condition = "title_folded >= ? AND title_folded < ?"
+            params = [folded, folded + _MAX_CHAR]
+        elif self._has_title_fts and len(folded) >= 3:
+            condition = "pageid IN (SELECT rowid FROM pages_title_fts WHERE pages_title_fts MATCH ?)"
+            params = ['"' + folded.replace('"', '""') + '"']
+        else:
+            condition = "instr(title_folded, ?) > 0"
+            params = [folded]
+        if status is not None:
+            condition += " AND status = ?"
+            params.append(status)
+        params.append(-1 if limit is None else limit)
+        with self._lock:
+            rows = self._conn.execute(
+                f"{_SELECT_PAGES} WHERE {condition} ORDER BY title_folded, pageid LIMIT ?", params)
+            return [self._row_to_page(row) for row in rows]
+
+    def reset_all_status(self):
+        """Reseta o status de todas as páginas para 0 (não processado)"""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET status = 0, last_processed = NULL, error_message = NULL")
+            self._commit()
+
+    def mark_pages_as_processed(self, pageids: List[int]):
+        """Marca múltiplas páginas como processadas numa única transação"""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE pages SET status = 1, last_processed = ?, error_message = NULL WHERE pageid = ?",
+                ((now, pageid) for pageid in pageids))
+            self._wrote(len(pageids))
+
+    def get_page_by_id(self, pageid: int) -> Optional[Dict]:
+        """Retorna uma página específica por ID"""
+        with self._lock:
+            row = self._conn.execute(f"{_SELECT_PAGES} WHERE pageid = ?", (pageid,)).fetchone()
+            return self._row_to_page(row) if row else None
+
+    def remove_deleted_pages(self, current_pageids: List[int]) -> int:
+        """Remove páginas que não existem mais na wiki (já feito por merge_pages_from_api)"""
+        with self._lock:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS api_ids (pageid INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM api_ids")
+            self._conn.executemany("INSERT OR IGNORE INTO api_ids (pageid) VALUES (?)",
+                                   ((pageid,) for pageid in current_pageids))
+            cursor = self._conn.execute("DELETE FROM pages WHERE pageid NOT IN (SELECT pageid FROM api_ids)")
+            self._conn.execute("DELETE FROM api_ids")
+            self._commit()
+            return cursor.rowcount
+
+    @property
+    def is_dirty(self) -> bool:
+        """Indica se há escritas ainda não confirmadas"""
+        return self._pending_writes > 0
+
+    def get_page_content(self, pageid: int) -> Optional[str]:
+        """
+        Obtém o conteúdo de uma página do cache
+
+        Args:
+            pageid: ID da página
+
+        Returns:
+            Conteúdo da página ou None se não encontrada
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT content FROM pages WHERE pageid = ?", (pageid,)).fetchone()
+            return row['content'] if row else None
+
+    def set_page_content(self, pageid: int, content: str) -> bool:
+        """
+        Define o conteúdo de uma página no cache
+
+        Args:
+            pageid: ID da página
+            content: Conteúdo da página
+
+        Returns:
+            True se bem-sucedido, False caso contrário
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE pages SET content = ?, last_processed = ? WHERE pageid = ?",
+                (content, datetime.now().isoformat(), pageid))
+            self._wrote()
+            return cursor.rowcount > 0
+
+    def get_all_pages(self) -> List[Dict]:
+        """
+        Retorna todas as páginas do cache
+
+        Returns:
+            Lista de todas as páginas
+        """
+        with self._lock:
+            rows = self._conn.execute(f"{_SELECT_PAGES} ORDER BY position")
+            return [self._row_to_page(row) for row in rows]
@@ -0,0 +1,129 @@
+"""
+Cache de resultados de parsing indexado pelo hash do wikitext
+
+O mesmo conteúdo (re-execução de uma migração, re-renderização na GUI)
+não precisa percorrer a AST de novo: templates, links, seções e imagens
+extraídos ficam guardados por hash, persistidos em JSON e limitados em
+número de entradas (LRU).
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Versão do formato dos dados extraídos; mudanças invalidam o arquivo salvo
+PARSE_CACHE_VERSION = 2
+
+
+def content_hash(wikitext: str) -> str:
+    """Hash do conteúdo usado como chave do cache"""
+    return hashlib.sha1(wikitext.encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    """Cache LRU persistente de dados extraídos do wikitext"""
+
+    def __init__(self, cache_file: str = "config/parse_cache.json", max_entries: int = 5000):
+        """
+        Inicializa o cache
+
+        Args:
+            cache_file: Arquivo JSON de persistência (None para manter só em memória)
+            max_entries: Número máximo de resultados mantidos
+        """
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        self.load_cache()
+
+    def load_cache(self) -> bool:
+        """Carrega os resultados salvos, descartando formatos antigos"""
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != PARSE_CACHE_VERSION:
+                return False
+            with self._lock:
+                self._entries = OrderedDict(data.get('entries', []))
+                self._trim()
+            return True
+        except Exception as e:
+            print(f"Erro ao carregar cache de parsing: {e}")
+            return False
+
+    def save_cache(self) -> bool:
+        """Salva os resultados no arquivo JSON (somente se houve mudanças)"""
+        if not self.cache_file or not self._dirty:
+            return False
+        try:
+            directory = os.path.dirname(self.cache_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock:
+                cache_data = {
+                    'version': PARSE_CACHE_VERSION,
+                    'last_updated': datetime.now().isoformat(),
+                    # Lista de pares preserva a ordem LRU entre execuções
+                    'entries': list(self._entries.items())
+                }
+                self._dirty = False
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache_data, f, ensure_ascii=False)
+            return True
+        except Exception as e:
+            print(f"Erro ao salvar cache de parsing: {e}")
+            return False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Retorna os dados extraídos para o hash (ou None)"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: Dict[str, Any]):
+        """Armazena os dados extraídos de um conteúdo"""
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            self._trim()
+            self._dirty = True
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Descarta todos os resultados"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self._dirty = True
+
+    def get_stats(self) -> Dict:
+        """Retorna estatísticas de uso do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0
+            }
@@ -0,0 +1,124 @@
+"""
+Limitador de taxa (token bucket) para a API do BookStack
+
+O BookStack limita requisições por minuto (API_REQUESTS_PER_MIN, 180 por
+padrão) e informa o limite nos cabeçalhos X-RateLimit-Limit /
+X-RateLimit-Remaining, respondendo 429 com Retry-After quando estoura.
+O limitador começa com a taxa configurada, passa a usar a taxa que o
+servidor anuncia e pausa todas as threads quando recebe um 429. É
+compartilhado por requisições JSON e uploads multipart do mesmo cliente.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Segundos indicados em Retry-After (número ou data HTTP); None se inválido"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket thread-safe que se ajusta aos cabeçalhos de rate limit do servidor"""
+
+    def __init__(self, rate: float = 10.0, burst: int = 10, window_seconds: float = 60.0,
+                 min_rate: float = 0.2):
+        """
+        Inicializa o limitador
+
+        Args:
+            rate: Requisições por segundo até o servidor anunciar o limite
+            burst: Requisições que podem sair de uma vez (capacidade do balde)
+            window_seconds: Janela do X-RateLimit-Limit (o BookStack conta por minuto)
+            min_rate: Taxa mínima após reduções por 429
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.window_seconds = window_seconds
+        self.min_rate = min_rate
+        self.server_limit: Optional[int] = None
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera um token (bloqueia a thread atual)
+
+        Args:
+            timeout: Segundos máximos de espera (None = sem limite)
+
+        Returns:
+            True se obteve o token, False se o timeout esgotou
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Ajusta taxa e tokens a partir de X-RateLimit-Limit / X-RateLimit-Remaining"""
+        limit = headers.get('X-RateLimit-Limit')
+        remaining = headers.get('X-RateLimit-Remaining')
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if limit and str(limit).isdigit() and int(limit) > 0:
+                limit = int(limit)
+                if limit != self.server_limit:
+                    self.server_limit = limit
+                    self.rate = max(self.min_rate, limit / self.window_seconds)
+            if remaining is not None and str(remaining).isdigit():
+                # Outras instâncias/threads podem estar consumindo a mesma cota
+                self._tokens = min(self._tokens, float(remaining))
+                if int(remaining) == 0:
+                    reset = parse_retry_after(headers.get('Retry-After'))
+                    if reset:
+                        self._paused_until = max(self._paused_until, now + reset)
+
+    def throttle(self, retry_after: Optional[float] = None):
+        """
+        Registra um 429: pausa todas as threads até o servidor liberar
+
+        Sem limite anunciado pelo servidor, a taxa também cai pela metade.
+
+        Args:
+            retry_after: Segundos do Retry-After (sem ele, espera o intervalo de um token)
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.server_limit is None:
+                self.rate = max(self.min_rate, self.rate / 2)
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self._paused_until = max(self._paused_until, now + pause)
+            self._tokens = 0.0
+            self._updated = now
+        print(f"⏳ BookStack limitou as requisições: pausa de {pause:.1f}s (taxa {self.rate:.2f}/s)")
@@ -0,0 +1,82 @@
+"""
+Política de novas tentativas para a API do BookStack
+
+Falhas transitórias (429, 5xx de gateway/manutenção, conexão recusada ou
+derrubada) são repetidas com backoff exponencial e jitter, até um número
+máximo de tentativas e um prazo total por chamada. Só se repete o que é
+seguro: GET/PUT/DELETE são idempotentes; um POST só é repetido quando o
+servidor certamente não o processou (429, 503 ou falha ao conectar), para
+não criar páginas ou imagens duplicadas.
+"""
+
+import random
+from typing import Optional
+
+import requests
+
+
+class BookStackAPIError(Exception):
+    """Erro de requisição ao BookStack, com o status HTTP e se valia nova tentativa"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: bool = False,
+                 attempts: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+        self.attempts = attempts
+
+
+class RetryPolicy:
+    """Classificação de erros e cálculo de espera entre tentativas"""
+
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+    RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+    # Respostas em que o servidor garante não ter executado a requisição
+    UNPROCESSED_STATUS = frozenset({429, 503})
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 0.5, max_delay: float = 30.0,
+                 deadline: float = 120.0):
+        """
+        Inicializa a política
+
+        Args:
+            max_attempts: Tentativas no total (1 = sem novas tentativas)
+            base_delay: Espera base do backoff (segundos), dobrada a cada tentativa
+            max_delay: Teto da espera entre tentativas
+            deadline: Tempo total máximo por chamada, incluindo as esperas
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def is_retryable(self, method: str, status_code: Optional[int] = None,
+                     exception: Optional[Exception] = None) -> bool:
+        """
+        Indica se a falha é transitória e se repetir a requisição é seguro
+
+        Args:
+            method: Método HTTP da requisição
+            status_code: Status da resposta (se houve resposta)
+            exception: Exceção de rede (se não houve resposta)
+        """
+        idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        if status_code is not None:
+            if idempotent:
+                return status_code in self.RETRYABLE_STATUS
+            return status_code in self.UNPROCESSED_STATUS
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return True  # nem chegou a conectar
+        if isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            # Conexão derrubada ou timeout de leitura: o servidor pode ter processado
+            return idempotent or self._failed_to_connect(exception)
+        return False
+
+    @staticmethod
+    def _failed_to_connect(exception: Exception) -> bool:
+        reason = getattr(exception.args[0], 'reason', None) if exception.args else None
+        return type(reason).__name__ == 'NewConnectionError'
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes da próxima tentativa (full jitter sobre o backoff exponencial)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
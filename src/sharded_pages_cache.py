@@ -0,0 +1,335 @@
+"""
+Cache de páginas particionado por namespace
+
+Cada namespace da wiki (principal, Ajuda, Projeto, personalizados) fica
+num PagesCache próprio, em <diretório>/ns_<n>.json, com journal, cabeçalho
+e índices independentes. Os shards são carregados em paralelo e só os
+alterados são regravados: uma mudança de status em um namespace não toca
+os arquivos dos outros. O conteúdo das páginas fica num ContentStore
+compartilhado (indexado por pageid), o que permite mover uma página entre
+shards sem copiar o conteúdo.
+"""
+
+import heapq
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.pages_cache import PagesCache
+from src.title_index import fold_text
+
+_SHARD_FILE = re.compile(r'^ns_(-?\d+)\.json$')
+
+
+class ShardedPagesCache:
+    """Coleção de PagesCache, um por namespace, com a API do PagesCache"""
+
+    def __init__(self, directory: str = "config/pages_cache", content_dir: str = "config/pages_cache_content",
+                 max_workers: int = 4, lazy: bool = False, **cache_options):
+        """
+        Inicializa o cache particionado
+
+        Args:
+            directory: Diretório dos arquivos ns_<n>.json
+            content_dir: Diretório do conteúdo das páginas (compartilhado entre shards)
+            max_workers: Threads usadas para carregar/gravar shards em paralelo
+            lazy: Não carregar os catálogos agora (ver PagesCache)
+            **cache_options: Opções repassadas a cada PagesCache (use_journal, shared, ...)
+        """
+        self.directory = directory
+        self.cache_file = directory  # mesmo nome do PagesCache (caminho do armazenamento)
+        self.content_dir = content_dir
+        self.max_workers = max_workers
+        self.cache_options = cache_options
+        self.shards: Dict[int, PagesCache] = {}
+        self._namespace_by_pageid: Dict[int, int] = {}
+        self._page_map_built = False
+
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            match = _SHARD_FILE.match(name)
+            if match:
+                self.shards[int(match.group(1))] = self._new_shard(int(match.group(1)))
+
+        if not lazy:
+            self.load_cache()
+
+    def _new_shard(self, namespace: int) -> PagesCache:
+        return PagesCache(os.path.join(self.directory, f"ns_{namespace}.json"), lazy=True,
+                          content_dir=self.content_dir, **self.cache_options)
+
+    def shard(self, namespace: int) -> PagesCache:
+        """Shard de um namespace (criado vazio se ainda não existir)"""
+        if namespace not in self.shards:
+            shard = self._new_shard(namespace)
+            shard.load_cache()  # arquivo inexistente: catálogo vazio já carregado
+            self.shards[namespace] = shard
+        return self.shards[namespace]
+
+    @property
+    def namespaces(self) -> List[int]:
+        """Namespaces com shard, em ordem"""
+        return sorted(self.shards)
+
+    def _map_shards(self, function, namespaces=None) -> Dict[int, object]:
+        """Executa function(shard) em paralelo nos shards indicados"""
+        namespaces = self.namespaces if namespaces is None else namespaces
+        if not namespaces:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(namespaces))) as executor:
+            futures = {namespace: executor.submit(function, self.shards[namespace]) for namespace in namespaces}
+            return {namespace: future.result() for namespace, future in futures.items()}
+
+    def _shard_of(self, pageid: int) -> Optional[PagesCache]:
+        if not self._page_map_built:
+            self._rebuild_page_map()
+        namespace = self._namespace_by_pageid.get(pageid)
+        return self.shards.get(namespace) if namespace is not None else None
+
+    def _rebuild_page_map(self):
+        self._namespace_by_pageid = {
+            page['pageid']: namespace
+            for namespace in self.namespaces
+            for page in self.shards[namespace].get_all_pages()
+        }
+        self._page_map_built = True
+
+    # ------------------------------------------------------------------
+    # Carga e gravação
+    # ------------------------------------------------------------------
+
+    def load_cache(self) -> bool:
+        """Carrega todos os shards em paralelo"""
+        results = self._map_shards(PagesCache.load_cache)
+        self._rebuild_page_map()
+        return any(results.values())
+
+    @property
+    def is_loaded(self) -> bool:
+        """Indica se os catálogos de todos os shards já estão em memória"""
+        return all(shard.is_loaded for shard in list(self.shards.values()))
+
+    @property
+    def header(self) -> Optional[Dict]:
+        """Cabeçalhos dos shards somados (None se nenhum shard tiver cabeçalho)"""
+        headers = [shard.header for shard in list(self.shards.values()) if shard.header]
+        if not headers:
+            return None
+        status_counts: Dict[str, int] = {}
+        for header in headers:
+            for status, count in header.get('status_counts', {}).items():
+                status_counts[status] = status_counts.get(status, 0) + count
+        updates = [header['last_updated'] for header in headers if header.get('last_updated')]
+        return {
+            'last_updated': max(updates) if updates else None,
+            'total_pages': sum(header.get('total_pages', 0) for header in headers),
+            'status_counts': status_counts
+        }
+
+    def read_header(self) -> Optional[Dict]:
+        """Relê o cabeçalho de cada shard e retorna a soma"""
+        for shard in list(self.shards.values()):
+            shard.read_header()
+        return self.header
+
+    def load_async(self, callback=None) -> threading.Thread:
+        """
+        Carrega os shards ainda não carregados em background (ver PagesCache.load_async)
+
+        Args:
+            callback: Chamado na thread de fundo com True/False (algum shard lido) ao terminar
+
+        Returns:
+            Thread da carga
+        """
+        def worker():
+            results = []
+            for thread in [shard.load_async(results.append) for shard in list(self.shards.values())]:
+                thread.join()
+            self._rebuild_page_map()
+            if callback:
+                callback(any(results))
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+    def save_cache(self, namespace: Optional[int] = None) -> bool:
+        """
+        Grava os shards alterados (ou só o do namespace indicado)
+
+        Returns:
+            True se todos os shards gravados tiveram sucesso
+        """
+        if namespace is not None:
+            namespaces = [namespace] if namespace in self.shards else []
+        else:
+            namespaces = [ns for ns in self.namespaces
+                          if self.shards[ns].is_dirty or not os.path.exists(self.shards[ns].cache_file)]
+        results = self._map_shards(PagesCache.save_cache, namespaces)
+        return all(results.values())
+
+    # ------------------------------------------------------------------
+    # Atualização a partir da API
+    # ------------------------------------------------------------------
+
+    def merge_pages_from_api(self, api_pages: List[Dict], namespaces: Optional[Iterable[int]] = None) -> Dict:
+        """
+        Distribui a lista da API pelos shards (campo 'ns') e aplica o delta merge em cada um
+
+        Só os namespaces consultados são atualizados: um namespace sem nenhuma
+        página na resposta não é tratado como "tudo removido", o que permite
+        atualizar namespaces em momentos diferentes. Páginas que mudaram de
+        namespace são movidas entre shards com status e conteúdo preservados.
+
+        Args:
+            api_pages: Páginas retornadas pela API (com 'ns')
+            namespaces: Namespaces cobertos pela consulta (padrão: os presentes
+                em api_pages). Informe-os para que um namespace consultado e
+                vazio na wiki tenha suas páginas removidas.
+
+        Returns:
+            Diff somado dos shards, com 'moved' (páginas que trocaram de namespace)
+        """
+        grouped: Dict[int, List[Dict]] = {}
+        for api_page in api_pages:
+            grouped.setdefault(api_page.get('ns', 0), []).append(api_page)
+        requested = set(grouped) if namespaces is None else set(namespaces) | set(grouped)
+
+        if not self._page_map_built:
+            self._rebuild_page_map()
+
+        # Movimentações agrupadas por shard de origem: cada origem é reconstruída uma vez
+        moves: Dict[int, Dict[int, Set[int]]] = {}
+        for namespace, pages in grouped.items():
+            for api_page in pages:
+                source_namespace = self._namespace_by_pageid.get(api_page.get('pageid'))
+                if source_namespace is not None and source_namespace != namespace:
+                    moves.setdefault(source_namespace, {}).setdefault(namespace, set()).add(api_page['pageid'])
+        moved = 0
+        for source_namespace, targets in moves.items():
+            pageids = set().union(*targets.values())
+            records = {page['pageid']: page for page in self.shards[source_namespace].detach_pages(pageids)}
+            for namespace, target_pageids in targets.items():
+                moving = [records[pageid] for pageid in target_pageids if pageid in records]
+                if moving:
+                    self.shard(namespace).attach_pages(moving)
+                    moved += len(moving)
+
+        diffs = {namespace: self.shard(namespace).merge_pages_from_api(grouped.get(namespace, []))
+                 for namespace in sorted(requested)}
+
+        total = {'added': 0, 'renamed': 0, 'deleted': 0, 'unchanged': 0, 'moved': moved,
+                 'added_pageids': [], 'renamed_pageids': [], 'deleted_pageids': []}
+        for diff in diffs.values():
+            for key, value in diff.items():
+                total[key] += value
+        self._rebuild_page_map()
+        return total
+
+    def update_pages_from_api(self, api_pages: List[Dict]) -> int:
+        """Atualiza os shards com páginas da API, preservando status existente"""
+        return self.merge_pages_from_api(api_pages)['added']
+
+    def remove_deleted_pages(self, current_pageids: List[int]) -> int:
+        """Remove, em todos os shards, páginas que não existem mais na wiki"""
+        current_pageids = list(current_pageids)
+        removed = sum(self._map_shards(lambda shard: shard.remove_deleted_pages(current_pageids)).values())
+        if removed:
+            self._rebuild_page_map()
+        return removed
+
+    # ------------------------------------------------------------------
+    # Consulta e status (roteados para o shard da página)
+    # ------------------------------------------------------------------
+
+    def update_page_status(self, pageid: int, status: int, error_message: str = None) -> bool:
+        """Atualiza o status de uma página (journal e snapshot apenas do shard dela)"""
+        shard = self._shard_of(pageid)
+        return shard.update_page_status(pageid, status, error_message) if shard else False
+
+    def mark_pages_as_processed(self, pageids: List[int]):
+        """Marca múltiplas páginas como processadas"""
+        for pageid in pageids:
+            self.update_page_status(pageid, 1)
+
+    def get_page_by_id(self, pageid: int) -> Optional[Dict]:
+        shard = self._shard_of(pageid)
+        return shard.get_page_by_id(pageid) if shard else None
+
+    def get_page_content(self, pageid: int) -> Optional[str]:
+        shard = self._shard_of(pageid)
+        return shard.get_page_content(pageid) if shard else None
+
+    def set_page_content(self, pageid: int, content: str) -> bool:
+        shard = self._shard_of(pageid)
+        return shard.set_page_content(pageid, content) if shard else False
+
+    def get_pages_by_status(self, status: int, namespace: Optional[int] = None) -> List[Dict]:
+        """Páginas com o status (de um namespace ou de todos, na ordem dos namespaces)"""
+        namespaces = [namespace] if namespace is not None else self.namespaces
+        return [page for ns in namespaces if ns in self.shards
+                for page in self.shards[ns].get_pages_by_status(status)]
+
+    def count_by_status(self, status: int) -> int:
+        return sum(self.shards[ns].count_by_status(status) for ns in self.namespaces)
+
+    def iter_page(self, status: int, offset: int = 0, limit: int = 50) -> List[Dict]:
+        """Janela das páginas com o status, atravessando os shards em ordem de namespace"""
+        offset, remaining = max(0, offset), max(0, limit)
+        window = []
+        for namespace in self.namespaces:
+            shard = self.shards[namespace]
+            count = shard.count_by_status(status)
+            if offset >= count:
+                offset -= count
+                continue
+            pages = shard.iter_page(status, offset, remaining)
+            window.extend(pages)
+            remaining -= len(pages)
+            offset = 0
+            if remaining <= 0:
+                break
+        return window
+
+    def get_pending_pages(self) -> List[Dict]:
+        return self.get_pages_by_status(0)
+
+    def get_processed_pages(self) -> List[Dict]:
+        return self.get_pages_by_status(1)
+
+    def search_pages(self, search_term: str, limit: Optional[int] = None, prefix: bool = False,
+                     status: Optional[int] = None) -> List[Dict]:
+        """Busca por título em todos os shards, em ordem alfabética"""
+        results = self._map_shards(lambda shard: shard.search_pages(search_term, limit, prefix, status))
+        merged = heapq.merge(*results.values(), key=lambda page: (fold_text(page.get('title', '')),
+                                                                   str(page.get('pageid'))))
+        return list(islice(merged, limit))
+
+    def get_statistics(self, namespace: Optional[int] = None) -> Dict:
+        """Estatísticas somadas (ou de um namespace), com o detalhamento por namespace"""
+        namespaces = [namespace] if namespace is not None else self.namespaces
+        per_namespace = {ns: self.shards[ns].get_statistics() for ns in namespaces if ns in self.shards}
+        total = sum(stats['total_pages'] for stats in per_namespace.values())
+        processed = sum(stats['processed_pages'] for stats in per_namespace.values())
+        updates = [stats['last_updated'] for stats in per_namespace.values() if stats['last_updated']]
+        return {
+            'total_pages': total,
+            'pending_pages': sum(stats['pending_pages'] for stats in per_namespace.values()),
+            'processed_pages': processed,
+            'progress_percentage': (processed / total * 100) if total > 0 else 0,
+            'last_updated': max(updates) if updates else None,
+            'namespaces': per_namespace
+        }
+
+    def reset_all_status(self, namespace: Optional[int] = None):
+        """Reseta o status de todas as páginas (ou só as de um namespace)"""
+        for ns in ([namespace] if namespace is not None else self.namespaces):
+            if ns in self.shards:
+                self.shards[ns].reset_all_status()
+
+    def get_all_pages(self) -> List[Dict]:
+        return [page for ns in self.namespaces for page in self.shards[ns].get_all_pages()]
@@ -0,0 +1,104 @@
+"""
+Journal append-only de mudanças de status do cache de páginas
+
+Cada transição de status vira uma linha JSON anexada ao journal no
+momento em que acontece; o snapshot completo (pages_cache.json) só é
+reescrito na compactação. Na carga, o journal é reaplicado sobre o
+snapshot, então uma queda no meio da extração perde no máximo a última
+linha.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Iterator
+
+
+class StatusJournal:
+    """Arquivo JSONL de transições com rotação para compactação"""
+
+    def __init__(self, journal_file: str, fsync: bool = False):
+        """
+        Inicializa o journal
+
+        Args:
+            journal_file: Caminho do arquivo .jsonl
+            fsync: Forçar fsync a cada linha (mais lento, sobrevive a queda de energia)
+        """
+        self.journal_file = journal_file
+        self.rotated_file = journal_file + ".old"
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._handle = None
+        self.entries = 0
+
+    def _open(self):
+        if self._handle is None:
+            directory = os.path.dirname(self.journal_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._handle = open(self.journal_file, 'a', encoding='utf-8')
+
+    def append(self, entry: Dict):
+        """Anexa uma entrada (uma linha) e a envia ao sistema operacional"""
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._open()
+            self._handle.write(line)
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+            self.entries += 1
+
+    def replay(self) -> Iterator[Dict]:
+        """Lê as entradas (journal rotacionado primeiro), ignorando linhas truncadas"""
+        for path in (self.rotated_file, self.journal_file):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Última linha incompleta de uma queda: descartar
+                        continue
+
+    def count_entries(self) -> int:
+        """Conta as entradas pendentes de compactação (usado após a carga)"""
+        with self._lock:
+            self.entries = sum(1 for _ in self.replay())
+            return self.entries
+
+    def rotate(self):
+        """
+        Move o journal atual para .old e começa um novo
+
+        Entradas anexadas depois da rotação vão para o novo arquivo; o .old
+        só é apagado (discard_rotated) depois que o snapshot foi gravado.
+        """
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+            if os.path.exists(self.journal_file):
+                if os.path.exists(self.rotated_file):
+                    # Compactação anterior interrompida: preservar as duas partes
+                    with open(self.rotated_file, 'a', encoding='utf-8') as old, \
+                            open(self.journal_file, 'r', encoding='utf-8') as current:
+                        old.write(current.read())
+                    os.remove(self.journal_file)
+                else:
+                    os.replace(self.journal_file, self.rotated_file)
+            self.entries = 0
+
+    def discard_rotated(self):
+        """Apaga o journal rotacionado (já incorporado ao snapshot)"""
+        with self._lock:
+            if os.path.exists(self.rotated_file):
+                os.remove(self.rotated_file)
+
+    def close(self):
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
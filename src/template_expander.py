@@ -0,0 +1,666 @@
+"""
+Motor local de expansão de templates do MediaWiki
+
+Avalia as ParserFunctions básicas ({{#if:}}, {{#ifeq:}}, {{#switch:}}, ...),
+palavras mágicas ({{PAGENAME}}, {{lc:}}, ...) e parâmetros {{{x|padrão}}}
+diretamente sobre a árvore do mwparserfromhell, sem acessar a rede.
+Apenas módulos Lua/Scribunto ({{#invoke:}}) e funções desconhecidas
+recorrem à API.
+"""
+
+import ast
+import operator
+import re
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Callable, Dict, Optional
+from urllib.parse import quote, quote_plus
+
+import mwparserfromhell
+from mwparserfromhell.nodes import Argument, Comment, Tag, Template, Text
+
+from src.expansion_memo import ExpansionMemo, source_revision
+
+
+# Trechos de transclusão (<noinclude>, <includeonly>, <onlyinclude>)
+_ONLYINCLUDE_PATTERN = re.compile(r'<onlyinclude>(.*?)</onlyinclude>', re.DOTALL | re.IGNORECASE)
+_NOINCLUDE_PATTERN = re.compile(r'<noinclude>.*?(?:</noinclude>|$)', re.DOTALL | re.IGNORECASE)
+_INCLUDEONLY_PATTERN = re.compile(r'</?includeonly>', re.IGNORECASE)
+_REDIRECT_PATTERN = re.compile(r'^\s*#(?:REDIRECT|REDIRECIONAMENTO)\s*\[\[([^\]|]+)', re.IGNORECASE)
+
+# Limite do expoente de '^' (9^9^9 não pode travar a conversão)
+_EXPR_MAX_EXPONENT = 1024
+
+
+def _bounded_pow(base, exponent):
+    if abs(exponent) > _EXPR_MAX_EXPONENT:
+        raise OverflowError("Expoente muito grande")
+    # Em ponto flutuante, como no MediaWiki: o resultado não cresce sem limite
+    return float(base) ** exponent
+
+
+def _expr_round(value, digits):
+    """Operador 'round' do #expr: metade para longe do zero, casas negativas arredondam dezenas..."""
+    digits = int(digits)
+    if digits >= 15:
+        return value  # além da precisão de um float: nada a arredondar
+    # repr evita o erro de representação binária (2.675 round 2 = 2.68, como no MediaWiki)
+    return float(Decimal(repr(float(value))).quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP))
+
+
+# Operadores aceitos por {{#expr:}} / {{#ifexpr:}}
+_EXPR_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.Pow: _bounded_pow,
+    ast.BitOr: _expr_round,  # 'round' (precedência entre +/- e as comparações, como '|')
+}
+_EXPR_COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+
+EXPRESSION_ERROR = '<strong class="error">Erro de expressão</strong>'
+
+# O mwparserfromhell não reconhece como template uma chamada com '<' ou '>'
+# no nome ({{#expr: 1 < 2}} vira texto). Nas expressões de #expr/#ifexpr esses
+# operadores são trocados por caracteres de uso privado antes do parse.
+_EXPR_FUNCTION_PATTERN = re.compile(r'\{\{\s*#(?:expr|ifexpr)\s*:', re.IGNORECASE)
+_PROTECTED_LT = '\ue000'
+_PROTECTED_GT = '\ue001'
+
+
+def protect_expression_operators(wikitext: str) -> str:
+    """Protege '<' e '>' das expressões de {{#expr:}}/{{#ifexpr:}} para o parse"""
+    if '<' not in wikitext and '>' not in wikitext:
+        return wikitext
+    chars = None
+    for match in _EXPR_FUNCTION_PATTERN.finditer(wikitext):
+        # A expressão vai até o primeiro '|' ou '}}' fora de chaves/colchetes aninhados
+        depth = 0
+        index = match.end()
+        while index < len(wikitext):
+            pair = wikitext[index:index + 2]
+            if pair in ('{{', '[['):
+                depth += 1
+                index += 2
+                continue
+            if pair in ('}}', ']]'):
+                if depth == 0:
+                    break
+                depth -= 1
+                index += 2
+                continue
+            char = wikitext[index]
+            if char == '|' and depth == 0:
+                break
+            if char in '<>':
+                if chars is None:
+                    chars = list(wikitext)
+                chars[index] = _PROTECTED_LT if char == '<' else _PROTECTED_GT
+            index += 1
+    return ''.join(chars) if chars is not None else wikitext
+
+
+def restore_expression_operators(text: str) -> str:
+    return text.replace(_PROTECTED_LT, '<').replace(_PROTECTED_GT, '>')
+
+
+def is_redirect(wikitext: str) -> Optional[str]:
+    """Retorna o destino se o wikitext for um redirecionamento"""
+    match = _REDIRECT_PATTERN.match(wikitext or '')
+    return match.group(1).strip() if match else None
+
+
+def normalize_title(title: str) -> str:
+    """Normaliza título como o MediaWiki (underscores, espaços, 1ª maiúscula)"""
+    title = re.sub(r'[_\s]+', ' ', title).strip()
+    return title[:1].upper() + title[1:]
+
+
+class _Frame:
+    """Contexto de expansão: argumentos do template atual e página renderizada"""
+
+    __slots__ = ('title', 'args', 'parent', 'page_title', 'depth', 'flags')
+
+    def __init__(self, title: str, args: Dict[str, str], parent=None, page_title: str = ""):
+        self.title = title
+        self.args = args
+        self.parent = parent
+        self.page_title = page_title if parent is None else parent.page_title
+        self.depth = 0 if parent is None else parent.depth + 1
+        # Dependências do resultado: 'page' (título da página) ou 'volatile' (hora atual)
+        self.flags = set()
+
+    def mark(self, flags):
+        """Propaga dependências para este frame e todos os ancestrais"""
+        frame = self
+        while frame is not None:
+            frame.flags.update(flags)
+            frame = frame.parent
+
+    def in_chain(self, title: str) -> bool:
+        frame = self
+        while frame is not None:
+            if frame.title == title:
+                return True
+            frame = frame.parent
+        return False
+
+
+class LocalTemplateExpander:
+    """Expande templates localmente a partir do wikitext bruto dos templates"""
+
+    # Tags cujo conteúdo o MediaWiki não expande
+    RAW_TAGS = {'nowiki', 'pre', 'math', 'syntaxhighlight', 'source'}
+
+    # Namespaces reconhecidos em títulos (inglês e português)
+    KNOWN_NAMESPACES = {
+        'Talk', 'Discussão', 'User', 'Usuário', 'Project', 'Projeto',
+        'File', 'Arquivo', 'Image', 'Imagem', 'MediaWiki', 'Template',
+        'Predefinição', 'Help', 'Ajuda', 'Category', 'Categoria',
+        'Module', 'Módulo', 'Special', 'Especial',
+    }
+
+    # Variáveis avaliadas por _magic_word (e as variantes ...E codificadas para URL)
+    MAGIC_WORDS = frozenset({
+        'FULLPAGENAME', 'PAGENAME', 'BASEPAGENAME', 'SUBPAGENAME', 'ROOTPAGENAME', 'NAMESPACE',
+        'CURRENTYEAR', 'CURRENTMONTH', 'CURRENTMONTH1', 'CURRENTDAY', 'CURRENTDAY2',
+        'CURRENTTIME', 'CURRENTTIMESTAMP',
+    })
+
+    # Funções sem '#' (locais ou do núcleo do MediaWiki) que não são páginas de template
+    NAMED_FUNCTIONS = frozenset({
+        'lc', 'uc', 'lcfirst', 'ucfirst', 'urlencode', 'anchorencode', 'padleft', 'padright',
+        'ns', 'nse', 'fullurl', 'localurl', 'canonicalurl', 'filepath', 'formatnum', 'int',
+        'plural', 'grammar', 'gender', 'displaytitle', 'defaultsort', 'safesubst', 'subst',
+    })
+
+    def __init__(self, template_loader: Callable[[str], Optional[str]],
+                 api_expander: Callable[[str, str], Optional[str]] = None,
+                 max_depth: int = 40, site_magic_words: Dict[str, str] = None,
+                 memo: ExpansionMemo = None):
+        """
+        Inicializa o motor de expansão
+
+        Args:
+            template_loader: Função nome -> wikitext bruto do template (None se não
+                existir); uma exceção indica falha temporária e não fica em cache
+            api_expander: Função (texto, título da página) -> wikitext expandido
+                pela API; usada para {{#invoke:}} e funções não suportadas
+            max_depth: Profundidade máxima de templates aninhados
+            site_magic_words: Valores de palavras mágicas do site (ex: SITENAME)
+            memo: Memo de expansões compartilhado (None desativa a memoização)
+        """
+        self.template_loader = template_loader
+        self.api_expander = api_expander
+        self.max_depth = max_depth
+        self.site_magic_words = site_magic_words or {}
+        self.memo = memo
+
+        # Árvores já parseadas dos templates (nunca são modificadas permanentemente)
+        self._parsed_templates = {}
+        self._template_revisions = {}
+        # (template, revisão) cujo resultado depende do título da página
+        self._page_dependent = set()
+
+        self.stats = {'templates': 0, 'parser_functions': 0, 'api_calls': 0, 'missing': 0}
+
+        self._parser_functions = {
+            '#if': self._pf_if,
+            '#ifeq': self._pf_ifeq,
+            '#iferror': self._pf_iferror,
+            '#ifexpr': self._pf_ifexpr,
+            '#expr': self._pf_expr,
+            '#switch': self._pf_switch,
+            '#tag': self._pf_tag,
+            'lc': lambda first, params, frame: first.lower(),
+            'uc': lambda first, params, frame: first.upper(),
+            'lcfirst': lambda first, params, frame: first[:1].lower() + first[1:],
+            'ucfirst': lambda first, params, frame: first[:1].upper() + first[1:],
+            'urlencode': lambda first, params, frame: quote_plus(first),
+            'anchorencode': lambda first, params, frame: quote(first.replace(' ', '_'), safe=':/'),
+            'padleft': self._pf_padleft,
+            'padright': self._pf_padright,
+        }
+
+    def expand(self, wikitext: str, page_title: str = "") -> str:
+        """
+        Expande todos os templates de um wikitext
+
+        Args:
+            wikitext: Texto em formato MediaWiki (ou Wikicode já parseado)
+            page_title: Título da página (para {{PAGENAME}} e similares)
+
+        Returns:
+            Wikitext com templates, parâmetros e funções avaliados
+        """
+        if isinstance(wikitext, str):
+            wikicode = mwparserfromhell.parse(protect_expression_operators(wikitext))
+        else:
+            wikicode = wikitext
+            # Árvore já parseada: #expr com '<'/'>' ficou como texto; refazer o parse protegido
+            if any(_EXPR_FUNCTION_PATTERN.search(str(text)) for text in wikicode.filter_text()):
+                wikicode = mwparserfromhell.parse(protect_expression_operators(str(wikicode)))
+        frame = _Frame(normalize_title(page_title), {}, page_title=page_title)
+        return restore_expression_operators(self._expand_code(wikicode, frame))
+
+    # ------------------------------------------------------------------
+    # Percurso da árvore
+    # ------------------------------------------------------------------
+
+    def _expand_code(self, wikicode, frame: _Frame) -> str:
+        """Expande um trecho de Wikicode no contexto informado"""
+        return ''.join(self._expand_node(node, frame) for node in wikicode.nodes)
+
+    def _expand_node(self, node, frame: _Frame) -> str:
+        if isinstance(node, Text):
+            return node.value
+        if isinstance(node, Template):
+            return self._expand_template(node, frame)
+        if isinstance(node, Argument):
+            return self._expand_argument(node, frame)
+        if isinstance(node, Comment):
+            return ''
+
+        node_text = str(node)
+        if '{{' not in node_text and '<!--' not in node_text:
+            return node_text
+        if isinstance(node, Tag) and str(node.tag).strip().lower() in self.RAW_TAGS:
+            return node_text
+
+        # Nó composto (link, tag, cabeçalho...): expandir os filhos e
+        # serializar com os filhos substituídos temporariamente
+        children = list(node.__children__())
+        expanded = [self._expand_code(child, frame) for child in children]
+        saved = [child.nodes for child in children]
+        try:
+            for child, text in zip(children, expanded):
+                child.nodes = [Text(text)]
+            return str(node)
+        finally:
+            for child, nodes in zip(children, saved):
+                child.nodes = nodes
+
+    def _expand_argument(self, argument, frame: _Frame) -> str:
+        """Resolve {{{nome|padrão}}} com os argumentos do frame atual"""
+        name = self._expand_code(argument.name, frame).strip()
+        if name in frame.args:
+            return frame.args[name]
+        if argument.default is not None:
+            return self._expand_code(argument.default, frame)
+        return f"{{{{{{{name}}}}}}}"
+
+    def _expand_template(self, template, frame: _Frame) -> str:
+        """Expande uma chamada {{...}}: função, palavra mágica ou template"""
+        name = self._expand_code(template.name, frame).strip()
+        if not name:
+            return str(template)
+
+        # Funções de parser ({{#if:...}}, {{lc:...}}) e palavras mágicas
+        if ':' in name:
+            function_name, first_arg = name.split(':', 1)
+            function_key = function_name.strip().lower()
+            if function_key == '#invoke':
+                return self._expand_via_api(template, name, frame)
+            if function_key in self._parser_functions:
+                self.stats['parser_functions'] += 1
+                return self._parser_functions[function_key](first_arg.strip(), template.params, frame)
+            if function_key.startswith('#'):
+                return self._expand_via_api(template, name, frame)
+
+            magic = self._magic_word(function_name.strip(), first_arg.strip(), frame)
+            if magic is not None:
+                return magic
+        else:
+            magic = self._magic_word(name, None, frame)
+            if magic is not None:
+                return magic
+
+        return self._transclude(template, name, frame)
+
+    @classmethod
+    def _is_magic_word(cls, name: str) -> bool:
+        return name in cls.MAGIC_WORDS or (name.endswith('E') and name[:-1] in cls.MAGIC_WORDS) \
+            or name in ('!', '=')
+
+    @classmethod
+    def transclusion_key(cls, name: str) -> Optional[str]:
+        """
+        Nome com que {{name}} é pedido ao template_loader
+
+        Returns:
+            Título normalizado (ou ':Página' para transclusão do domínio principal);
+            None para funções de parser, palavras mágicas e nomes dinâmicos
+        """
+        name = name.strip()
+        if not name or '{' in name:
+            return None
+        if name.startswith(':'):
+            return name
+        if ':' in name:
+            prefix = name.split(':', 1)[0].strip()
+            if prefix.startswith('#') or prefix.lower() in cls.NAMED_FUNCTIONS or cls._is_magic_word(prefix):
+                return None
+        elif cls._is_magic_word(name):
+            return None
+        return normalize_title(name)
+
+    def _transclude(self, template, name: str, frame: _Frame) -> str:
+        """Transclui um template a partir do seu wikitext bruto"""
+        title = normalize_title(name[1:] if name.startswith(':') else name)
+
+        if frame.in_chain(title):
+            return f'<span class="error">Loop de template detectado: [[{title}]]</span>'
+        if frame.depth >= self.max_depth:
+            return f'<span class="error">Profundidade máxima de templates excedida: [[{title}]]</span>'
+
+        source_name = name if name.startswith(':') else title
+        parsed = self._get_parsed_template(source_name)
+        if parsed is None:
+            self.stats['missing'] += 1
+            return str(template)
+
+        args = {}
+        for param in template.params:
+            if param.showkey:
+                key = self._expand_code(param.name, frame).strip()
+                args[key] = self._expand_code(param.value, frame).strip()
+            else:
+                args[str(param.name).strip()] = self._expand_code(param.value, frame)
+
+        memo_key = None
+        if self.memo is not None:
+            revision = self._template_revisions[source_name]
+            context = frame.page_title if (title, revision) in self._page_dependent else None
+            memo_key = ExpansionMemo.make_key(title, revision, args, context)
+            cached = self.memo.get(memo_key)
+            if cached is not None:
+                output, flags = cached
+                frame.mark(flags)
+                return output
+
+        self.stats['templates'] += 1
+        child = _Frame(title, args, parent=frame)
+        output = self._expand_code(parsed, child)
+
+        if memo_key is not None and 'volatile' not in child.flags:
+            if 'page' in child.flags and memo_key[-1] is None:
+                self._page_dependent.add((title, revision))
+                memo_key = ExpansionMemo.make_key(title, revision, args, frame.page_title)
+            self.memo.put(memo_key, (output, frozenset(child.flags)))
+        return output
+
+    def invalidate_template(self, name: str):
+        """
+        Descarta a árvore memorizada de um template
+
+        A próxima transclusão consulta o template_loader de novo; com outro
+        conteúdo, a revisão muda e o memo de expansões não reaproveita
+        resultados da versão anterior.
+
+        Args:
+            name: Nome como pedido ao template_loader (ver transclusion_key)
+        """
+        self._parsed_templates.pop(name, None)
+        self._template_revisions.pop(name, None)
+
+    def _get_parsed_template(self, name: str):
+        """Obtém (e memoriza) a árvore parseada do trecho transcluível do template"""
+        if name in self._parsed_templates:
+            return self._parsed_templates[name]
+
+        try:
+            source = self.template_loader(name)
+        except Exception as e:
+            # Falha temporária (rede): não memorizar, a próxima chamada tenta de novo
+            print(f"⚠️ Template '{name}' indisponível no momento: {e}")
+            return None
+        parsed = None
+        if source is not None:
+            parsed = mwparserfromhell.parse(protect_expression_operators(self._transclusion_text(source)))
+            self._template_revisions[name] = source_revision(source)
+
+        self._parsed_templates[name] = parsed
+        return parsed
+
+    @staticmethod
+    def _transclusion_text(source: str) -> str:
+        """Aplica <onlyinclude>, <noinclude> e <includeonly> ao wikitext do template"""
+        only = _ONLYINCLUDE_PATTERN.findall(source)
+        if only:
+            source = ''.join(only)
+        source = _NOINCLUDE_PATTERN.sub('', source)
+        return _INCLUDEONLY_PATTERN.sub('', source)
+
+    def _expand_via_api(self, template, name: str, frame: _Frame) -> str:
+        """Recorre à API para {{#invoke:}} e funções sem implementação local"""
+        if not self.api_expander:
+            return str(template)
+
+        # Os argumentos são expandidos localmente: a API não conhece o frame atual
+        parts = [name]
+        for param in template.params:
+            value = self._expand_code(param.value, frame)
+            if param.showkey:
+                parts.append(f"{self._expand_code(param.name, frame)}={value}")
+            else:
+                parts.append(value)
+        invocation = '{{' + '|'.join(parts) + '}}'
+
+        # O resultado da API pode depender da página renderizada
+        frame.mark(('page',))
+        self.stats['api_calls'] += 1
+        try:
+            expanded = self.api_expander(invocation, frame.page_title)
+        except Exception as e:
+            print(f"⚠️ Falha ao expandir via API '{name}': {e}")
+            expanded = None
+        return expanded if expanded is not None else invocation
+
+    # ------------------------------------------------------------------
+    # Palavras mágicas
+    # ------------------------------------------------------------------
+
+    def _split_namespace(self, title: str):
+        if ':' in title:
+            prefix, rest = title.split(':', 1)
+            if normalize_title(prefix) in self.KNOWN_NAMESPACES:
+                return normalize_title(prefix), rest.strip()
+        return '', title
+
+    def _magic_word(self, name: str, argument: Optional[str], frame: _Frame) -> Optional[str]:
+        """Avalia variáveis como {{PAGENAME}}; retorna None se não for palavra mágica"""
+        if name == '!':
+            return '|'
+        if name == '=':
+            return '='
+        if name in self.site_magic_words:
+            return self.site_magic_words[name]
+
+        title = normalize_title(argument) if argument else frame.page_title
+        namespace, page_name = self._split_namespace(title)
+        now = datetime.now(timezone.utc)
+
+        values = {
+            'FULLPAGENAME': lambda: title,
+            'PAGENAME': lambda: page_name,
+            'BASEPAGENAME': lambda: page_name.rsplit('/', 1)[0],
+            'SUBPAGENAME': lambda: page_name.rsplit('/', 1)[-1],
+            'ROOTPAGENAME': lambda: page_name.split('/', 1)[0],
+            'NAMESPACE': lambda: namespace,
+            'CURRENTYEAR': lambda: str(now.year),
+            'CURRENTMONTH': lambda: f"{now.month:02d}",
+            'CURRENTMONTH1': lambda: str(now.month),
+            'CURRENTDAY': lambda: str(now.day),
+            'CURRENTDAY2': lambda: f"{now.day:02d}",
+            'CURRENTTIME': lambda: now.strftime('%H:%M'),
+            'CURRENTTIMESTAMP': lambda: now.strftime('%Y%m%d%H%M%S'),
+        }
+
+        base_name = name[:-1] if name not in values and name.endswith('E') else name
+        if base_name not in values:
+            return None
+
+        # Registrar a dependência para a memoização
+        if base_name.startswith('CURRENT'):
+            frame.mark(('volatile',))
+        elif not argument:
+            frame.mark(('page',))
+
+        value = values[base_name]()
+        if base_name != name:
+            # Variantes codificadas para URL (PAGENAMEE, FULLPAGENAMEE...)
+            value = quote(value.replace(' ', '_'), safe='/:')
+        return value
+
+    # ------------------------------------------------------------------
+    # Funções de parser
+    # ------------------------------------------------------------------
+
+    def _arg(self, params, index: int, frame: _Frame) -> str:
+        """Expande (sob demanda) o argumento posicional bruto de uma função"""
+        if index >= len(params):
+            return ''
+        param = params[index]
+        value = self._expand_code(param.value, frame)
+        if param.showkey:
+            value = f"{self._expand_code(param.name, frame)}={value}"
+        return value.strip()
+
+    @staticmethod
+    def _values_equal(left: str, right: str) -> bool:
+        """Compara como o MediaWiki: numericamente se ambos forem números"""
+        try:
+            return float(left) == float(right)
+        except ValueError:
+            return left == right
+
+    def _pf_if(self, first: str, params, frame: _Frame) -> str:
+        return self._arg(params, 0 if first else 1, frame)
+
+    def _pf_ifeq(self, first: str, params, frame: _Frame) -> str:
+        other = self._arg(params, 0, frame)
+        return self._arg(params, 1 if self._values_equal(first, other) else 2, frame)
+
+    def _pf_iferror(self, first: str, params, frame: _Frame) -> str:
+        if 'class="error"' in first:
+            return self._arg(params, 0, frame)
+        return self._arg(params, 1, frame) if len(params) > 1 else first
+
+    def _pf_ifexpr(self, first: str, params, frame: _Frame) -> str:
+        try:
+            result = self._evaluate_expression(first)
+        except Exception:
+            return EXPRESSION_ERROR
+        return self._arg(params, 0 if result else 1, frame)
+
+    def _pf_expr(self, first: str, params, frame: _Frame) -> str:
+        if not first:
+            return ''
+        try:
+            result = self._evaluate_expression(first)
+        except Exception:
+            return EXPRESSION_ERROR
+        if isinstance(result, float) and result.is_integer():
+            result = int(result)
+        return str(result)
+
+    def _pf_switch(self, first: str, params, frame: _Frame) -> str:
+        fall_through = False
+        default = None
+        for index, param in enumerate(params):
+            if param.showkey:
+                key = self._expand_code(param.name, frame).strip()
+                if fall_through or self._values_equal(key, first):
+                    return self._expand_code(param.value, frame).strip()
+                if key == '#default':
+                    default = param
+            else:
+                value = self._expand_code(param.value, frame).strip()
+                if index == len(params) - 1:
+                    return value  # último valor sem chave é o padrão
+                if self._values_equal(value, first):
+                    fall_through = True
+        if default is not None:
+            return self._expand_code(default.value, frame).strip()
+        return ''
+
+    def _pf_tag(self, first: str, params, frame: _Frame) -> str:
+        content = self._arg(params, 0, frame) if params and not params[0].showkey else ''
+        attributes = ''.join(
+            f' {self._expand_code(p.name, frame).strip()}="{self._expand_code(p.value, frame).strip()}"'
+            for p in params if p.showkey
+        )
+        return f"<{first}{attributes}>{content}</{first}>"
+
+    def _pf_padleft(self, first: str, params, frame: _Frame) -> str:
+        length, pad = self._pad_args(params, frame)
+        return first.rjust(length, pad) if pad else first
+
+    def _pf_padright(self, first: str, params, frame: _Frame) -> str:
+        length, pad = self._pad_args(params, frame)
+        return first.ljust(length, pad) if pad else first
+
+    def _pad_args(self, params, frame: _Frame):
+        try:
+            length = int(self._arg(params, 0, frame) or 0)
+        except ValueError:
+            length = 0
+        pad = self._arg(params, 1, frame) or '0'
+        return length, pad[0]
+
+    @staticmethod
+    def _evaluate_expression(expression: str):
+        """Avalia expressões de {{#expr:}} com segurança (sem eval)"""
+        expression = restore_expression_operators(expression)
+        expression = expression.replace('<>', '!=')
+        expression = re.sub(r'(?<![<>!=])=(?!=)', '==', expression)
+        expression = re.sub(r'\bmod\b', '%', expression)
+        expression = re.sub(r'\bdiv\b', '/', expression)
+        expression = re.sub(r'\bround\b', '|', expression)
+        expression = expression.replace('^', '**')
+
+        def evaluate(node):
+            if isinstance(node, ast.Expression):
+                return evaluate(node.body)
+            if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+                return node.value
+            if isinstance(node, ast.BinOp) and type(node.op) in _EXPR_BINARY_OPERATORS:
+                return _EXPR_BINARY_OPERATORS[type(node.op)](evaluate(node.left), evaluate(node.right))
+            if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)) \
+                    and isinstance(node.operand, ast.BinOp) and isinstance(node.operand.op, ast.Pow) \
+                    and '(' not in expression[node.col_offset + 1:node.operand.col_offset]:
+                # No MediaWiki o sinal pertence à base: -2^2 = (-2)^2 = 4, mas -(2^2) = -4
+                base = evaluate(node.operand.left)
+                return _bounded_pow(-base if isinstance(node.op, ast.USub) else base, evaluate(node.operand.right))
+            if isinstance(node, ast.UnaryOp):
+                operand = evaluate(node.operand)
+                if isinstance(node.op, ast.USub):
+                    return -operand
+                if isinstance(node.op, ast.UAdd):
+                    return operand
+                if isinstance(node.op, ast.Not):
+                    return int(not operand)
+            if isinstance(node, ast.BoolOp):
+                values = [bool(evaluate(value)) for value in node.values]
+                return int(all(values) if isinstance(node.op, ast.And) else any(values))
+            if isinstance(node, ast.Compare):
+                left = evaluate(node.left)
+                for op, comparator in zip(node.ops, node.comparators):
+                    right = evaluate(comparator)
+                    if type(op) not in _EXPR_COMPARE_OPERATORS or not _EXPR_COMPARE_OPERATORS[type(op)](left, right):
+                        return 0
+                    left = right
+                return 1
+            raise ValueError("Expressão não suportada")
+
+        expression = expression.strip()
+        return evaluate(ast.parse(expression, mode='eval'))
@@ -6,27 +6,59 @@ import mwparserfromhell
 import re
 from typing import Dict, List, Any, Optional
 
+from src.expansion_memo import ExpansionMemo, source_revision
+from src.template_expander import LocalTemplateExpander, is_redirect, normalize_title
+from src.wiki_document import WikiDocument
+
+# Placeholders {{{parametro}}} ou {{{parametro|valor_default}}}
+_PARAM_PATTERN = re.compile(r'\{\{\{([^}]+)\}\}\}')
+
+# Erros do MediaWikiClient que confirmam que a página não existe (os demais são falhas)
+_MISSING_PAGE_ERRORS = ("Página não encontrada", "Página sem conteúdo")
+
 class MediaWikiTemplateExtractor:
     """Extrator de conteúdo de templates do MediaWiki"""
     
-    def __init__(self, mediawiki_client):
+    def __init__(self, mediawiki_client, use_local_expansion: bool = True, memo_size: int = 20000):
         self.client = mediawiki_client
         self.template_cache = {}  # Cache para evitar requisições repetidas
+        self.template_source_cache = {}  # Wikitext bruto dos templates (expansão local)
+        
+        # Memo de expansões compartilhado pelos caminhos local e via API
+        self.expansion_memo = ExpansionMemo(memo_size)
+        
+        # Expansão local: ParserFunctions avaliadas sem rede, API só para Lua
+        self.use_local_expansion = use_local_expansion
+        self.local_expander = LocalTemplateExpander(
+            self._get_template_source,
+            api_expander=self._expand_text_via_api,
+            memo=self.expansion_memo
+        )
         
     def extract_and_expand_templates(self, wikitext: str, page_title: str = "") -> str:
         """
         Extrai templates do wikitext e expande com conteúdo real
         
         Args:
-            wikitext: Texto em formato MediaWiki
+            wikitext: Texto em formato MediaWiki (ou WikiDocument, reaproveitando a árvore)
             page_title: Título da página (para contexto)
             
         Returns:
             Wikitext com templates expandidos
         """
+        document = wikitext if isinstance(wikitext, WikiDocument) else None
+        if document is not None:
+            wikitext = document.wikitext
+        
+        if self.use_local_expansion:
+            try:
+                return self.local_expander.expand(document.wikicode if document else wikitext, page_title)
+            except Exception as e:
+                print(f"⚠️ Expansão local falhou para '{page_title}', usando API: {e}")
+        
         try:
             # Parse do wikitext
-            wikicode = mwparserfromhell.parse(wikitext)
+            wikicode = document.wikicode if document else mwparserfromhell.parse(wikitext)
             
             # Encontrar todos os templates
             templates = wikicode.filter_templates()
@@ -107,6 +139,57 @@ class MediaWikiTemplateExtractor:
             print(f"❌ Erro ao obter template '{template_name}': {e}")
             return ""
     
+    def get_expansion_stats(self) -> Dict:
+        """Retorna contadores de acertos/falhas do memo e da expansão local"""
+        stats = self.expansion_memo.get_stats()
+        stats['local'] = dict(self.local_expander.stats)
+        return stats
+
+    def prefetch_template_sources(self, wikitexts) -> Dict[str, Optional[str]]:
+        """
+        Busca (recursivamente) o wikitext de todos os templates usados pelas páginas
+
+        Os workers do pool de conversão não acessam a rede; este snapshot é
+        o que eles usam como fonte de templates.
+
+        Args:
+            wikitexts: Iterável com o wikitext das páginas
+
+        Returns:
+            Dict nome normalizado do template -> wikitext (None para inexistentes)
+        """
+        pending = list(wikitexts)
+        seen = set()
+        while pending:
+            for template in mwparserfromhell.parse(pending.pop()).filter_templates():
+                # Mesma chave que o expansor usa no pool; funções de parser,
+                # palavras mágicas e nomes dinâmicos não são páginas
+                key = LocalTemplateExpander.transclusion_key(str(template.name))
+                if key is None or key in seen:
+                    continue
+                seen.add(key)
+                try:
+                    source = self._get_template_source(key)
+                except Exception as e:
+                    print(f"⚠️ Template '{key}' não obtido: {e}")
+                    continue
+                if source:
+                    pending.append(source)
+        return {key: self.template_source_cache.get(key) for key in seen}
+
+    def create_conversion_pool(self, wikitexts=None, **pool_options):
+        """
+        Cria um ConversionPool com o snapshot dos templates já conhecidos
+
+        Args:
+            wikitexts: Páginas cujos templates devem ser buscados antes (opcional)
+            **pool_options: Repassados ao ConversionPool (max_workers, chunk_size...)
+        """
+        from src.conversion_pool import ConversionPool
+        if wikitexts is not None:
+            self.prefetch_template_sources(wikitexts)
+        return ConversionPool(template_sources=self.template_source_cache, **pool_options)
+
     def _expand_via_api(self, template_name: str) -> str:
         """Tenta expandir template via API expandtemplates"""
         try:
@@ -130,6 +213,76 @@ class MediaWikiTemplateExtractor:
         except Exception as e:
             return ""
     
+    def _expand_text_via_api(self, text: str, page_title: str = "") -> Optional[str]:
+        """Expande um trecho de wikitext arbitrário via API expandtemplates"""
+        params = {
+            'action': 'expandtemplates',
+            'text': text,
+            'format': 'json',
+            'prop': 'wikitext'
+        }
+        if page_title:
+            params['title'] = page_title
+        
+        response = self.client._make_request(params)
+        return response.get('expandtemplates', {}).get('wikitext')
+    
+    def _get_template_source(self, template_name: str) -> Optional[str]:
+        """
+        Obtém o wikitext bruto de um template para a expansão local
+        
+        Args:
+            template_name: Nome do template como usado na chamada
+            
+        Returns:
+            Wikitext do template ou None se não existir
+        
+        Raises:
+            Exception: Falha ao consultar a wiki (o resultado não fica em cache)
+        """
+        if template_name in self.template_source_cache:
+            return self.template_source_cache[template_name]
+        
+        if template_name.startswith(':'):
+            # {{:Página}} transclui uma página do namespace principal
+            candidates = [template_name[1:]]
+        elif ':' in template_name and normalize_title(template_name.split(':', 1)[0]) in LocalTemplateExpander.KNOWN_NAMESPACES:
+            candidates = [template_name]
+        else:
+            candidates = [f"Template:{v}" for v in self._get_template_name_variations(template_name)]
+        
+        source = None
+        for page in candidates:
+            source = self._fetch_template_wikitext(page)
+            # Seguir redirecionamento (um nível)
+            target = is_redirect(source) if source else None
+            if target:
+                source = self._fetch_template_wikitext(target)
+            if source:
+                break
+        
+        # Só chega aqui sem falha de rede: None é inexistência confirmada e fica em cache
+        self.template_source_cache[template_name] = source
+        return source
+    
+    def _fetch_template_wikitext(self, page: str) -> Optional[str]:
+        """
+        Wikitext de uma página de template para a expansão local
+        
+        Returns:
+            Wikitext, ou None se a página não existir ou estiver vazia
+        
+        Raises:
+            Exception: Qualquer outra falha da consulta (rede, permissão...)
+        """
+        try:
+            content = self.client.get_page_content_wikitext(page)
+        except Exception as e:
+            if any(message in str(e) for message in _MISSING_PAGE_ERRORS):
+                return None
+            raise
+        return (content or {}).get('wikitext') or None
+    
     def _get_template_wikitext(self, template_page: str) -> str:
         """Obtém wikitext de uma página de template"""
         try:
@@ -178,6 +331,14 @@ class MediaWikiTemplateExtractor:
                 # Parâmetros posicionais (1, 2, 3, ...)
                 params[str(i + 1)] = param_value
             
+            # Chamadas repetidas com os mesmos parâmetros são servidas pelo memo
+            memo_key = ExpansionMemo.make_key(
+                normalize_title(str(template.name)), source_revision(template_content), params, kind='api'
+            )
+            cached = self.expansion_memo.get(memo_key)
+            if cached is not None:
+                return cached
+            
             # Substituir placeholders no conteúdo do template
             # Formato: {{{parametro}}} ou {{{parametro|valor_default}}}
             def replace_param(match):
@@ -196,8 +357,9 @@ class MediaWikiTemplateExtractor:
                 return params.get(param_name, default_value)
             
             # Substituir todos os {{{parametro}}}
-            result_content = re.sub(r'\{\{\{([^}]+)\}\}\}', replace_param, result_content)
+            result_content = _PARAM_PATTERN.sub(replace_param, result_content)
             
+            self.expansion_memo.put(memo_key, result_content)
             return result_content
             
         except Exception as e:
@@ -224,9 +386,10 @@ class AdvancedMediaWikiConverter:
             print(f"📄 Processando página: {page_title}")
             print(f"📏 Tamanho original: {len(original_wikitext)} caracteres")
             
-            # Expandir templates
+            # Expandir templates (a árvore parseada fica no documento para as demais etapas)
+            document = WikiDocument.from_page_content(content)
             expanded_wikitext = self.template_extractor.extract_and_expand_templates(
-                original_wikitext, page_title
+                document, page_title
             )
             
             print(f"📏 Tamanho após expansão: {len(expanded_wikitext)} caracteres")
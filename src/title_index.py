@@ -0,0 +1,160 @@
+"""
+Índice de busca por título do cache de páginas
+
+Os títulos são normalizados (minúsculas, sem acentos: "Aplicação" e
+"aplicacao" casam) e indexados por trigramas para busca por trecho e
+numa lista ordenada para busca por prefixo. O índice é atualizado por
+diferença, então recarregar a lista de páginas da API não o reconstrói.
+"""
+
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Hashable, Iterator, List, Optional, Set
+
+
+def fold_text(text: str) -> str:
+    """Normaliza para busca: sem acentos, minúsculas e espaços simples"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.casefold().replace('_', ' ').split())
+
+
+def trigrams(folded: str) -> Set[str]:
+    """Trigramas de um texto já normalizado"""
+    return {folded[i:i + 3] for i in range(len(folded) - 2)}
+
+
+class TitleSearchIndex:
+    """Índice de trigramas + lista ordenada de títulos normalizados"""
+
+    # Acima desta quantidade de mudanças, reconstruir é mais barato que atualizar
+    REBUILD_RATIO = 0.2
+
+    def __init__(self):
+        self._titles: Dict[Hashable, str] = {}         # chave -> título original
+        self._folded: Dict[Hashable, str] = {}         # chave -> título normalizado
+        self._postings: Dict[str, Set[Hashable]] = {}  # trigrama -> chaves
+        self._sorted: List[tuple] = []                 # [(título normalizado, chave)]
+
+    def __len__(self):
+        return len(self._folded)
+
+    # ------------------------------------------------------------------
+    # Atualização
+    # ------------------------------------------------------------------
+
+    def rebuild(self, titles: Dict[Hashable, str]):
+        """Reconstrói o índice a partir de {chave: título}"""
+        self._titles = dict(titles)
+        self._folded = {key: fold_text(title) for key, title in titles.items()}
+        self._postings = {}
+        for key, folded in self._folded.items():
+            for gram in trigrams(folded):
+                self._postings.setdefault(gram, set()).add(key)
+        self._sorted = sorted(((folded, key) for key, folded in self._folded.items()), key=self._sort_key)
+
+    @staticmethod
+    def _sort_key(entry):
+        # Chaves de tipos diferentes não são comparáveis: desempatar pela representação
+        return entry[0], str(entry[1])
+
+    def add(self, key: Hashable, title: str):
+        """Inclui (ou atualiza) um título"""
+        if key in self._folded:
+            self.remove(key)
+        folded = fold_text(title)
+        self._titles[key] = title
+        self._folded[key] = folded
+        for gram in trigrams(folded):
+            self._postings.setdefault(gram, set()).add(key)
+        insort(self._sorted, (folded, key), key=self._sort_key)
+
+    def remove(self, key: Hashable):
+        """Retira um título do índice"""
+        self._titles.pop(key, None)
+        folded = self._folded.pop(key, None)
+        if folded is None:
+            return
+        for gram in trigrams(folded):
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+        position = bisect_left(self._sorted, self._sort_key((folded, key)), key=self._sort_key)
+        if position < len(self._sorted) and self._sorted[position][1] == key:
+            del self._sorted[position]
+
+    def sync(self, titles: Dict[Hashable, str]):
+        """
+        Atualiza o índice por diferença para refletir {chave: título}
+
+        Apenas títulos novos, alterados ou removidos são tocados; mudanças em
+        massa disparam uma reconstrução completa.
+        """
+        removed = [key for key in self._titles if key not in titles]
+        changed = [key for key, title in titles.items() if self._titles.get(key) != title]
+
+        if not removed and not changed:
+            return
+        if not self._titles or len(removed) + len(changed) > len(titles) * self.REBUILD_RATIO:
+            self.rebuild(titles)
+            return
+        for key in removed:
+            self.remove(key)
+        for key in changed:
+            self.add(key, titles[key])
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, prefix: bool = False) -> Iterator[Hashable]:
+        """
+        Produz as chaves dos títulos que casam com a consulta, em ordem alfabética
+
+        Args:
+            query: Texto buscado (acentos e maiúsculas são ignorados)
+            prefix: True para títulos que começam com o texto; False para trecho
+        """
+        folded = fold_text(query)
+        if not folded:
+            for _, key in self._sorted:
+                yield key
+            return
+
+        if prefix:
+            position = bisect_left(self._sorted, (folded, ''), key=self._sort_key)
+            for title, key in self._sorted[position:]:
+                if not title.startswith(folded):
+                    break
+                yield key
+            return
+
+        if len(folded) < 3:
+            # Consultas curtas não têm trigramas: varrer a lista ordenada
+            for title, key in self._sorted:
+                if folded in title:
+                    yield key
+            return
+
+        candidates: Optional[Set[Hashable]] = None
+        for gram in sorted(trigrams(folded), key=lambda g: len(self._postings.get(g, ()))):
+            keys = self._postings.get(gram)
+            if not keys:
+                return
+            candidates = set(keys) if candidates is None else candidates & keys
+            if not candidates:
+                return
+
+        # Trigramas são condição necessária; confirmar o trecho completo
+        if len(candidates) * 8 > len(self._sorted):
+            # Muitos candidatos: percorrer a lista já ordenada (para cedo com limite)
+            for title, key in self._sorted:
+                if key in candidates and folded in title:
+                    yield key
+            return
+        matches = [(self._folded[key], key) for key in candidates if folded in self._folded[key]]
+        matches.sort(key=self._sort_key)
+        for _, key in matches:
+            yield key
@@ -0,0 +1,78 @@
+"""
+Documento wiki parseado uma única vez por página
+
+Expansão de templates, parsing estruturado, limpeza e extração de imagens
+recebem o mesmo WikiDocument e compartilham a mesma árvore do
+mwparserfromhell, em vez de cada etapa parsear (ou varrer com regex) o
+wikitext de novo.
+"""
+
+from typing import Dict, List
+
+import mwparserfromhell
+
+from src.wikitext_parser import extract_image_names
+
+
+class WikiDocument:
+    """Wikitext de uma página com a árvore parseada sob demanda e compartilhada"""
+
+    def __init__(self, wikitext: str, title: str = "", categories: List[str] = None):
+        """
+        Args:
+            wikitext: Texto em formato MediaWiki
+            title: Título da página
+            categories: Categorias da página
+        """
+        self.wikitext = wikitext or ""
+        self.title = title
+        self.categories = categories or []
+        self._wikicode = None
+        self._image_names = None
+
+    @classmethod
+    def from_page_content(cls, content: Dict) -> 'WikiDocument':
+        """Cria o documento a partir do dict de get_page_content_wikitext"""
+        return cls(content.get('wikitext', ''), content.get('title', ''), content.get('categories'))
+
+    @property
+    def wikicode(self):
+        """Árvore parseada (o parsing acontece uma única vez, no primeiro acesso)
+
+        As etapas consumidoras não devem modificá-la.
+        """
+        if self._wikicode is None:
+            self._wikicode = mwparserfromhell.parse(self.wikitext)
+        return self._wikicode
+
+    @property
+    def is_parsed(self) -> bool:
+        return self._wikicode is not None
+
+    def image_names(self) -> List[str]:
+        """Arquivos referenciados pela página (via wikilinks, sem regex)"""
+        if self._image_names is None:
+            self._image_names = extract_image_names(self.wikicode)
+        return self._image_names
+
+    def expand_templates(self, template_extractor) -> 'WikiDocument':
+        """Expande os templates a partir da árvore já parseada e retorna o novo documento"""
+        expanded = template_extractor.extract_and_expand_templates(self, self.title)
+        return WikiDocument(expanded, self.title, self.categories)
+
+    def parse(self, parser=None):
+        """Resultado estruturado (LazyParseResult) sobre a árvore compartilhada"""
+        if parser is None:
+            from src.wikitext_parser import WikitextParser
+            parser = WikitextParser()
+        return parser.parse_wikitext(self, self.title, self.categories)
+
+    def clean(self, parser=None) -> str:
+        """Wikitext limpo (sem comentários), sem alterar a árvore compartilhada"""
+        if parser is None:
+            from src.wikitext_parser import WikitextParser
+            parser = WikitextParser()
+        return parser.clean_wikitext(self)
+
+    def __repr__(self):
+        return f"WikiDocument({self.title!r}, {len(self.wikitext)} caracteres)"
@@ -4,13 +4,58 @@ Módulo para parsing de wikitext usando mwparserfromhell
 
 import mwparserfromhell
 import re
+from collections.abc import MutableMapping
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+
+# Prefixos de namespace de arquivos e categorias (inglês e português)
+FILE_NAMESPACES = ('file', 'arquivo', 'image', 'imagem', 'ficheiro')
+CATEGORY_NAMESPACES = ('category', 'categoria')
+
+# Palavras mágicas de comportamento (__NOTOC__, ...): removidas do texto pelos renderizadores
+BEHAVIOR_SWITCH_PATTERN = re.compile(r'__(?:NO)?(?:TOC|EDITSECTION|TITLE|GALLERY)__|__FORCETOC__')
+
+def split_namespace(title: str) -> Tuple[str, str]:
+    """Separa 'Namespace:Nome' em ('namespace', 'Nome'); namespace vazio se não houver"""
+    if ':' in title:
+        namespace, name = title.split(':', 1)
+        return namespace.strip().lower(), name.strip()
+    return '', title.strip()
+
+def extract_image_names(wikicode) -> List[str]:
+    """
+    Arquivos referenciados no wikicode, sem duplicatas e na ordem de aparição
+    
+    Usa os wikilinks dos namespaces de arquivo ([[Arquivo:x.png|...]]) e
+    transclusões {{Arquivo:x}}; [[:Arquivo:x]] é só um link e é ignorado.
+    """
+    names = []
+    for link in wikicode.filter_wikilinks():
+        target = str(link.title).strip()
+        if target.startswith(':'):
+            continue
+        namespace, name = split_namespace(target)
+        if namespace in FILE_NAMESPACES and name:
+            names.append(name)
+    for template in wikicode.filter_templates():
+        namespace, name = split_namespace(str(template.name).strip())
+        if namespace in FILE_NAMESPACES and name:
+            names.append(name)
+    return list(dict.fromkeys(names))
 
 class WikitextParser:
     """Parser de wikitext usando mwparserfromhell"""
     
-    def __init__(self):
+    # Campos extraídos da AST que podem vir do cache de parsing
+    CACHED_FIELDS = ('templates', 'links', 'sections', 'images')
+    
+    def __init__(self, parse_cache=None):
+        """
+        Args:
+            parse_cache: ParseCache opcional; conteúdo idêntico não é parseado de novo
+        """
+        self.parse_cache = parse_cache
+        
         # Configurações de parsing
         self.config = {
             'extract_categories': True,
@@ -19,57 +64,75 @@ class WikitextParser:
         }
     
     
-    def parse_wikitext(self, wikitext: str, page_title: str = "", categories: List[str] = None) -> Dict[str, Any]:
+    def parse_wikitext(self, wikitext: str, page_title: str = "", categories: List[str] = None) -> MutableMapping:
         """
         Parse wikitext e extrai informações estruturadas
         
+        Os campos extraídos da AST (templates, links, seções, imagens) são
+        calculados sob demanda, no primeiro acesso, a partir de uma única
+        árvore parseada. Se o parsing falhar, o resultado segue o contrato de
+        _fallback_parsing: campos vazios e 'parse_error' com a mensagem.
+        Consultar 'parse_error' calcula os campos pendentes.
+        
         Args:
-            wikitext: Texto em formato MediaWiki
+            wikitext: Texto em formato MediaWiki (ou WikiDocument, reaproveitando a árvore)
             page_title: Título da página
             categories: Lista de categorias da página
         
         Returns:
-            Dict com informações extraídas do wikitext
+            LazyParseResult (mapping) com informações extraídas do wikitext
         """
+        from src.wiki_document import WikiDocument
+        document = wikitext if isinstance(wikitext, WikiDocument) else None
+        if document is not None:
+            wikitext = document.wikitext
+        
         if not wikitext.strip():
-            return {
+            return LazyParseResult(self, "", {
                 'title': page_title,
                 'content': "",
                 'categories': categories or [],
                 'templates': [],
                 'links': [],
                 'sections': []
-            }
+            })
         
-        try:
-            # Parse do wikitext
-            wikicode = mwparserfromhell.parse(wikitext)
-            
-            # Extrair informações estruturalmente
-            parsed_data = self._extract_wikicode_data(wikicode)
-            
-            # Adicionar metadados
-            parsed_data['title'] = page_title
-            parsed_data['categories'] = categories or []
-            parsed_data['timestamp'] = datetime.now().isoformat()
-            
-            return parsed_data
-            
-        except Exception as e:
-            # Fallback para parsing básico se falhar
-            return self._fallback_parsing(wikitext, page_title, categories, str(e))
+        cache_key = None
+        cache_entry = None
+        if self.parse_cache is not None:
+            from src.parse_cache import content_hash
+            cache_key = content_hash(wikitext)
+            cache_entry = self.parse_cache.get(cache_key)
+            if cache_entry is None:
+                cache_entry = {}
+        
+        return LazyParseResult(
+            self,
+            wikitext,
+            {
+                'title': page_title,
+                'content': wikitext,
+                'categories': categories or [],
+                'timestamp': datetime.now().isoformat()
+            },
+            cache_key=cache_key,
+            cache_entry=cache_entry,
+            document=document
+        )
     
     def _extract_wikicode_data(self, wikicode) -> Dict[str, Any]:
         """Extrai dados estruturados do wikicode parseado"""
-        data = {
-            'content': str(wikicode),
-            'templates': [],
-            'links': [],
-            'sections': [],
-            'images': []
-        }
-        
-        # Extrair templates
+        data = {'content': str(wikicode)}
+        for field in self.CACHED_FIELDS:
+            data[field] = self.extract_field(wikicode, field)
+        return data
+    
+    def extract_field(self, wikicode, field: str) -> List[Dict[str, Any]]:
+        """Extrai um único campo ('templates', 'links', 'sections' ou 'images') do wikicode"""
+        return getattr(self, f'_extract_{field}')(wikicode)
+    
+    def _extract_templates(self, wikicode) -> List[Dict[str, Any]]:
+        templates = []
         for template in wikicode.filter_templates():
             template_data = {
                 'name': str(template.name).strip(),
@@ -79,40 +142,89 @@ class WikitextParser:
                 param_name = str(param.name).strip()
                 param_value = str(param.value).strip()
                 template_data['params'][param_name] = param_value
-            data['templates'].append(template_data)
-        
-        # Extrair links
+            templates.append(template_data)
+        return templates
+    
+    def _extract_links(self, wikicode) -> List[Dict[str, Any]]:
+        links = []
         for link in wikicode.filter_wikilinks():
             link_data = {
                 'target': str(link.title).strip(),
                 'text': str(link.text).strip() if link.text else str(link.title).strip()
             }
-            data['links'].append(link_data)
-        
-        # Extrair seções/cabeçalhos
+            links.append(link_data)
+        return links
+    
+    def _extract_sections(self, wikicode) -> List[Dict[str, Any]]:
+        sections = []
         for heading in wikicode.filter_headings():
             section_data = {
                 'level': heading.level,
                 'title': str(heading.title).strip()
             }
-            data['sections'].append(section_data)
-        
-        return data
+            sections.append(section_data)
+        return sections
     
-    def clean_wikitext(self, wikitext: str) -> str:
-        """Limpa wikitext removendo elementos indesejados"""
+    def _extract_images(self, wikicode) -> List[Dict[str, Any]]:
+        return [{'name': name} for name in extract_image_names(wikicode)]
+    
+    def render_html(self, wikitext: str, image_urls: Dict[str, str] = None, link_resolver=None) -> str:
+        """
+        Converte wikitext em HTML localmente, sem action=parse no servidor
+        
+        Args:
+            wikitext: Texto em formato MediaWiki (templates já expandidos)
+            image_urls: Mapa nome do arquivo -> URL da imagem na galeria do BookStack
+            link_resolver: Função título da wiki -> URL no BookStack
+        
+        Returns:
+            HTML pronto para o BookStack
+        """
+        from src.html_renderer import WikitextHtmlRenderer
+        return WikitextHtmlRenderer(image_urls, link_resolver).render(wikitext)
+
+    def render_markdown(self, wikitext: str, stream=None, image_urls: Dict[str, str] = None,
+                        link_resolver=None):
+        """
+        Converte wikitext em Markdown, escrevendo incrementalmente em um stream
+
+        Args:
+            wikitext: Texto em formato MediaWiki (templates já expandidos)
+            stream: Buffer/arquivo de destino; se omitido, retorna a string
+            image_urls: Mapa nome do arquivo -> URL da imagem na galeria do BookStack
+            link_resolver: Função título da wiki -> URL no BookStack
+
+        Returns:
+            Markdown (sem stream) ou relatório da escrita (com stream)
+        """
+        from src.markdown_writer import WikitextMarkdownWriter
+        writer = WikitextMarkdownWriter(image_urls, link_resolver)
+        if stream is None:
+            return writer.to_markdown(wikitext)
+        return writer.write(wikitext, stream)
+
+    def clean_wikitext(self, wikitext) -> str:
+        """
+        Limpa wikitext removendo elementos indesejados
+        
+        Aceita também um WikiDocument: os comentários são removidos do texto,
+        sem alterar a árvore compartilhada com as outras etapas.
+        """
+        from src.wiki_document import WikiDocument
+        document = wikitext if isinstance(wikitext, WikiDocument) else None
+        if document is not None:
+            wikitext = document.wikitext
+        
         if not self.config.get('clean_output', False):
             return wikitext
         
         try:
-            wikicode = mwparserfromhell.parse(wikitext)
+            wikicode = document.wikicode if document is not None else mwparserfromhell.parse(wikitext)
             
             # Remover comentários
-            for comment in wikicode.filter_comments():
-                wikicode.remove(comment)
-            
-            # Limpar texto resultante
-            cleaned = str(wikicode)
+            cleaned = wikitext
+            for comment in {str(comment) for comment in wikicode.filter_comments()}:
+                cleaned = cleaned.replace(comment, '')
             
             # Remover quebras de linha excessivas
             cleaned = re.sub(r'\n\s*\n\s*\n+', '\n\n', cleaned)
@@ -147,6 +259,118 @@ class WikitextParser:
             'timestamp': datetime.now().isoformat()
         }
 
+class LazyParseResult(MutableMapping):
+    """
+    Resultado de parse_wikitext com campos calculados sob demanda
+    
+    Comporta-se como o dict retornado antes: metadados (título, conteúdo,
+    categorias, timestamp) já vêm preenchidos; templates, links, seções e
+    imagens só são extraídos quando acessados. Campos presentes no cache
+    de parsing são usados diretamente, sem parsear o wikitext.
+    
+    Uma falha de parsing vale para o resultado inteiro, como no
+    _fallback_parsing: os campos pendentes ficam vazios e 'parse_error'
+    recebe a mensagem. Como a falha só aparece ao parsear, consultar
+    'parse_error' (get, [] ou in) calcula antes os campos pendentes.
+    """
+    
+    def __init__(self, parser: 'WikitextParser', wikitext: str, values: Dict[str, Any],
+                 cache_key: Optional[str] = None, cache_entry: Optional[Dict[str, Any]] = None,
+                 document=None):
+        self._parser = parser
+        self._wikitext = wikitext
+        self._document = document
+        self._wikicode = None
+        self._values = dict(values)
+        self._pending = set(WikitextParser.CACHED_FIELDS) - set(values)
+        self._cache_key = cache_key
+        self._cache_entry = cache_entry
+        
+        # Campos já conhecidos pelo cache de parsing (listas compartilhadas, somente leitura)
+        if cache_entry:
+            for field in list(self._pending):
+                if field in cache_entry:
+                    self._values[field] = cache_entry[field]
+                    self._pending.discard(field)
+    
+    @property
+    def wikicode(self):
+        """Árvore parseada, criada no primeiro acesso e compartilhada pelos campos"""
+        if self._wikicode is None:
+            if self._document is not None:
+                self._wikicode = self._document.wikicode
+            else:
+                self._wikicode = mwparserfromhell.parse(self._wikitext)
+        return self._wikicode
+    
+    def is_computed(self, field: str) -> bool:
+        """Indica se o campo já foi calculado (ou veio do cache)"""
+        return field not in self._pending
+    
+    def _compute(self, field: str):
+        try:
+            value = self._parser.extract_field(self.wikicode, field)
+        except Exception as e:
+            self._fail(str(e))
+            return
+        self._pending.discard(field)
+        if self._cache_key is not None:
+            self._cache_entry[field] = value
+            self._parser.parse_cache.put(self._cache_key, self._cache_entry)
+        self._values[field] = value
+    
+    def _fail(self, error: str):
+        """Mesmo contrato do _fallback_parsing: campos pendentes vazios e erro registrado"""
+        for field in self._pending:
+            self._values[field] = []
+        self._pending.clear()
+        self._values['parse_error'] = error
+    
+    def _resolve(self):
+        """Calcula todos os campos pendentes (e descobre se o parsing falha)"""
+        for field in WikitextParser.CACHED_FIELDS:
+            if field in self._pending:
+                self._compute(field)
+    
+    def __getitem__(self, key):
+        if key == 'parse_error':
+            self._resolve()
+        elif key in self._pending:
+            self._compute(key)
+        return self._values[key]
+    
+    def __setitem__(self, key, value):
+        self._pending.discard(key)
+        self._values[key] = value
+    
+    def __delitem__(self, key):
+        if key in self._pending:
+            self._pending.discard(key)
+            return
+        del self._values[key]
+    
+    def __iter__(self):
+        yield from list(self._values)
+        # Campos pendentes são listados sem serem calculados
+        yield from [field for field in WikitextParser.CACHED_FIELDS if field in self._pending]
+    
+    def __len__(self):
+        return len(self._values) + len(self._pending)
+    
+    def __contains__(self, key):
+        if key == 'parse_error':
+            self._resolve()
+        return key in self._values or key in self._pending
+    
+    def __repr__(self):
+        pending = ', '.join(sorted(self._pending))
+        return f"LazyParseResult({self._values.get('title', '')!r}, pendentes=[{pending}])"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Calcula todos os campos e retorna um dict comum (ex: para JSON/pickle)"""
+        self._resolve()
+        return dict(self._values)
+
 # Função utilitária para uso simples
 def parse_wikitext(wikitext: str, title: str = "", categories: List[str] = None) -> Dict[str, Any]:
     """
@@ -0,0 +1,76 @@
+"""Testes do BookStackClient com respostas no formato real da API"""
+
+import json
+
+import requests
+
+from src.bookstack_client import BookStackClient
+
+
+def _response(status_code, body):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = json.dumps(body).encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+
+class FakeBookStack:
+    """Servidor falso: endpoints de item retornam o próprio objeto (sem 'data')"""
+
+    def __init__(self):
+        self.requests = []
+        self.next_id = 100
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, url, kwargs))
+        path = url.split('/api/', 1)[1]
+        if method == 'POST' and path == 'pages':
+            self.next_id += 1
+            body = dict(kwargs['json'], id=self.next_id, slug='pagina', book_id=kwargs['json'].get('book_id', 1))
+            return _response(200, body)
+        if method == 'PUT' and path.startswith('pages/'):
+            return _response(200, dict(kwargs['json'], id=int(path.split('/')[1]), book_id=1))
+        if method == 'POST' and path == 'image-gallery':
+            return _response(200, {'id': 7, 'name': 'logo.png', 'type': 'gallery',
+                                   'url': 'https://bookstack.local/uploads/images/gallery/logo.png'})
+        if method == 'POST' and path == 'chapters':
+            return _response(200, dict(kwargs['json'], id=55, slug='capitulo'))
+        if method == 'GET' and path in ('shelves', 'books', 'chapters', 'pages'):
+            return _response(200, {'data': [], 'total': 0})
+        if method == 'GET' and path == 'search':
+            return _response(200, {'data': [], 'total': 0})
+        return _response(404, {'error': {'message': 'not found'}})
+
+
+def _client():
+    client = BookStackClient('https://bookstack.local', 'id', 'secret')
+    server = FakeBookStack()
+    client.session.request = server.request
+    return client, server
+
+
+def test_item_endpoints_return_the_object():
+    client, _ = _client()
+    page = client.create_page({'name': 'Página', 'html': '<p>x</p>', 'book_id': 1})
+    assert page['id'] == 101
+    assert client.update_page(101, {'name': 'Outra'})['id'] == 101
+    assert client.create_chapter(1, 'Capítulo')['id'] == 55
+
+
+def test_upload_image_returns_url(tmp_path):
+    client, _ = _client()
+    image = tmp_path / 'logo.png'
+    image.write_bytes(b'png')
+    assert client.upload_image(str(image))['url'].endswith('/logo.png')
+
+
+def test_upsert_feeds_the_index():
+    client, server = _client()
+    client.prefetch_index()
+    data = {'name': 'Página', 'html': '<p>x</p>', 'book_id': 1,
+            'tags': [{'name': 'mediawiki_pageid', 'value': '42'}]}
+    created = client.create_page(dict(data))
+    updated = client.create_page(dict(data))
+    assert updated['id'] == created['id']
+    assert [method for method, url, _ in server.requests if '/pages' in url and method != 'GET'] == ['POST', 'PUT']
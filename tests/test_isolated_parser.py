@@ -0,0 +1,27 @@
+from src.isolated_parser import IsolatedParser
+
+
+class FakePagesCache:
+    def __init__(self):
+        self.updates = []
+
+    def update_page_status(self, pageid, status, error_message=None):
+        self.updates.append((pageid, status, error_message))
+
+
+def test_budget_overrun_flags_page_and_falls_back():
+    pages_cache = FakePagesCache()
+    with IsolatedParser(timeout=0.2, pages_cache=pages_cache) as parser:
+        result = parser.parse("[[Link]] {{T|x}} " * 50000, "Página", pageid=7)
+    assert result['parse_error'].startswith("Tempo limite")
+    assert result['links'] == []
+    assert pages_cache.updates == [(7, 0, result['parse_error'])]
+
+
+def test_ordinary_worker_error_does_not_flag_page():
+    pages_cache = FakePagesCache()
+    with IsolatedParser(timeout=30, pages_cache=pages_cache) as parser:
+        assert parser.render("texto", output_format='pdf', page_title="Página", pageid=7) is None
+        assert parser.parse("[[Link]]", "Página", pageid=7)['links'][0]['target'] == 'Link'
+    assert parser.stats['errors'] == 1
+    assert pages_cache.updates == []
@@ -0,0 +1,61 @@
+import json
+
+from src.link_graph import LinkGraph
+
+
+def _graph(tmp_path=None):
+    return LinkGraph(str(tmp_path / 'link_graph.json') if tmp_path else None)
+
+
+def test_outbound_and_inbound_links():
+    graph = _graph()
+    graph.add_page_links(1, 'Início', ['Manual', 'manual#Instalação', 'Arquivo:Logo.png', ':Categoria:Guias'])
+    graph.add_page_links(2, 'Manual', ['Início'])
+    assert graph.outbound(1) == ['Manual', 'Categoria:Guias']
+    assert graph.inbound('manual') == [1]
+    assert graph.inbound('Início') == [2]
+    assert graph.page_id_for_title('manual') == 2
+
+    graph.add_page_links(1, 'Início', ['Outra'])
+    assert graph.inbound('Manual') == []
+    graph.remove_page(2)
+    assert graph.page_id_for_title('Manual') is None
+    assert graph.inbound('Início') == []
+
+
+def test_affected_by_move_includes_subpages():
+    graph = _graph()
+    graph.add_page_links(1, 'A', ['Manual'])
+    graph.add_page_links(2, 'B', ['Manual/Instalação'])
+    graph.add_page_links(3, 'C', ['Manualidades'])
+    assert graph.affected_by_move('Manual') == [1, 2]
+    assert graph.affected_by_move('Manual', include_subpages=False) == [1]
+
+
+def test_migration_order_puts_targets_first_and_breaks_cycles():
+    graph = _graph()
+    graph.add_page_links(4, 'D', [])
+    graph.add_page_links(1, 'A', ['B'])
+    graph.add_page_links(2, 'B', ['A'])
+    graph.add_page_links(3, 'C', ['D', 'A'])
+    order = graph.migration_order()
+    assert sorted(order) == [1, 2, 3, 4]
+    assert order.index(4) < order.index(3)
+    assert order.index(1) < order.index(3)
+    assert graph.migration_order([1, 2]) == [1, 2]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    graph = _graph(tmp_path)
+    graph.add_page_links(1, 'Início', ['Manual'])
+    graph.add_page_links(2, 'Manual', ['Início', 'Manual/FAQ'])
+    assert graph.save_graph()
+    assert not list(tmp_path.glob('*.tmp'))
+    assert json.loads((tmp_path / 'link_graph.json').read_text(encoding='utf-8'))['version'] == 1
+
+    loaded = LinkGraph(str(tmp_path / 'link_graph.json'), lazy=True)
+    assert not loaded.is_loaded
+    assert loaded.outbound(2) == ['Início', 'Manual/FAQ']
+    assert loaded.inbound('Manual') == [1]
+    assert loaded.page_id_for_title('Início') == 1
+    assert loaded.get_statistics() == graph.get_statistics()
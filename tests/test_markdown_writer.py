@@ -0,0 +1,73 @@
+"""Testes do escritor de Markdown incremental (src/markdown_writer.py)"""
+
+import io
+
+from src.markdown_writer import WikitextMarkdownWriter
+
+WIKITEXT = """__NOTOC__
+= Título =
+Texto com '''negrito''' e [[Outra Página|link]].
+
+* item 1
+* item 2
+
+[[Category:Manuais]]
+"""
+
+
+class RecordingStream:
+    """Stream falso que guarda cada chamada a write()"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+
+def test_write_streams_lines_and_returns_report():
+    stream = RecordingStream()
+    writer = WikitextMarkdownWriter(link_resolver=lambda title: f"/books/x/page/{title.lower().replace(' ', '-')}")
+    report = writer.write(WIKITEXT, stream)
+
+    markdown = ''.join(stream.chunks)
+    # A saída é escrita em pedaços, não em uma única string no final
+    assert len(stream.chunks) > 1
+    assert report['chars_written'] == len(markdown)
+    assert report['categories'] == ["Manuais"]
+    assert "# Título" in markdown
+    assert "**negrito**" in markdown
+    assert "[link](/books/x/page/outra-página)" in markdown
+    assert "NOTOC" not in markdown
+
+
+def test_write_file_matches_to_markdown(tmp_path):
+    path = tmp_path / "pagina.md"
+    report = WikitextMarkdownWriter().write_file(WIKITEXT, str(path))
+    content = path.read_text(encoding='utf-8')
+    assert content == WikitextMarkdownWriter().to_markdown(WIKITEXT)
+    assert report['chars_written'] == len(content)
+
+
+def test_unsupported_nodes_are_reported():
+    buffer = io.StringIO()
+    report = WikitextMarkdownWriter().write(
+        "Antes {{Caixa|a=1}} {{{parametro|padrão}}} <blink>pisca</blink> [[File:Sem URL.png]] depois",
+        buffer)
+
+    assert report['unsupported'] == {
+        'template:Caixa': 1,
+        'argument': 1,
+        'tag:blink': 1,
+        'image_without_url': 1,
+    }
+    markdown = buffer.getvalue()
+    # O conteúdo dos nós não suportados é preservado quando possível
+    assert "padrão" in markdown and "pisca" in markdown and "*Sem URL.png*" in markdown
+
+
+def test_report_is_reset_between_writes():
+    writer = WikitextMarkdownWriter()
+    writer.to_markdown("{{Caixa}}")
+    report = writer.write("Texto simples", io.StringIO())
+    assert report['unsupported'] == {}
@@ -0,0 +1,211 @@
+"""Testes do pipeline de migração (src/migration_pipeline.py)"""
+
+import threading
+import time
+
+from src.migration_pipeline import MigrationPipeline
+from src.parse_cache import ParseCache
+from test_bookstack_client import _client
+
+
+class FakeMediaWiki:
+    api_url = 'https://wiki.local/api.php'
+
+    def get_page_content_wikitext(self, title):
+        return {'wikitext': "Texto [[File:Logo.png]]", 'categories': []}
+
+
+class FakeDownloader:
+    base_url = 'https://wiki.local'
+
+    def get_image_info(self, name):
+        return {'url': 'https://wiki.local/images/Logo.png'}
+
+    def download_image(self, url, path):
+        with open(path, 'wb') as image:
+            image.write(b'png')
+        return True
+
+
+def test_pipeline_uses_real_response_shape(tmp_path):
+    client, _ = _client()
+    (tmp_path / 'images').mkdir()
+    pipeline = MigrationPipeline(FakeMediaWiki(), client, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path))
+    report = pipeline.run([{'title': 'Página', 'pageid': 1}], {'book_id': 1})
+    page = report['pages'][0]
+    assert page['error'] is None
+    assert page['bookstack_id'] == 101
+    assert page['images_uploaded'] == 1 and page['images_failed'] == 0
+    assert report['template_stats'] is None
+
+
+def test_pipeline_survives_failing_progress_callback(tmp_path):
+    client, _ = _client()
+    (tmp_path / 'images').mkdir()
+    pipeline = MigrationPipeline(FakeMediaWiki(), client, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path))
+
+    def progress(completed, total, item):
+        raise RuntimeError("falha na GUI")
+
+    report = pipeline.run([{'title': f'P{index}', 'pageid': index} for index in range(5)], {'book_id': 1}, progress)
+    assert report['created'] == 5
+
+
+def test_pipeline_reuses_parse_cache_and_saves_it(tmp_path):
+    client, _ = _client()
+    (tmp_path / 'images').mkdir()
+    parse_cache = ParseCache(str(tmp_path / 'parse_cache.json'))
+    pipeline = MigrationPipeline(FakeMediaWiki(), client, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path), parse_cache=parse_cache)
+    pipeline.run([{'title': 'Página', 'pageid': 1}], {'book_id': 1})
+    report = pipeline.run([{'title': 'Página', 'pageid': 1}], {'book_id': 1})
+    assert report['pages'][0]['images_uploaded'] == 1
+    assert parse_cache.hits == 1
+    assert (tmp_path / 'parse_cache.json').exists()
+
+
+def test_pipeline_converts_in_isolated_worker(tmp_path):
+    client, _ = _client()
+    (tmp_path / 'images').mkdir()
+    parse_cache = ParseCache(None)
+    pipeline = MigrationPipeline(FakeMediaWiki(), client, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path), parse_cache=parse_cache,
+                                 isolation={'timeout': 30})
+    report = pipeline.run([{'title': 'Página', 'pageid': 1}], {'book_id': 1})
+    page = report['pages'][0]
+    assert page['error'] is None
+    assert page['images_uploaded'] == 1
+    assert parse_cache.get_stats()['size'] == 1
+    assert pipeline._isolated_parsers == []
+
+
+class FakeTemplateExtractor:
+    """Extrator cujos templates só são conhecidos depois do prefetch da página"""
+
+    def __init__(self):
+        self.template_source_cache = {}
+
+    def prefetch_template_sources(self, wikitexts):
+        self.template_source_cache['Aviso'] = "'''Aviso:''' {{{1}}} [[File:Alerta.png]]"
+        return dict(self.template_source_cache)
+
+    def create_conversion_pool(self, wikitexts=None, **pool_options):
+        from src.conversion_pool import ConversionPool
+        return ConversionPool(template_sources=self.template_source_cache, **pool_options)
+
+
+class FakeMediaWikiWithTemplate(FakeMediaWiki):
+    def get_page_content_wikitext(self, title):
+        return {'wikitext': 'Texto {{Aviso|cuidado}} [[File:Logo.png]]', 'categories': []}
+
+
+def test_pipeline_converts_in_process_pool(tmp_path):
+    client, _ = _client()
+    (tmp_path / 'images').mkdir()
+    pipeline = MigrationPipeline(FakeMediaWikiWithTemplate(), client, template_extractor=FakeTemplateExtractor(),
+                                 image_downloader=FakeDownloader(), work_dir=str(tmp_path),
+                                 conversion_processes=2)
+    contents = []
+    create = pipeline._create
+    pipeline._create = lambda item: (contents.append(item['content']), create(item))
+    report = pipeline.run([{'title': 'Página', 'pageid': 1}], {'book_id': 1})
+    assert report['pages'][0]['error'] is None
+    assert report['pages'][0]['images_uploaded'] == 2
+    assert '<strong>Aviso:</strong> cuidado' in contents[0]
+    assert pipeline._pool is None
+
+
+class FakeMediaWikiByTitle(FakeMediaWiki):
+    """Páginas 'Vazia*' não têm conteúdo; as demais contam as buscas"""
+
+    def __init__(self):
+        self.fetched = 0
+        self._lock = threading.Lock()
+
+    def get_page_content_wikitext(self, title):
+        with self._lock:
+            self.fetched += 1
+        if title.startswith('Vazia'):
+            return {'wikitext': '', 'categories': []}
+        return super().get_page_content_wikitext(title)
+
+
+class GatedBookStack:
+    """Cliente do BookStack cuja criação de páginas espera um sinal (ou falha por nome)"""
+
+    def __init__(self, gate=None, failing=()):
+        self.gate = gate
+        self.failing = set(failing)
+        self.created = []
+
+    def upload_image(self, path):
+        return {'url': 'https://bookstack.local/uploads/logo.png'}
+
+    def create_page(self, data):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if data['name'] in self.failing:
+            raise RuntimeError("403 Forbidden")
+        self.created.append(data['name'])
+        return {'id': len(self.created)}
+
+
+def _pages(count, prefix='P'):
+    return [{'title': f'{prefix}{index}', 'pageid': index} for index in range(count)]
+
+
+def test_pipeline_cancel_drains_remaining_pages(tmp_path):
+    (tmp_path / 'images').mkdir()
+    pipeline = MigrationPipeline(FakeMediaWiki(), GatedBookStack(), image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path), fetch_workers=1, convert_workers=1,
+                                 image_workers=1, create_workers=1, queue_size=2)
+
+    def progress(completed, total, item):
+        pipeline.cancel()
+
+    report = pipeline.run(_pages(20), {'book_id': 1}, progress)
+    assert report['created'] >= 1
+    assert report['cancelled'] >= 10
+    assert report['created'] + report['cancelled'] == 20
+    assert report['failed'] == 0
+    assert all(page['stage'] in pipeline.STAGES for page in report['pages'] if page['error'] == "Cancelado")
+
+
+def test_pipeline_failure_in_one_stage_keeps_other_pages(tmp_path):
+    (tmp_path / 'images').mkdir()
+    bookstack = GatedBookStack(failing={'P3'})
+    pipeline = MigrationPipeline(FakeMediaWikiByTitle(), bookstack, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path))
+    report = pipeline.run(_pages(6) + _pages(2, prefix='Vazia'), {'book_id': 1})
+
+    errors = {page['title']: (page['stage'], page['error']) for page in report['pages'] if page['error']}
+    assert errors == {
+        'P3': ('criacao', "403 Forbidden"),
+        'Vazia0': ('busca', "Página sem conteúdo"),
+        'Vazia1': ('busca', "Página sem conteúdo")
+    }
+    assert report['created'] == 5 and report['failed'] == 3
+    assert sorted(bookstack.created) == ['P0', 'P1', 'P2', 'P4', 'P5']
+
+
+def test_pipeline_queues_bound_pages_in_flight(tmp_path):
+    (tmp_path / 'images').mkdir()
+    gate = threading.Event()
+    mediawiki = FakeMediaWikiByTitle()
+    pipeline = MigrationPipeline(mediawiki, GatedBookStack(gate), image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path), fetch_workers=1, convert_workers=1,
+                                 image_workers=1, create_workers=1, queue_size=1)
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(pipeline.run(_pages(40), {'book_id': 1})))
+    runner.start()
+    try:
+        time.sleep(0.5)
+        # Criação parada: cada estágio segura no máximo uma página em mãos e uma na fila de entrada
+        assert mediawiki.fetched <= 2 * len(MigrationPipeline.STAGES)
+    finally:
+        gate.set()
+        runner.join(10)
+    assert not runner.is_alive()
+    assert result['created'] == 40
@@ -0,0 +1,140 @@
+"""Testes da divisão de páginas grandes (src/page_splitter.py)"""
+
+from src.bookstack_index import BookStackIndex
+from src.migration_pipeline import MigrationPipeline
+from src.page_splitter import PageSplitter
+from src.wiki_document import WikiDocument
+
+WIKITEXT = """Introdução da página.
+
+= Top =
+Texto sob o cabeçalho de nível 1.
+
+== Seção A ==
+Conteúdo A.
+=== Subseção A.1 ===
+Detalhe A.1.
+
+= Other =
+Mais texto de nível 1.
+
+== Seção B ==
+Conteúdo B com [[Link]] e '''negrito''' [[File:Logo.png]].
+"""
+
+
+class FakeClient:
+    """BookStackClient falso: guarda capítulos e páginas criados"""
+
+    def __init__(self, index=None):
+        self.index = index
+        self.chapters = []
+        self.pages = []
+
+    def create_chapter(self, book_id, name, description='', priority=None):
+        chapter = {'id': 50 + len(self.chapters), 'name': name, 'book_id': book_id}
+        self.chapters.append(chapter)
+        return chapter
+
+    def create_page(self, data, upsert=True):
+        page = dict(data, id=100 + len(self.pages))
+        self.pages.append(page)
+        return page
+
+
+def _pages(min_section_size=0, wikitext=WIKITEXT, output_format='html'):
+    splitter = PageSplitter(split_threshold=0, min_section_size=min_section_size, output_format=output_format)
+    return list(splitter.iter_pages(WikiDocument(wikitext, "Página")))
+
+
+def test_needs_split_counts_utf8_bytes():
+    splitter = PageSplitter(split_threshold=100, min_section_size=0)
+    assert not splitter.needs_split("== A ==\n" + "a" * 80)
+    # 60 caracteres, mais de 100 bytes
+    assert splitter.needs_split("== A ==\n" + "ç" * 52)
+    assert not splitter.needs_split("sem cabeçalhos " * 20)
+
+
+def test_iter_pages_follow_level_one_and_two_headings():
+    pages = _pages()
+    assert [page['name'] for page in pages] == ["Introdução", "Top", "Seção A", "Other", "Seção B"]
+    assert [page['priority'] for page in pages] == [1, 2, 3, 4, 5]
+    html = ''.join(page['html'] for page in pages)
+    for text in ("Texto sob o cabeçalho de nível 1.", "Mais texto de nível 1.", "Detalhe A.1.", "Subseção A.1"):
+        assert text in html
+    # O cabeçalho que dá nome à página não se repete no conteúdo
+    assert "Seção B" not in pages[4]['html']
+
+
+def test_small_sections_are_merged():
+    pages = _pages(min_section_size=10_000)
+    assert [page['name'] for page in pages] == ["Introdução"]
+    assert "Seção B" in pages[0]['html']
+
+
+def test_blank_lead_is_kept_with_first_section():
+    pages = _pages(wikitext="\n\n== A ==\nTexto.\n", output_format='markdown')
+    assert [page['name'] for page in pages] == ["A"]
+    assert "Texto." in pages[0]['markdown']
+
+
+def test_split_to_bookstack_creates_chapter_and_section_pages():
+    client = FakeClient()
+    splitter = PageSplitter(split_threshold=0, min_section_size=0, image_urls={'Logo.png': 'https://bs/logo.png'})
+    tags = [{'name': 'categoria', 'value': 'Manuais'}]
+    result = splitter.split_to_bookstack(WikiDocument(WIKITEXT, "Página"), client, 3, tags=tags)
+
+    assert client.chapters == [{'id': 50, 'name': "Página", 'book_id': 3}]
+    assert result['chapter']['id'] == 50
+    assert [page['name'] for page in result['pages']] == ["Introdução", "Top", "Seção A", "Other", "Seção B"]
+    assert all(page['chapter_id'] == 50 and page['tags'] == tags for page in client.pages)
+    assert 'https://bs/logo.png' in client.pages[-1]['html']
+
+
+def test_split_to_bookstack_reuses_indexed_chapter():
+    client = FakeClient(BookStackIndex())
+    splitter = PageSplitter(split_threshold=0, min_section_size=10_000)
+    splitter.split_to_bookstack(WIKITEXT, client, 3, chapter_name="Grande")
+    splitter.split_to_bookstack(WIKITEXT, client, 3, chapter_name="Grande")
+    assert len(client.chapters) == 1
+    assert {page['chapter_id'] for page in client.pages} == {50}
+
+
+def test_split_into_existing_chapter_prefixes_page_names():
+    client = FakeClient()
+    splitter = PageSplitter(split_threshold=0, min_section_size=10_000)
+    result = splitter.split_to_bookstack(WikiDocument(WIKITEXT, "Página"), client, None, chapter_id=9)
+    assert client.chapters == [] and result['chapter'] is None
+    assert client.pages[0]['name'] == "Página - Introdução"
+    assert client.pages[0]['chapter_id'] == 9
+
+
+class FakeMediaWiki:
+    def get_page_content_wikitext(self, title):
+        return {'wikitext': WIKITEXT if title == "Grande" else "Texto curto", 'categories': ['Manuais']}
+
+
+class FakeDownloader:
+    base_url = 'https://wiki.local'
+
+    def get_image_info(self, name):
+        return None
+
+
+def test_pipeline_splits_pages_over_threshold(tmp_path):
+    client = FakeClient()
+    pipeline = MigrationPipeline(FakeMediaWiki(), client, image_downloader=FakeDownloader(),
+                                 work_dir=str(tmp_path), split_threshold=len(WIKITEXT) - 1, min_section_size=0)
+    report = pipeline.run([{'title': "Grande", 'pageid': 1}, {'title': "Pequena", 'pageid': 2}], {'book_id': 3})
+
+    pages = {page['title']: page for page in report['pages']}
+    assert report['created'] == 2
+    assert pages["Grande"]['bookstack_id'] == 50 and pages["Grande"]['split_pages'] == 5
+    assert pages["Pequena"]['split_pages'] == 0
+    assert [chapter['name'] for chapter in client.chapters] == ["Grande"]
+    sections = [page for page in client.pages if page.get('chapter_id') == 50]
+    assert len(sections) == 5
+    # Imagem sem upload aponta para a wiki; as seções não levam a tag de origem
+    assert 'https://wiki.local/index.php?title=Special:FilePath/Logo.png' in sections[-1]['html']
+    assert {'name': 'mediawiki_split_of', 'value': '1'} in sections[0]['tags']
+    assert all(tag['name'] != 'mediawiki_pageid' for tag in sections[0]['tags'])
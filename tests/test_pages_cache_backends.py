@@ -0,0 +1,175 @@
+import json
+import sqlite3
+
+import pytest
+
+from src.pages_cache import PagesCache, create_pages_cache
+
+API_PAGES = [{'pageid': 1, 'title': 'Alfa'}, {'pageid': 2, 'title': 'Beta'}, {'pageid': 3, 'title': 'Gama'}]
+
+
+CACHE_FILES = {'json': 'pages_cache.json', 'sqlite': 'pages_cache.db', 'sharded': 'pages_cache'}
+
+
+@pytest.fixture(params=['json', 'sqlite', 'sharded'])
+def backend(request, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache_file = str(tmp_path / CACHE_FILES[request.param])
+    opened = []
+
+    def open_cache(**options):
+        opened.append(create_pages_cache(request.param, cache_file, **options))
+        return opened[-1]
+
+    yield open_cache
+    for cache in opened:
+        if hasattr(cache, 'close'):
+            cache.close()
+
+
+@pytest.fixture
+def cache(backend):
+    return backend()
+
+
+def test_merge_reports_the_same_diff(cache):
+    assert cache.merge_pages_from_api(API_PAGES)['added'] == 3
+    diff = cache.merge_pages_from_api([{'pageid': 1, 'title': 'Alfa'}, {'pageid': 2, 'title': 'Beta 2'},
+                                       {'pageid': 4, 'title': 'Delta'}])
+    assert (diff['added'], diff['renamed'], diff['deleted'], diff['unchanged']) == (1, 1, 1, 1)
+    assert diff['added_pageids'] == [4]
+    assert diff['renamed_pageids'] == [2]
+    assert diff['deleted_pageids'] == [3]
+
+
+def test_status_windows_and_counts(cache):
+    cache.merge_pages_from_api(API_PAGES)
+    cache.update_page_status(2, 1)
+    assert cache.is_loaded
+    assert cache.count_by_status(0) == 2
+    assert cache.count_by_status(1) == 1
+    assert [page['pageid'] for page in cache.iter_page(0, 1, 5)] == [3]
+    assert [page['pageid'] for page in cache.iter_page(1)] == [2]
+    assert cache.remove_deleted_pages([1, 2]) == 1
+    assert cache.get_statistics()['total_pages'] == 2
+
+
+def test_header_and_reload_after_save(backend):
+    cache = backend()
+    cache.merge_pages_from_api(API_PAGES)
+    cache.update_page_status(1, 1)
+    assert cache.save_cache()
+    assert cache.header['total_pages'] == 3
+    assert cache.header['status_counts'] == {'0': 2, '1': 1}
+
+    reopened = backend(lazy=True)
+    assert reopened.header['status_counts'] == {'0': 2, '1': 1}
+    results = []
+    reopened.load_async(results.append).join()
+    assert results == [True]
+    assert reopened.is_loaded
+    assert reopened.count_by_status(1) == 1
+
+
+def test_title_search_ignores_accents_and_case(cache):
+    cache.merge_pages_from_api([{'pageid': 1, 'title': 'Aplicação Web'}, {'pageid': 2, 'title': 'Aplicativo'},
+                                {'pageid': 3, 'title': 'Manual da aplicação'}, {'pageid': 4, 'title': 'Rede_Wi-Fi'}])
+    cache.update_page_status(3, 1)
+    assert [page['pageid'] for page in cache.search_pages('aplic', prefix=True)] == [1, 2]
+    assert [page['pageid'] for page in cache.search_pages('APLICACAO')] == [1, 3]
+    assert [page['pageid'] for page in cache.search_pages('aplicacao', status=1)] == [3]
+    assert [page['pageid'] for page in cache.search_pages('wi')] == [4]
+    assert [page['pageid'] for page in cache.search_pages('rede wi-f')] == [4]
+    assert len(cache.search_pages('a', limit=2)) == 2
+
+    # Título renomeado sai do índice antigo e entra no novo
+    cache.merge_pages_from_api([{'pageid': 1, 'title': 'Servidor'}, {'pageid': 2, 'title': 'Aplicativo'},
+                                {'pageid': 3, 'title': 'Manual da aplicação'}, {'pageid': 4, 'title': 'Rede_Wi-Fi'}])
+    assert [page['pageid'] for page in cache.search_pages('aplicacao')] == [3]
+    assert [page['pageid'] for page in cache.search_pages('servi', prefix=True)] == [1]
+
+
+def test_sqlite_migrates_databases_without_folded_titles(tmp_path):
+    db_file = str(tmp_path / 'pages_cache.db')
+    connection = sqlite3.connect(db_file)
+    connection.executescript("""
+        CREATE TABLE pages (pageid INTEGER PRIMARY KEY, title TEXT NOT NULL, link TEXT,
+                            status INTEGER NOT NULL DEFAULT 0, last_processed TEXT, error_message TEXT,
+                            content TEXT, position INTEGER NOT NULL DEFAULT 0);
+        INSERT INTO pages (pageid, title) VALUES (1, 'Configuração'), (2, 'Instalação');
+    """)
+    connection.commit()
+    connection.close()
+
+    cache = create_pages_cache('sqlite', db_file)
+    try:
+        assert [page['pageid'] for page in cache.search_pages('configuracao')] == [1]
+        assert [page['pageid'] for page in cache.search_pages('inst', prefix=True)] == [2]
+    finally:
+        cache.close()
+
+
+def test_json_snapshot_keeps_version_for_shared_mode_only(tmp_path):
+    for shared in (False, True):
+        cache_file = tmp_path / f'pages_cache_{shared}.json'
+        cache = PagesCache(str(cache_file), shared=shared)
+        cache.merge_pages_from_api(API_PAGES)
+        cache.update_page_status(1, 1)
+        assert cache.save_cache()
+        pages = json.loads(cache_file.read_text(encoding='utf-8'))['pages']
+        assert all(('version' in page) == shared for page in pages)
+        assert PagesCache(str(cache_file), shared=shared).get_page_by_id(1)['status'] == 1
+
+
+def test_shared_caches_do_not_resurrect_deleted_pages(tmp_path):
+    cache_file = str(tmp_path / 'pages_cache.json')
+    first = PagesCache(cache_file, shared=True)
+    first.merge_pages_from_api(API_PAGES)
+    assert first.save_cache()
+    second = PagesCache(cache_file, shared=True)
+
+    # Exclusão ainda não gravada: o snapshot do outro processo não traz a página de volta
+    first.merge_pages_from_api(API_PAGES[:2])
+    second.update_page_status(1, 1)
+    assert second.save_cache()
+    assert first.save_cache()
+    assert first.get_page_by_id(3) is None
+    assert first.get_page_by_id(1)['status'] == 1
+
+    # Exclusão gravada: o outro processo a aplica no próximo merge
+    second.update_page_status(2, 1)
+    assert second.save_cache()
+    assert second.get_page_by_id(3) is None
+
+    reopened = PagesCache(cache_file, shared=True)
+    assert sorted(page['pageid'] for page in reopened.get_all_pages()) == [1, 2]
+    assert reopened.count_by_status(1) == 2
+
+    # A página voltou na wiki: a nova versão supera o marcador de exclusão
+    reopened.merge_pages_from_api(API_PAGES)
+    assert reopened.save_cache()
+    second.update_page_status(1, 0)
+    assert second.save_cache()
+    assert second.get_page_by_id(3) is not None
+
+
+def test_sqlite_import_replays_journal_and_reads_stored_content(tmp_path):
+    from src.pages_cache_sqlite import SQLitePagesCache
+
+    json_file = str(tmp_path / 'pages_cache.json')
+    source = PagesCache(json_file)
+    source.merge_pages_from_api(API_PAGES + [{'title': 'Sem ID'}])
+    source.set_page_content(1, 'Conteúdo da página Alfa')
+    assert source.save_cache()
+    # Transição ainda só no journal (sem compactação)
+    source.update_page_status(2, 1)
+    assert (tmp_path / 'pages_cache.journal.jsonl').exists()
+
+    cache = SQLitePagesCache(str(tmp_path / 'pages_cache.db'))
+    try:
+        assert cache.import_json(json_file) == 3
+        assert cache.get_page_content(1) == 'Conteúdo da página Alfa'
+        assert cache.get_page_by_id(2)['status'] == 1
+        assert cache.count_by_status(0) == 2
+    finally:
+        cache.close()
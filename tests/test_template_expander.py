@@ -0,0 +1,188 @@
+import time
+
+import mwparserfromhell
+
+from src.expansion_memo import ExpansionMemo
+from src.template_expander import EXPRESSION_ERROR, LocalTemplateExpander
+
+
+def _expander(templates=None):
+    templates = templates or {}
+    return LocalTemplateExpander(lambda name: templates.get(name))
+
+
+def test_expr_comparison_operators():
+    expander = _expander()
+    assert expander.expand('{{#expr: 1 < 2}}', 'P') == '1'
+    assert expander.expand('{{#expr: 3 >= 4}}', 'P') == '0'
+    assert expander.expand('{{#expr: 1 <> 2}}', 'P') == '1'
+    assert expander.expand('{{#ifexpr: 2 <= 3|a|b}}', 'P') == 'a'
+
+
+def test_ifexpr_comparison_inside_template():
+    expander = _expander({'T': '{{#ifexpr: {{{1}}} > 5|grande|pequeno}}'})
+    assert expander.expand('{{T|7}} {{T|2}}', 'P') == 'grande pequeno'
+
+
+def test_parsed_wikicode_keeps_comparisons_and_html():
+    expander = _expander()
+    wikicode = mwparserfromhell.parse('<b>x</b> {{#expr: 5 > 2}}')
+    assert expander.expand(wikicode, 'P') == '<b>x</b> 1'
+
+
+def test_expr_bounds_exponentiation():
+    expander = _expander()
+    started = time.monotonic()
+    assert expander.expand('{{#expr: 9^9^9}}', 'P') == EXPRESSION_ERROR
+    assert time.monotonic() - started < 1
+    assert expander.expand('{{#expr: 2^10}}', 'P') == '1024'
+
+
+def test_transclusion_with_positional_named_and_default_arguments():
+    expander = _expander({
+        'Saudação': 'Olá {{{1}}}, {{{nome|visitante}}}!<noinclude>[[Categoria:Templates]]</noinclude>',
+        'Caixa': '<onlyinclude><div>{{{1|vazio}}}</div></onlyinclude> documentação',
+        'Interno': '<includeonly>{{Saudação|{{{1}}}}}</includeonly>'
+    })
+    assert expander.expand('{{Saudação|Ana}}', 'P') == 'Olá Ana, visitante!'
+    assert expander.expand('{{saudação|Ana|nome=Bia}}', 'P') == 'Olá Ana, Bia!'
+    assert expander.expand('{{Caixa}} {{Caixa|x}} {{Caixa|}}', 'P') == '<div>vazio</div> <div>x</div> <div></div>'
+    assert expander.expand('{{Interno|Caio}}', 'P') == 'Olá Caio, visitante!'
+    assert expander.expand('{{Inexistente|a}}', 'P') == '{{Inexistente|a}}'
+    assert expander.stats['missing'] == 1
+
+
+def test_conditional_parser_functions():
+    expander = _expander()
+    assert expander.expand('{{#if: x|sim|não}} {{#if: |sim|não}} {{#if:  |sim}}', 'P') == 'sim não '
+    assert expander.expand('{{#ifeq: 01|1|igual|diferente}} {{#ifeq: a|b|igual|diferente}}', 'P') == 'igual diferente'
+    switch = '{{#switch: {{{1}}}|a=um|b|c=dois ou três|#default=outro}}'
+    template = _expander({'S': switch})
+    assert template.expand('{{S|a}} {{S|b}} {{S|c}} {{S|z}}', 'P') == 'um dois ou três dois ou três outro'
+    assert expander.expand('{{#switch: z|a=1|padrão}}', 'P') == 'padrão'
+
+
+def test_magic_words_use_the_rendered_page():
+    expander = _expander({'Nome': '{{PAGENAME}}'})
+    assert expander.expand('{{PAGENAME}}|{{NAMESPACE}}|{{SUBPAGENAME}}|{{BASEPAGENAME}}', 'Ajuda:Guia/Parte 2') == \
+        'Guia/Parte 2|Ajuda|Parte 2|Guia'
+    assert expander.expand('{{PAGENAMEE}}', 'Ajuda:Guia/Parte 2') == 'Guia/Parte_2'
+    assert expander.expand('{{Nome}}', 'Outra') == 'Outra'
+    assert expander.expand('{{lc:ABC}} {{ucfirst:abc}} {{padleft:7|3}}', 'P') == 'abc Abc 007'
+
+
+def test_template_loops_and_depth_are_reported():
+    expander = _expander({'A': '{{B}}', 'B': '{{A}}', 'Fundo': '{{Fundo2}}', 'Fundo2': 'fim'})
+    assert 'Loop de template detectado: [[A]]' in expander.expand('{{A}}', 'P')
+    shallow = LocalTemplateExpander({'Fundo': '{{Fundo2}}', 'Fundo2': 'fim'}.get, max_depth=1)
+    assert 'Profundidade máxima' in shallow.expand('{{Fundo}}', 'P')
+    assert expander.expand('{{Fundo}}', 'P') == 'fim'
+
+
+def test_invoke_and_unknown_functions_fall_back_to_the_api():
+    calls = []
+
+    def api_expander(text, page_title):
+        calls.append((text, page_title))
+        return f"[api:{text}]"
+
+    expander = LocalTemplateExpander({'Mod': '{{#invoke:Datas|hoje|{{{1}}}}}'}.get, api_expander=api_expander)
+    assert expander.expand('{{Mod|x}}', 'Página') == '[api:{{#invoke:Datas|hoje|x}}]'
+    assert expander.expand('{{#desconhecida: a|b=c}}', 'Página') == '[api:{{#desconhecida: a|b=c}}]'
+    assert calls == [('{{#invoke:Datas|hoje|x}}', 'Página'), ('{{#desconhecida: a|b=c}}', 'Página')]
+    assert expander.stats['api_calls'] == 2
+    # Sem API a chamada fica como está
+    assert _expander().expand('{{#invoke:Datas|hoje}}', 'P') == '{{#invoke:Datas|hoje}}'
+
+
+def test_expr_unary_minus_binds_tighter_than_power():
+    expander = _expander()
+    assert expander.expand('{{#expr: -2^2}}', 'P') == '4'
+    assert expander.expand('{{#expr: -(2^2)}}', 'P') == '-4'
+    assert expander.expand('{{#expr: 0 - 2^2}}', 'P') == '-4'
+
+
+def test_expr_round():
+    expander = _expander()
+    assert expander.expand('{{#expr: 3.14159 round 2}}', 'P') == '3.14'
+    assert expander.expand('{{#expr: 2.5 round 0}} {{#expr: -2.5 round 0}}', 'P') == '3 -3'
+    assert expander.expand('{{#expr: 1234 round -2}}', 'P') == '1200'
+    assert expander.expand('{{#expr: 1 + 2.567 round 1}}', 'P') == '3.6'
+    assert expander.expand('{{#expr: 2.675 round 2}}', 'P') == '2.68'
+
+
+def test_template_fetch_failures_are_not_cached_as_missing():
+    from src.template_extractor import MediaWikiTemplateExtractor
+
+    class FlakyClient:
+        def __init__(self):
+            self.calls = []
+
+        def get_page_content_wikitext(self, title):
+            self.calls.append(title)
+            if title == 'Template:Ausente':
+                raise Exception("Página não encontrada")
+            if self.calls.count(title) == 1:
+                raise ConnectionError("timeout")
+            return {'wikitext': 'conteúdo'}
+
+    client = FlakyClient()
+    extractor = MediaWikiTemplateExtractor(client)
+    assert extractor.extract_and_expand_templates('{{Instável}}', 'P') == '{{Instável}}'
+    assert extractor.extract_and_expand_templates('{{Instável}}', 'P') == 'conteúdo'
+
+    extractor.extract_and_expand_templates('{{Ausente}}', 'P')
+    extractor.extract_and_expand_templates('{{Ausente}}', 'P')
+    assert client.calls.count('Template:Ausente') == 1
+    assert extractor.template_source_cache['Ausente'] is None
+
+
+def test_memo_reuses_expansions_with_equivalent_arguments():
+    memo = ExpansionMemo()
+    expander = LocalTemplateExpander({'T': '[{{{1}}}]'}.get, memo=memo)
+    assert expander.expand('{{T|a}} {{T|1=a}} {{T|b}} {{T|a}}', 'P') == '[a] [a] [b] [a]'
+    assert memo.hits == 2
+    assert expander.stats['templates'] == 2
+
+
+def test_memo_is_invalidated_when_the_template_revision_changes():
+    memo = ExpansionMemo()
+    templates = {'T': 'versão 1 {{{1}}}'}
+    assert LocalTemplateExpander(templates.get, memo=memo).expand('{{T|x}}', 'P') == 'versão 1 x'
+    templates['T'] = 'versão 2 {{{1}}}'
+    expander = LocalTemplateExpander(templates.get, memo=memo)
+    assert expander.expand('{{T|x}}', 'P') == 'versão 2 x'
+    assert memo.hits == 0 and expander.stats['templates'] == 1
+
+
+def test_memo_keeps_page_dependent_expansions_per_page():
+    memo = ExpansionMemo()
+    expander = LocalTemplateExpander({'Nome': '{{PAGENAME}}', 'Ano': '{{CURRENTYEAR}}'}.get, memo=memo)
+    assert expander.expand('{{Nome}}', 'Alfa') == 'Alfa'
+    assert expander.expand('{{Nome}}', 'Beta') == 'Beta'
+    assert expander.expand('{{Nome}}', 'Alfa') == 'Alfa'
+    assert memo.hits == 1
+    expander.expand('{{Ano}} {{Ano}}', 'P')
+    assert memo.get_stats()['size'] == 2  # resultado volátil não é memorizado
+
+
+def test_memo_evicts_least_recently_used():
+    memo = ExpansionMemo(max_entries=2)
+    memo.put('a', 1)
+    memo.put('b', 2)
+    assert memo.get('a') == 1
+    memo.put('c', 3)
+    assert memo.get('b') is None and memo.get('a') == 1
+    assert memo.get_stats()['evictions'] == 1
+
+
+def test_invalidate_template_reloads_the_source():
+    memo = ExpansionMemo()
+    templates = {'T': 'antigo {{{1}}}'}
+    expander = LocalTemplateExpander(templates.get, memo=memo)
+    assert expander.expand('{{T|x}}', 'P') == 'antigo x'
+    templates['T'] = 'novo {{{1}}}'
+    assert expander.expand('{{T|x}}', 'P') == 'antigo x'  # árvore memorizada
+    expander.invalidate_template('T')
+    assert expander.expand('{{T|x}}', 'P') == 'novo x'
+    expander.invalidate_template('Inexistente')  # nome desconhecido é ignorado
@@ -0,0 +1,46 @@
+"""Testes do resultado sob demanda de parse_wikitext (src/wikitext_parser.py)"""
+
+import pickle
+
+from src import wikitext_parser
+from src.wikitext_parser import WikitextParser
+
+
+def _failing_parse(text):
+    raise ValueError("árvore inválida")
+
+
+def test_fields_are_computed_on_access():
+    result = WikitextParser().parse_wikitext("[[Alvo|texto]] {{T|a=1}}", "Página")
+    assert not result.is_computed('links')
+    assert result['links'] == [{'target': 'Alvo', 'text': 'texto'}]
+    assert result.is_computed('links') and not result.is_computed('templates')
+    assert result.get('parse_error') is None
+    assert result['templates'][0]['params'] == {'a': '1'}
+
+
+def test_parse_error_is_visible_before_any_field_access(monkeypatch):
+    monkeypatch.setattr(wikitext_parser.mwparserfromhell, 'parse', _failing_parse)
+    result = WikitextParser().parse_wikitext("[[Link]]", "Página", ['Manuais'])
+
+    # Mesmo contrato do _fallback_parsing: erro registrado e todos os campos vazios
+    assert 'parse_error' in result
+    assert result.get('parse_error') == "árvore inválida"
+    assert all(result[field] == [] for field in WikitextParser.CACHED_FIELDS)
+    assert result['content'] == "[[Link]]" and result['categories'] == ['Manuais']
+
+
+def test_to_dict_carries_parse_error(monkeypatch):
+    monkeypatch.setattr(wikitext_parser.mwparserfromhell, 'parse', _failing_parse)
+    data = WikitextParser().parse_wikitext("[[Link]]", "Página").to_dict()
+    assert data['parse_error'] == "árvore inválida"
+    assert data['links'] == [] and data['images'] == []
+    assert pickle.loads(pickle.dumps(data)) == data
+
+
+def test_empty_wikitext_has_no_pending_fields():
+    result = WikitextParser().parse_wikitext("  \n", "Vazia")
+    assert result.to_dict() == {
+        'title': "Vazia", 'content': "", 'categories': [],
+        'templates': [], 'links': [], 'sections': [], 'images': [],
+    }